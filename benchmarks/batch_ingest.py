@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Vazão de ingestão: uma mensagem por requisição x lote, com e sem keep-alive.
+
+Sobe o bridge num subprocesso (como o loadtest.py) e manda N mensagens em
+modo assíncrono (202 + ticket), para medir só a entrada e a injeção, não o
+tempo do Claude:
+  • nova conexão: um POST /api/whatsapp-chat por conexão (como o gateway faz hoje);
+  • keep-alive: um POST por mensagem, reaproveitando a conexão de cada cliente;
+  • lote: POST /api/whatsapp-chat/batch com --batch mensagens, com keep-alive.
+
+Para cada modo: mensagens/s, latência mediana por requisição e quantas
+gravações do .claude.json foram feitas.
+
+Uso:
+    python benchmarks/batch_ingest.py [-t simple,simple-async] [-n 2000] [-c 8] [--batch 50]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.loadtest import EXIT_UNAVAILABLE, TARGETS, free_port, wait_until_up
+
+LOADTEST = os.path.join(ROOT, 'benchmarks', 'loadtest.py')
+CONFIG_WRITES = re.compile(r'^bridge_config_batch_size_count (\S+)$', re.MULTILINE)
+
+
+def config_writes(port):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    connection.request('GET', '/api/metrics')
+    match = CONFIG_WRITES.search(connection.getresponse().read().decode('utf-8'))
+    connection.close()
+    return int(float(match.group(1))) if match else 0
+
+
+def post(connection, path, payload, keep_alive):
+    body = json.dumps(payload).encode('utf-8')
+    headers = {'Content-Type': 'application/json'}
+    if not keep_alive:
+        headers['Connection'] = 'close'
+    connection.request('POST', path, body, headers)
+    response = connection.getresponse()
+    response.read()
+    if response.status not in (200, 202):
+        raise RuntimeError(f'{path}: HTTP {response.status}')
+
+
+def run_mode(port, mode, count, concurrency, batch_size, senders):
+    messages = [{"senderId": f'5511{i % senders:08d}@c.us', "message": f'msg {i}', "async": True}
+                for i in range(count)]
+    if mode == 'lote':
+        requests = [{"messages": messages[i:i + batch_size], "async": True}
+                    for i in range(0, count, batch_size)]
+        path = '/api/whatsapp-chat/batch'
+    else:
+        requests = messages
+        path = '/api/whatsapp-chat'
+    keep_alive = mode != 'nova conexão'
+    chunks = [requests[worker::concurrency] for worker in range(concurrency)]
+
+    def worker(chunk):
+        latencies = []
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        for payload in chunk:
+            t0 = time.perf_counter()
+            post(connection, path, payload, keep_alive)
+            latencies.append(time.perf_counter() - t0)
+            if not keep_alive:
+                connection.close()
+        connection.close()
+        return latencies
+
+    writes_before = config_writes(port)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = [latency for chunk in pool.map(worker, chunks) for latency in chunk]
+    elapsed = time.perf_counter() - started
+    return {
+        "messages_per_second": count / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "requests": len(latencies),
+        "config_writes": config_writes(port) - writes_before,
+    }
+
+
+def run_target(target, args):
+    workdir = tempfile.mkdtemp(prefix=f'bridge-batch-{target}-')
+    with open(os.path.join(workdir, '.claude.json'), 'w', encoding='utf-8') as f:
+        f.write('{}')
+    port = free_port()
+    log = open(os.path.join(workdir, 'bridge.log'), 'w', encoding='utf-8')
+    proc = subprocess.Popen(
+        [sys.executable, LOADTEST, '--serve', target, '--workdir', workdir,
+         '--port', str(port), '--timeout', '30'],
+        stdout=log, stderr=subprocess.STDOUT, cwd=ROOT
+    )
+    try:
+        if not wait_until_up(f'http://127.0.0.1:{port}', proc):
+            reason = "indisponível" if proc.poll() == EXIT_UNAVAILABLE else "não subiu"
+            print(f"⚠️ {target}: {reason} (veja {workdir}/bridge.log)", file=sys.stderr)
+            return {}
+        return {mode: run_mode(port, mode, args.count, args.concurrency, args.batch, args.senders)
+                for mode in ('nova conexão', 'keep-alive', 'lote')}
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-t', '--targets', default='simple,simple-async',
+                        help=f'alvos separados por vírgula ({",".join(TARGETS)})')
+    parser.add_argument('-n', '--count', type=int, default=2000, help='mensagens por modo')
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help='clientes simultâneos')
+    parser.add_argument('-s', '--senders', type=int, default=50, help='contatos distintos')
+    parser.add_argument('--batch', type=int, default=50, help='mensagens por lote')
+    args = parser.parse_args()
+
+    print(f"{'alvo':<13} {'modo':<13} {'req':>5} {'msg/s':>8} {'p50 ms':>8} {'gravações':>10}")
+    print('-' * 62)
+    for target in args.targets.split(','):
+        for mode, result in run_target(target, args).items():
+            print(f"{target:<13} {mode:<13} {result['requests']:>5} {result['messages_per_second']:>8.0f}"
+                  f" {result['p50_ms']:>8.2f} {result['config_writes']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark do custo de uma injeção no .claude.json x tamanho do config.
+
+Compara, para configs de 1 KB a 10 MB:
+  • legado: json.load + json.dump(indent=2) a cada mensagem (como antes);
+  • writer: ConfigWriter com cache validado por stat (indent=2);
+  • compacto: ConfigWriter com cache e saída sem indentação.
+
+As injeções são sequenciais (uma por commit) para medir o cache isolado
+do ganho de agrupamento.
+
+Uso:
+    python benchmarks/config_injection.py [-n 20] [--stdlib]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pybridge import jsonlib
+from pybridge.config_writer import ConfigWriter
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+
+def build_config(size):
+    """Config parecido com o real: vários projetos com histórico e MCP"""
+    config = {"numStartups": 10, "projects": {}}
+    i = 0
+    while len(json.dumps(config)) < size:
+        config["projects"][f"/home/user/projeto-{i}"] = {
+            "allowedTools": ["Read", "Write"],
+            "history": [{"display": f"comando {i}-{j} " + "x" * 60, "pastedContents": {}}
+                        for j in range(10)],
+            "mcpServers": {"fs": {"command": "npx", "args": ["-y", "@mcp/fs", "/home/user"]}},
+        }
+        i += 1
+    return config
+
+
+def entry(i):
+    return {"display": f"🔔 MENSAGEM WHATSAPP {i}", "pastedContents": {}}
+
+
+def add_entry(config, history_entry):
+    history = config.setdefault('projects', {}).setdefault('/home/user', {}).setdefault('history', [])
+    history.insert(0, history_entry)
+    del history[100:]
+
+
+def legacy_inject(path, i):
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    add_entry(config, entry(i))
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+
+
+def bench_legacy(path, count):
+    samples = []
+    for i in range(count):
+        t0 = time.perf_counter()
+        legacy_inject(path, i)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def bench_writer(path, count, indent):
+    writer = ConfigWriter(path, window=0, indent=indent)
+    samples = []
+    for i in range(count):
+        history_entry = entry(i)
+        t0 = time.perf_counter()
+        writer.submit(lambda config: add_entry(config, history_entry)).result()
+        samples.append(time.perf_counter() - t0)
+    writer.close()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=20)
+    parser.add_argument('--stdlib', action='store_true', help='ignora o orjson mesmo se instalado')
+    args = parser.parse_args()
+
+    if args.stdlib:
+        jsonlib.orjson = None
+        jsonlib.BACKEND = 'json'
+
+    print(f"backend JSON: {jsonlib.BACKEND}")
+    print(f"{'config':>10} | {'legado':>10} | {'writer':>10} | {'compacto':>10} | {'ganho':>6}")
+    tmp = tempfile.mkdtemp(prefix='bridge-config-bench-')
+
+    for size in SIZES:
+        config = build_config(size)
+        results = {}
+        for name, runner in (
+            ('legado', lambda path: bench_legacy(path, args.count)),
+            ('writer', lambda path: bench_writer(path, args.count, 2)),
+            ('compacto', lambda path: bench_writer(path, args.count, None)),
+        ):
+            path = os.path.join(tmp, f'{name}-{size}.json')
+            with open(path, 'wb') as f:
+                f.write(jsonlib.dumps(config, indent=2))
+            results[name] = statistics.median(runner(path)) * 1000
+
+        label = f"{size / 1000:g} KB" if size < 1_000_000 else f"{size / 1_000_000:g} MB"
+        print(f"{label:>10} | {results['legado']:8.2f}ms | {results['writer']:8.2f}ms"
+              f" | {results['compacto']:8.2f}ms | {results['legado'] / results['compacto']:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
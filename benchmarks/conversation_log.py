@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark do log de conversas: conversation_log.json x segmentado.
+
+Para logs de 1 mil a 100 mil trocas (contatos sorteados), mede:
+  • gravar: acrescentar uma troca (legado reescreve o dict inteiro);
+  • ler: últimas 10 trocas de um contato (legado carrega o arquivo todo).
+
+Uso:
+    python benchmarks/conversation_log.py [-n 50] [--senders 500]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pybridge.convlog import ConversationLog
+
+SIZES = [1_000, 10_000, 100_000]
+MESSAGE = "Olá, gostaria de saber o horário de funcionamento de vocês amanhã"
+REPLY = "Olá! Funcionamos das 8h às 18h. Posso ajudar em mais alguma coisa?"
+
+
+def legacy_record(path, sender_id, message, reply):
+    # Como o saveConversation do api-server.js
+    conversations = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            conversations = json.load(f)
+    conversations.setdefault(sender_id, []).append(
+        {"timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'), "message": message, "reply": reply}
+    )
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(conversations, f, ensure_ascii=False, indent=2)
+
+
+def legacy_recent(path, sender_id, limit):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get(sender_id, [])[-limit:]
+
+
+def timed(function, count):
+    samples = []
+    for i in range(count):
+        t0 = time.perf_counter()
+        function(i)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=50)
+    parser.add_argument('--senders', type=int, default=500)
+    args = parser.parse_args()
+
+    senders = [f'5511{n:08d}@c.us' for n in range(args.senders)]
+    print(f"{'trocas':>8} | {'gravar legado':>13} | {'gravar seg.':>11} | {'ler legado':>10} | {'ler seg.':>9}")
+
+    for size in SIZES:
+        tmp = tempfile.mkdtemp(prefix='bridge-convlog-bench-')
+        legacy_path = os.path.join(tmp, 'conversation_log.json')
+        conversations = {}
+        conversation_log = ConversationLog(os.path.join(tmp, 'segmented'), compact_interval=None)
+        for _ in range(size):
+            sender_id = random.choice(senders)
+            conversations.setdefault(sender_id, []).append(
+                {"timestamp": "2025-01-01T00:00:00", "message": MESSAGE, "reply": REPLY}
+            )
+            conversation_log.record(sender_id, MESSAGE, REPLY)
+        with open(legacy_path, 'w', encoding='utf-8') as f:
+            json.dump(conversations, f, ensure_ascii=False, indent=2)
+
+        write_legacy = timed(lambda i: legacy_record(legacy_path, random.choice(senders), MESSAGE, REPLY),
+                             min(args.count, 20))
+        write_segmented = timed(lambda i: conversation_log.record(random.choice(senders), MESSAGE, REPLY),
+                                args.count)
+        read_legacy = timed(lambda i: legacy_recent(legacy_path, random.choice(senders), 10), args.count)
+        read_segmented = timed(lambda i: conversation_log.recent(random.choice(senders), 10), args.count)
+
+        print(f"{size:>8} | {write_legacy:11.2f}ms | {write_segmented:9.3f}ms"
+              f" | {read_legacy:8.2f}ms | {read_segmented:7.3f}ms")
+        conversation_log.close()
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
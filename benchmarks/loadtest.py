@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Teste de carga offline dos transportes do bridge (Flask x threads x asyncio).
+
+Para cada alvo, sobe o bridge num subprocesso com todos os caminhos em um
+diretório temporário, liga o Claude de mentira (standin_claude.py) sobre o
+.claude.json desse diretório e gera carga por dois caminhos:
+  • http: POST /api/whatsapp-chat com N clientes concorrentes e M contatos;
+    latência = POST → corpo da resposta;
+  • arquivo: currentMessage em whatsapp_messages.json, uma mensagem por vez
+    (o arquivo legado só comporta uma); latência = gravação → injeção.
+
+O relatório traz p50/p95/p99, vazão, taxa de timeout (resposta padrão de
+falha ou mensagem nunca injetada), taxa de respostas trocadas (eco de outra
+mensagem) e taxa de 429 do agendador por contato (cujos limites ficam
+desligados, salvo com --rate-limit). A agregação de rajadas fica desligada,
+salvo com --aggregate <janela em s>; aí a resposta certa é o eco do lote
+que contém a mensagem. Com --save/--baseline o resultado vira
+um portão de regressão: sai com código 1 se algum p95 piorar além de
+--tolerance.
+
+Alvos: flask (pybridge.http_flask, precisa do Flask), simple (servidor com
+threads) e simple-async (servidor asyncio). O histórico do .claude.json
+guarda só as últimas 100 entradas; concorrência acima disso pode fazer o
+Claude de mentira perder mensagens, que aparecem como timeout.
+
+Uso:
+    python benchmarks/loadtest.py [-c 16] [-s 8] [-n 200] [--think exp:0.05]
+    python benchmarks/loadtest.py --save base.json
+    python benchmarks/loadtest.py --baseline base.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.standin_claude import StandinClaude
+from pybridge import core, launcher, logs
+
+# Alvo -> transporte (pybridge.launcher)
+TARGETS = {
+    'flask': 'flask',
+    'simple': 'threaded',
+    'simple-async': 'async',
+}
+
+# Código de saída do subprocesso quando o alvo não pode rodar aqui
+EXIT_UNAVAILABLE = 3
+
+
+def percentile(samples, q):
+    """Percentil por posto mais próximo (samples já ordenadas)"""
+    if not samples:
+        return None
+    index = min(len(samples) - 1, max(0, int(round(q * len(samples) + 0.5)) - 1))
+    return samples[index]
+
+
+def summarize(latencies, total, timeouts, misrouted, elapsed, throttled=0):
+    latencies = sorted(latencies)
+    return {
+        "requests": total,
+        "ok": len(latencies),
+        "p50_ms": _ms(percentile(latencies, 0.50)),
+        "p95_ms": _ms(percentile(latencies, 0.95)),
+        "p99_ms": _ms(percentile(latencies, 0.99)),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+        "timeout_rate": round(timeouts / total, 4) if total else 0.0,
+        "throttled_rate": round(throttled / total, 4) if total else 0.0,
+        "misrouted_rate": None if misrouted is None else round(misrouted / total, 4) if total else 0.0,
+    }
+
+
+def _ms(value):
+    return None if value is None else round(value * 1000, 2)
+
+
+# ---------------------------------------------------------------------------
+# Subprocesso: sobe um bridge isolado no diretório temporário
+# ---------------------------------------------------------------------------
+
+def serve(target, workdir, port, max_wait, rate_limit, aggregate):
+    try:
+        transport = launcher.load_transport(TARGETS[target])
+    except ImportError as error:
+        print(f"⚠️ {target} indisponível: {error}", file=sys.stderr)
+        sys.exit(EXIT_UNAVAILABLE)
+
+    core.WHATSAPP_MESSAGES_PATH = os.path.join(workdir, 'whatsapp_messages.json')
+    core.CLAUDE_RESPONSE_PATH = os.path.join(workdir, 'claude_response.json')
+    core.CLAUDE_CONFIG_PATH = os.path.join(workdir, '.claude.json')
+    core.CLAUDE_REPLIES_DIR = os.path.join(workdir, 'claude_replies')
+    core.WHATSAPP_SPOOL_DIR = os.path.join(workdir, 'whatsapp_spool')
+    core.BRIDGE_STORE_PATH = os.path.join(workdir, 'whatsapp_bridge.db')
+    core.CONVERSATION_LOG_DIR = os.path.join(workdir, 'conversation_log')
+    core.CLAUDE_MAX_WAIT = max_wait
+    core.AGGREGATION_QUIET_WINDOW = aggregate
+    if not rate_limit:
+        # Mede o bridge, não o agendador: poucos contatos mandando muito
+        core.SENDER_RATE_PER_MINUTE = core.SENDER_BURST = 10 ** 9
+        core.SENDER_MAX_QUEUED = core.SCHEDULER_MAX_IN_FLIGHT = 10 ** 9
+
+    bridge = transport.bridge_class()
+    # Mesmo logging da produção: o custo dele faz parte da medição
+    logs.setup()
+    bridge.start_monitoring()
+    transport.run(bridge, '127.0.0.1', port)
+
+
+# ---------------------------------------------------------------------------
+# Orquestrador
+# ---------------------------------------------------------------------------
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(base_url, proc, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(f'{base_url}/api/test', timeout=1) as resp:
+                resp.read()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+class Injections:
+    """Instantes em que o Claude de mentira viu cada mensagem injetada"""
+
+    def __init__(self):
+        self._seen = {}
+        self._cond = threading.Condition()
+
+    def record(self, _message_id, message, instant):
+        with self._cond:
+            self._seen[message] = instant
+            self._cond.notify_all()
+
+    def wait(self, message, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while message not in self._seen:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return self._seen[message]
+
+
+def run_http_load(base_url, target, count, concurrency, senders, timeout):
+    url = f'{base_url}/api/whatsapp-chat'
+    results = []
+    lock = threading.Lock()
+
+    def one(i):
+        message = f"carga {target} http {i}"
+        body = json.dumps({"senderId": f"bench-{i % senders}", "message": message}).encode()
+        request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=timeout + 10) as resp:
+                reply = json.loads(resp.read()).get('reply')
+            status = resp.status
+        except urllib.error.HTTPError as error:
+            reply, status = None, error.code
+        except (OSError, ValueError):
+            reply, status = None, None
+        elapsed = time.perf_counter() - started
+
+        if status == 429:
+            outcome = 'throttled'
+        elif reply == f"eco: {message}" or (
+            reply and reply.startswith('eco: ') and message in reply[len('eco: '):].split('\n')
+        ):
+            # Com --aggregate a resposta é o eco do lote inteiro
+            outcome = 'ok'
+        elif reply and reply.startswith('eco: '):
+            # Eco de outra mensagem: resposta entregue ao waiter errado
+            outcome = 'misrouted'
+        else:
+            # Resposta padrão de falha/timeout do bridge ou erro de rede
+            outcome = 'timeout'
+        with lock:
+            results.append((outcome, elapsed))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(count)))
+    wall = time.perf_counter() - started
+
+    return summarize(
+        [elapsed for outcome, elapsed in results if outcome == 'ok'],
+        count,
+        sum(1 for outcome, _ in results if outcome == 'timeout'),
+        sum(1 for outcome, _ in results if outcome == 'misrouted'),
+        wall,
+        sum(1 for outcome, _ in results if outcome == 'throttled')
+    )
+
+
+def run_file_load(workdir, injections, target, count, senders, timeout):
+    messages_path = os.path.join(workdir, 'whatsapp_messages.json')
+    latencies = []
+    lost = 0
+
+    started = time.perf_counter()
+    for i in range(count):
+        message = f"carga {target} arquivo {i}"
+        record = {"id": f"{int(time.time() * 1000)}{i:05d}", "senderId": f"bench-{i % senders}",
+                  "message": message, "timestamp": time.time()}
+        tmp_path = f"{messages_path}.tmp"
+        written = time.perf_counter()
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"currentMessage": record}, f, ensure_ascii=False)
+        os.replace(tmp_path, messages_path)
+
+        seen = injections.wait(message, timeout)
+        if seen is None:
+            lost += 1
+        else:
+            latencies.append(seen - written)
+    wall = time.perf_counter() - started
+
+    return summarize(latencies, count, lost, None, wall)
+
+
+def run_target(target, args):
+    workdir = tempfile.mkdtemp(prefix=f'bridge-load-{target}-')
+    with open(os.path.join(workdir, '.claude.json'), 'w', encoding='utf-8') as f:
+        f.write('{}')
+
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    log = open(os.path.join(workdir, 'bridge.log'), 'w', encoding='utf-8')
+    proc = subprocess.Popen(
+        [sys.executable, __file__, '--serve', target, '--workdir', workdir,
+         '--port', str(port), '--timeout', str(args.timeout)]
+        + (['--rate-limit'] if args.rate_limit else [])
+        + ['--aggregate', str(args.aggregate)],
+        stdout=log, stderr=subprocess.STDOUT, cwd=ROOT
+    )
+
+    injections = Injections()
+    standin = StandinClaude(os.path.join(workdir, '.claude.json'), think=args.think,
+                            on_injected=injections.record).start()
+    try:
+        if not wait_until_up(base_url, proc):
+            if proc.poll() == EXIT_UNAVAILABLE:
+                return {"skipped": "indisponível neste ambiente (veja bridge.log)", "workdir": workdir}
+            return {"skipped": "não subiu a tempo (veja bridge.log)", "workdir": workdir}
+
+        return {
+            "http": run_http_load(base_url, target, args.count, args.concurrency,
+                                  args.senders, args.timeout),
+            "file": run_file_load(workdir, injections, target, args.file_count,
+                                  args.senders, args.timeout),
+            "workdir": workdir,
+        }
+    finally:
+        standin.stop()
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        log.close()
+
+
+def print_report(report):
+    header = (f"{'alvo':<13} {'caminho':<8} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+              f" {'msg/s':>8} {'timeout':>8} {'429':>7} {'trocadas':>9}")
+    print(header)
+    print('-' * len(header))
+    for target, result in report["targets"].items():
+        if "skipped" in result:
+            print(f"{target:<13} {'—':<8} {result['skipped']}")
+            continue
+        for path in ('http', 'file'):
+            row = result[path]
+            misrouted = '—' if row['misrouted_rate'] is None else f"{row['misrouted_rate']:.2%}"
+            print(f"{target:<13} {path:<8} {row['requests']:>5} {_fmt(row['p50_ms'])} {_fmt(row['p95_ms'])}"
+                  f" {_fmt(row['p99_ms'])} {_fmt(row['throughput_rps'], 8)}"
+                  f" {row['timeout_rate']:>8.2%} {row.get('throttled_rate', 0):>7.2%} {misrouted:>9}")
+
+
+def _fmt(value, width=9):
+    return f"{'—':>{width}}" if value is None else f"{value:>{width}.1f}"
+
+
+def compare(report, baseline, tolerance):
+    """Lista de regressões de p95 (e de timeout/trocas) frente ao baseline"""
+    regressions = []
+    for target, result in report["targets"].items():
+        base = baseline.get("targets", {}).get(target)
+        if not base or "skipped" in result or "skipped" in base:
+            continue
+        for path in ('http', 'file'):
+            now, before = result[path], base[path]
+            if now['p95_ms'] and before['p95_ms'] and now['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{target}/{path}: p95 {before['p95_ms']} → {now['p95_ms']} ms")
+            for rate in ('timeout_rate', 'misrouted_rate', 'throttled_rate'):
+                if (now.get(rate) or 0) > (before.get(rate) or 0):
+                    regressions.append(f"{target}/{path}: {rate} {before[rate]} → {now[rate]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-t', '--targets', default=','.join(TARGETS),
+                        help='alvos separados por vírgula (flask,simple,simple-async)')
+    parser.add_argument('-n', '--count', type=int, default=200, help='requisições HTTP por alvo')
+    parser.add_argument('-c', '--concurrency', type=int, default=16, help='clientes HTTP simultâneos')
+    parser.add_argument('-s', '--senders', type=int, default=8, help='contatos distintos')
+    parser.add_argument('--file-count', type=int, default=20, help='mensagens pelo arquivo legado')
+    parser.add_argument('--think', default='exp:0.05', help='tempo de resposta do Claude de mentira')
+    parser.add_argument('--timeout', type=int, default=30, help='CLAUDE_MAX_WAIT do bridge (s)')
+    parser.add_argument('--rate-limit', action='store_true',
+                        help='mantém o agendador por contato com os limites de produção')
+    parser.add_argument('--aggregate', type=float, default=0, metavar='SECONDS',
+                        help='janela de silêncio da agregação por contato (0 desliga)')
+    parser.add_argument('--json', metavar='PATH', help='grava o relatório em JSON')
+    parser.add_argument('--save', metavar='PATH', help='grava o relatório como baseline')
+    parser.add_argument('--baseline', metavar='PATH', help='compara com um baseline salvo')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='piora aceitável do p95 (fração)')
+    parser.add_argument('--serve', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.workdir, args.port, args.timeout, args.rate_limit, args.aggregate)
+        return
+
+    report = {
+        "params": {"count": args.count, "concurrency": args.concurrency, "senders": args.senders,
+                   "file_count": args.file_count, "think": args.think, "timeout": args.timeout,
+                   "aggregate": args.aggregate},
+        "targets": {},
+    }
+    for target in args.targets.split(','):
+        print(f"🚀 {target}...", file=sys.stderr)
+        report["targets"][target] = run_target(target, args)
+
+    print_report(report)
+
+    for path in (args.json, args.save):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("\n❌ Regressões em relação ao baseline:")
+            for line in regressions:
+                print(f"   • {line}")
+            sys.exit(1)
+        print("\n✅ Sem regressões em relação ao baseline")
+
+
+if __name__ == '__main__':
+    main()
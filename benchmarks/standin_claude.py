@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+"Claude" de mentira para testes de carga offline.
+
+Observa o histórico injetado num .claude.json (temporário) e, para cada
+mensagem nova, grava a resposta no caminho indicado no prompt depois de um
+tempo de "pensamento" sorteado. A resposta ecoa o texto recebido
+("eco: <mensagem>"), o que permite ao gerador de carga detectar respostas
+entregues à mensagem errada.
+
+Distribuições de tempo de pensamento (--think):
+    fixed:0.2           sempre 0.2 s
+    uniform:0.1:0.5     uniforme entre 0.1 e 0.5 s
+    exp:0.3             exponencial com média 0.3 s
+    lognormal:-1.5:0.5  lognormal (mu, sigma do log)
+
+Uso:
+    python benchmarks/standin_claude.py /tmp/x/.claude.json [--think exp:0.3]
+"""
+
+import argparse
+import heapq
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pybridge.watcher import create_watcher
+
+HISTORY_PROJECT = '/home/user'
+ID_PATTERN = re.compile(r'\*\*ID:\*\* (\S+)')
+# A mensagem pode ter várias linhas (lote agregado do mesmo contato)
+MESSAGE_PATTERN = re.compile(r'\*\*Mensagem:\*\* "(.*?)"\n🆔', re.DOTALL)
+REPLY_PATH_PATTERN = re.compile(r'salvar em:\n`([^`]+)`')
+
+
+def parse_think(spec):
+    """Converte a especificação do --think numa função sem argumentos"""
+    kind, *params = spec.split(':')
+    params = [float(p) for p in params]
+    if kind == 'fixed':
+        return lambda: params[0]
+    if kind == 'uniform':
+        return lambda: random.uniform(params[0], params[1])
+    if kind == 'exp':
+        return lambda: random.expovariate(1.0 / params[0])
+    if kind == 'lognormal':
+        return lambda: random.lognormvariate(params[0], params[1])
+    raise ValueError(f'distribuição desconhecida: {spec}')
+
+
+class StandinClaude:
+    """Responde às mensagens injetadas no .claude.json"""
+
+    def __init__(self, config_path, think='fixed:0', legacy_path=None, on_injected=None):
+        self.config_path = config_path
+        self.think = parse_think(think)
+        # Com legacy_path todas as respostas vão para o arquivo único antigo
+        self.legacy_path = legacy_path
+        # Chamado como on_injected(message_id, message, instante) ao ver a injeção
+        self.on_injected = on_injected
+        self.running = False
+        self.answered = 0
+
+        self._seen = set()
+        self._schedule = []
+        self._cond = threading.Condition()
+        self._watcher = None
+        self._threads = []
+
+    def start(self):
+        self.running = True
+        self._watcher = create_watcher([self.config_path], poll_interval=0.05)
+        for target in (self._watch_loop, self._reply_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self.running = False
+        self._watcher.wake()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._watcher.close()
+
+    def _watch_loop(self):
+        while self.running:
+            self._scan()
+            self._watcher.wait(0.5)
+
+    def _scan(self):
+        try:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            history = config['projects'][HISTORY_PROJECT]['history']
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+
+        now = time.monotonic()
+        # O histórico é mais recente primeiro; responde na ordem de chegada
+        for entry in reversed(history):
+            display = entry.get('display', '')
+            id_match = ID_PATTERN.search(display)
+            if not id_match or id_match.group(1) in self._seen:
+                continue
+            message_id = id_match.group(1)
+            self._seen.add(message_id)
+
+            message_match = MESSAGE_PATTERN.search(display)
+            path_match = REPLY_PATH_PATTERN.search(display)
+            message = message_match.group(1) if message_match else ''
+            if self.on_injected:
+                self.on_injected(message_id, message, time.perf_counter())
+
+            reply_path = self.legacy_path or (path_match and path_match.group(1))
+            if not reply_path:
+                continue
+            with self._cond:
+                heapq.heappush(self._schedule, (now + self.think(), message_id, message, reply_path))
+                self._cond.notify()
+
+    def _reply_loop(self):
+        while self.running:
+            with self._cond:
+                while self.running and (
+                    not self._schedule or self._schedule[0][0] > time.monotonic()
+                ):
+                    timeout = self._schedule[0][0] - time.monotonic() if self._schedule else None
+                    self._cond.wait(timeout)
+                if not self.running:
+                    return
+                _due, message_id, message, reply_path = heapq.heappop(self._schedule)
+            self._write_reply(message_id, message, reply_path)
+
+    def _write_reply(self, message_id, message, reply_path):
+        payload = {"reply": f"eco: {message}"}
+        if self.legacy_path:
+            payload["message_id"] = message_id
+        # Grava via rename, como o Write tool, para o bridge nunca ler pela metade
+        tmp_path = f"{reply_path}.{message_id}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, reply_path)
+            self.answered += 1
+        except OSError as error:
+            print(f"❌ Falha ao gravar resposta {message_id}: {error}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('config_path', help='.claude.json observado')
+    parser.add_argument('--think', default='exp:0.3', help='distribuição do tempo de resposta')
+    parser.add_argument('--legacy-response', metavar='PATH',
+                        help='grava todas as respostas neste arquivo único (formato antigo)')
+    args = parser.parse_args()
+
+    standin = StandinClaude(args.config_path, think=args.think, legacy_path=args.legacy_response,
+                            on_injected=lambda mid, msg, _t: print(f"📥 {mid}: \"{msg}\""))
+    standin.start()
+    print(f"🤖 Claude de mentira observando {args.config_path} (think={args.think})")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        standin.stop()
+        print(f"\n🛑 {standin.answered} respostas gravadas")
+
+
+if __name__ == '__main__':
+    main()
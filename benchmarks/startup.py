@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Tempo de partida do bridge em cada transporte (Flask x threads x asyncio).
+
+Para cada alvo (os mesmos do loadtest.py), mede em subprocessos novos:
+  • import: `python -X importtime` de carregar o launcher e o transporte
+    escolhido (o que o supervisor paga antes de construir o bridge), com o
+    total e os módulos mais caros;
+  • partida: do spawn do processo até o primeiro GET /api/test respondido,
+    com o bridge isolado num diretório temporário (como no loadtest.py).
+
+Cada medida é repetida --repeat vezes e o relatório traz a mediana.
+
+Uso:
+    python benchmarks/startup.py [-t flask,simple,simple-async] [-r 5] [--top 8]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.loadtest import TARGETS, free_port
+
+LOADTEST = os.path.join(ROOT, 'benchmarks', 'loadtest.py')
+# "import time:      self [us] |  cumulative | imported package"
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+READY_TIMEOUT = 20
+
+
+def import_profile(transport):
+    """{módulo: (self µs, cumulativo µs, nível)} de importar launcher + transporte;
+    None se o transporte não importa aqui"""
+    code = f"from pybridge import launcher; launcher.load_transport({transport!r})"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, cwd=ROOT)
+    if result.returncode != 0:
+        return None
+    profile = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            profile[name] = (int(own), int(cumulative), len(indent) // 2)
+    return profile
+
+
+def baseline_modules():
+    """Módulos que o interpretador importa de qualquer jeito (site, encodings...)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'pass'],
+                            capture_output=True, text=True, cwd=ROOT)
+    return {match.group(4) for match in map(IMPORT_LINE.match, result.stderr.splitlines()) if match}
+
+
+def time_to_ready(target):
+    """Segundos do spawn até /api/test responder; None se o alvo não subir"""
+    workdir = tempfile.mkdtemp(prefix=f'bridge-startup-{target}-')
+    with open(os.path.join(workdir, '.claude.json'), 'w', encoding='utf-8') as f:
+        f.write('{}')
+    port = free_port()
+    url = f'http://127.0.0.1:{port}/api/test'
+    log = open(os.path.join(workdir, 'bridge.log'), 'w', encoding='utf-8')
+
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, LOADTEST, '--serve', target, '--workdir', workdir,
+         '--port', str(port), '--timeout', '30'],
+        stdout=log, stderr=subprocess.STDOUT, cwd=ROOT
+    )
+    try:
+        # Poll curto (10 ms): o wait_until_up do loadtest dorme 100 ms entre tentativas
+        while time.perf_counter() - started < READY_TIMEOUT:
+            if proc.poll() is not None:
+                return None
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resp:
+                    resp.read()
+                return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        return None
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        log.close()
+
+
+def run_target(target, repeat, top, baseline):
+    transport = TARGETS[target]
+    profiles = [import_profile(transport) for _ in range(repeat)]
+    if any(profile is None for profile in profiles):
+        return {"skipped": "transporte indisponível neste ambiente"}
+
+    # Só os imports de primeiro nível fora da partida do interpretador: o
+    # cumulativo deles é o custo do bridge
+    totals = [sum(cumulative for name, (_, cumulative, level) in profile.items()
+                  if level == 0 and name not in baseline) for profile in profiles]
+    last = profiles[-1]
+    heaviest = sorted(((name, cumulative) for name, (_, cumulative, level) in last.items()
+                       if level == 0 and name not in baseline),
+                      key=lambda item: item[1], reverse=True)[:top]
+
+    ready = [time_to_ready(target) for _ in range(repeat)]
+    if any(seconds is None for seconds in ready):
+        return {"skipped": "não subiu a tempo"}
+
+    return {
+        "import_ms": round(statistics.median(totals) / 1000, 1),
+        "modules": sum(1 for name in last if name not in baseline),
+        "asyncio": 'asyncio' in last,
+        "flask": 'flask' in last,
+        "ready_ms": round(statistics.median(ready) * 1000, 1),
+        "heaviest": [{"module": name, "ms": round(us / 1000, 1)} for name, us in heaviest],
+    }
+
+
+def print_report(report):
+    header = f"{'alvo':<13} {'import ms':>10} {'módulos':>8} {'asyncio':>8} {'flask':>6} {'partida ms':>11}"
+    print(header)
+    print('-' * len(header))
+    for target, result in report["targets"].items():
+        if "skipped" in result:
+            print(f"{target:<13} {result['skipped']}")
+            continue
+        print(f"{target:<13} {result['import_ms']:>10.1f} {result['modules']:>8}"
+              f" {'sim' if result['asyncio'] else 'não':>8} {'sim' if result['flask'] else 'não':>6}"
+              f" {result['ready_ms']:>11.1f}")
+
+    for target, result in report["targets"].items():
+        if result.get("heaviest"):
+            print(f"\n📦 {target}: imports mais caros (cumulativo)")
+            for row in result["heaviest"]:
+                print(f"   {row['ms']:>7.1f} ms  {row['module']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-t', '--targets', default=','.join(TARGETS),
+                        help=f'alvos separados por vírgula ({",".join(TARGETS)})')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='repetições de cada medida')
+    parser.add_argument('--top', type=int, default=8, help='imports mais caros no relatório')
+    parser.add_argument('--json', metavar='PATH', help='grava o relatório em JSON')
+    args = parser.parse_args()
+
+    baseline = baseline_modules()
+    report = {"params": {"repeat": args.repeat, "python": sys.version.split()[0]}, "targets": {}}
+    for target in args.targets.split(','):
+        print(f"🚀 {target}...", file=sys.stderr)
+        report["targets"][target] = run_target(target, args.repeat, args.top, baseline)
+
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latência do watcher: polling (comportamento antigo) x inotify.
+
+Mede, com o bridge (transporte com threads) rodando sobre arquivos temporários:
+  • mensagem → injeção: da gravação de whatsapp_messages.json até o
+    .claude.json ser reescrito pelo monitor;
+  • resposta → HTTP: da gravação do arquivo de resposta até o POST
+    /api/whatsapp-chat devolver o corpo ao cliente.
+
+Uso:
+    python benchmarks/watcher_latency.py [-n 20]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import HTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ID_PATTERN = re.compile(r'\*\*ID:\*\* (\S+)')
+
+
+def last_injected_id(config_path):
+    """ID da mensagem mais recente no histórico (None se ilegível)"""
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        display = config['projects']['/home/user']['history'][0]['display']
+    except (OSError, ValueError, KeyError, IndexError):
+        # Ainda vazio ou lido no meio da escrita do .claude.json
+        return None
+    return ID_PATTERN.search(display).group(1)
+
+
+def wait_for_injection(config_path, previous_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        current = last_injected_id(config_path)
+        if current is not None and current != previous_id:
+            return current
+        time.sleep(0.0005)
+    raise TimeoutError(config_path)
+
+
+def summarize(samples):
+    samples = sorted(s * 1000 for s in samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return (f"média {statistics.mean(samples):8.1f} ms | p50 {statistics.median(samples):8.1f} ms"
+            f" | p95 {p95:8.1f} ms | máx {samples[-1]:8.1f} ms")
+
+
+def run_backend(backend, count):
+    os.environ['BRIDGE_WATCHER'] = backend
+    from pybridge import core
+    from pybridge.http_threaded import WhatsAppHandler
+
+    tmp = tempfile.mkdtemp(prefix='bridge-bench-')
+    core.WHATSAPP_MESSAGES_PATH = os.path.join(tmp, 'whatsapp_messages.json')
+    core.CLAUDE_RESPONSE_PATH = os.path.join(tmp, 'claude_response.json')
+    core.CLAUDE_CONFIG_PATH = os.path.join(tmp, '.claude.json')
+    core.CLAUDE_REPLIES_DIR = os.path.join(tmp, 'claude_replies')
+    core.WHATSAPP_SPOOL_DIR = os.path.join(tmp, 'whatsapp_spool')
+    core.BRIDGE_STORE_PATH = os.path.join(tmp, 'whatsapp_bridge.db')
+    core.CONVERSATION_LOG_DIR = os.path.join(tmp, 'conversation_log')
+    with open(core.CLAUDE_CONFIG_PATH, 'w', encoding='utf-8') as f:
+        f.write('{}')
+
+    bridge = core.ClaudeBridge()
+    if backend == 'poll':
+        # Mesmo passo de polling das respostas de antes
+        bridge.mailbox.poll_interval = 1.0
+    bridge.start_monitoring()
+
+    server = HTTPServer(('127.0.0.1', 0), WhatsAppHandler)
+    server.bridge = bridge
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/api/whatsapp-chat'
+
+    inject_samples = []
+    reply_samples = []
+    last_id = None
+    time.sleep(0.5)
+
+    # 1) mensagem (arquivo) → injeção
+    for i in range(count):
+        message_id = f'9{i:06d}'
+        message = {'id': message_id, 'senderId': 'bench', 'message': f'msg {i}',
+                   'timestamp': time.time()}
+        t0 = time.perf_counter()
+        with open(core.WHATSAPP_MESSAGES_PATH, 'w', encoding='utf-8') as f:
+            json.dump({'currentMessage': message}, f)
+        last_id = wait_for_injection(core.CLAUDE_CONFIG_PATH, last_id)
+        inject_samples.append(time.perf_counter() - t0)
+        # Libera a thread que o monitor deixou aguardando
+        with open(bridge.mailbox.reply_path(message_id), 'w', encoding='utf-8') as f:
+            json.dump({'reply': 'ok'}, f)
+        time.sleep(0.05)
+
+    # 2) resposta → HTTP
+    for i in range(count):
+        done = {}
+
+        def post():
+            body = json.dumps({'senderId': 'bench', 'message': f'http {i}'}).encode()
+            req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                resp.read()
+            done['t1'] = time.perf_counter()
+
+        client = threading.Thread(target=post)
+        client.start()
+        message_id = last_id = wait_for_injection(core.CLAUDE_CONFIG_PATH, last_id)
+        time.sleep(0.05)
+        t0 = time.perf_counter()
+        with open(bridge.mailbox.reply_path(message_id), 'w', encoding='utf-8') as f:
+            json.dump({'reply': f'resposta {i}'}, f)
+        client.join()
+        reply_samples.append(done['t1'] - t0)
+
+    bridge.running = False
+    bridge.mailbox.close()
+    server.shutdown()
+    print(json.dumps({'inject': inject_samples, 'reply': reply_samples}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--count', type=int, default=20)
+    parser.add_argument('--backend', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        run_backend(args.backend, args.count)
+        return
+
+    for backend, label in (('poll', 'antes (polling 2s/1s)'), ('inotify', 'depois (inotify)')):
+        proc = subprocess.run(
+            [sys.executable, __file__, '--backend', backend, '-n', str(args.count)],
+            capture_output=True, text=True, check=True
+        )
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"\n{label}")
+        print(f"  mensagem → injeção : {summarize(result['inject'])}")
+        print(f"  resposta → HTTP    : {summarize(result['reply'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+"""
+Componentes compartilhados pelas pontes Python (claude_bridge.py e
+claude_bridge_simple.py): o bridge em pybridge.core e os transportes HTTP
+em pybridge.http_*, escolhidos por pybridge.launcher.
+"""
@@ -0,0 +1,188 @@
+"""
+Agregação de mensagens em rajada do mesmo contato antes da injeção.
+
+Quem digita manda várias mensagens seguidas ("oi" / "tudo bem?" / "queria
+saber o preço"). Mensagens do mesmo senderId que chegam dentro da janela de
+silêncio entram no mesmo lote; o lote fecha quando o contato fica
+`quiet_window` segundos sem mandar nada (ou depois de `max_wait` desde a
+primeira, ou com `max_messages`). O lote vira um único prompt para o Claude
+e todas as requisições dele recebem a mesma resposta.
+
+    batch, leader = aggregator.join(sender_id, message_id, message)
+    if leader:
+        message_id, message = aggregator.close(batch)   # espera a janela
+        ...                                             # injeta e aguarda
+        batch.resolve(resultado)
+    else:
+        resultado = batch.future.result(timeout)        # resposta do lote
+
+Com um CancelToken, close(batch, token) para de esperar assim que o prazo
+do líder acaba ou o cliente cai e devolve None com o lote ainda aberto:
+sozinho, o líder chama abandon(); com outras mensagens no lote, alguém
+precisa seguir com ele.
+
+Com quiet_window <= 0 cada mensagem é o seu próprio lote (sem espera).
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+from pybridge.cancel import MESSAGES_WITHDRAWN
+from pybridge.metrics import REGISTRY
+
+AGGREGATED_MESSAGES = REGISTRY.counter(
+    'bridge_aggregated_messages_total', 'Mensagens juntadas a um lote já aberto do mesmo contato'
+)
+AGGREGATION_BATCH_SIZE = REGISTRY.histogram(
+    'bridge_aggregation_batch_size', 'Mensagens por prompt injetado',
+    buckets=(1, 2, 3, 5, 8, 13)
+)
+
+
+class Batch:
+    """Mensagens de um contato que viram um único prompt"""
+
+    def __init__(self, sender_id, now):
+        self.sender_id = sender_id
+        self.parts = []
+        self.first_at = now
+        self.last_at = now
+        self.closed = False
+        # Resolvido pelo líder com o resultado da ida ao Claude
+        self.future = Future()
+
+    @property
+    def message_id(self):
+        # O lote usa o id da primeira mensagem
+        return self.parts[0][0]
+
+    @property
+    def message(self):
+        return '\n'.join(text for _message_id, text in self.parts)
+
+    def resolve(self, result):
+        if not self.future.done():
+            self.future.set_result(result)
+
+    def fail(self, error):
+        if not self.future.done():
+            self.future.set_exception(error)
+
+
+class MessageAggregator:
+    def __init__(self, quiet_window=4, max_wait=10, max_messages=10):
+        self.quiet_window = quiet_window
+        self.max_wait = max_wait
+        self.max_messages = max_messages
+
+        # senderId -> lote ainda aberto
+        self._batches = {}
+        self._cond = threading.Condition()
+        self.batches = 0
+        self.merged = 0
+
+    def join(self, sender_id, message_id, message):
+        """Coloca a mensagem no lote aberto do contato; (lote, líder)"""
+        now = time.monotonic()
+        with self._cond:
+            batch = self._batches.get(sender_id)
+            if batch is None:
+                batch = Batch(sender_id, now)
+                batch.parts.append((message_id, message))
+                self.batches += 1
+                if self.quiet_window > 0:
+                    self._batches[sender_id] = batch
+                else:
+                    self._close(batch)
+                return batch, True
+
+            batch.parts.append((message_id, message))
+            batch.last_at = now
+            self.merged += 1
+            if len(batch.parts) >= self.max_messages:
+                self._close(batch)
+            # Acorda o líder para recalcular o prazo
+            self._cond.notify_all()
+        AGGREGATED_MESSAGES.inc()
+        return batch, False
+
+    def close(self, batch, token=None):
+        """Espera a janela de silêncio do lote e o fecha; (message_id, texto).
+        None se o token foi cancelado antes (o lote continua aberto)"""
+        if token is None:
+            return self._close_when_quiet(batch, None)
+        with token.on_cancel(self._wake):
+            return self._close_when_quiet(batch, token)
+
+    def _close_when_quiet(self, batch, token):
+        with self._cond:
+            while not batch.closed:
+                remaining = self._deadline(batch) - time.monotonic()
+                if remaining <= 0:
+                    self._close(batch)
+                    break
+                if token is not None:
+                    if token.cancelled:
+                        return None
+                    remaining = token.remaining(remaining)
+                self._cond.wait(remaining)
+        return batch.message_id, batch.message
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    async def close_async(self, batch):
+        """Versão asyncio de close (não ocupa thread)"""
+        import asyncio  # só o transporte asyncio chega aqui
+        while True:
+            with self._cond:
+                if batch.closed:
+                    break
+                remaining = self._deadline(batch) - time.monotonic()
+                if remaining <= 0:
+                    self._close(batch)
+                    break
+            await asyncio.sleep(remaining)
+        return batch.message_id, batch.message
+
+    def withdraw(self, batch, message_id):
+        """Tira a mensagem de um lote ainda aberto (cliente desistiu);
+        False se o lote já fechou e a mensagem vai no prompt"""
+        with self._cond:
+            if batch.closed:
+                return False
+            batch.parts = [part for part in batch.parts if part[0] != message_id]
+        MESSAGES_WITHDRAWN.labels(stage='aggregation').inc()
+        return True
+
+    def abandon(self, batch):
+        """O líder desistiu: fecha o lote se ele é o único interessado (True);
+        com outras requisições no lote, False e o lote segue para elas"""
+        with self._cond:
+            if len(batch.parts) > 1:
+                return False
+            if not batch.closed:
+                self._close(batch)
+                MESSAGES_WITHDRAWN.labels(stage='aggregation').inc()
+        return True
+
+    def stats(self):
+        with self._cond:
+            return {
+                "quiet_window": self.quiet_window,
+                "open_batches": len(self._batches),
+                "batches": self.batches,
+                "merged": self.merged,
+            }
+
+    def _deadline(self, batch):
+        return min(batch.last_at + self.quiet_window, batch.first_at + self.max_wait)
+
+    def _close(self, batch):
+        # Chamado com self._cond adquirido
+        batch.closed = True
+        if self._batches.get(batch.sender_id) is batch:
+            del self._batches[batch.sender_id]
+        AGGREGATION_BATCH_SIZE.observe(len(batch.parts))
@@ -0,0 +1,207 @@
+"""
+Servidor HTTP/1.1 mínimo sobre asyncio (somente biblioteca padrão).
+
+Cada conexão vira uma coroutine, então milhares de requisições paradas
+esperando resposta do Claude custam só memória, não threads. O handler
+recebe um `Request` e devolve um `Response` (ou `StreamResponse`):
+
+    async def handler(request):
+        if request.path == '/api/test':
+            return json_response({"ok": True})
+        return Response(404)
+
+    server = await serve(handler, '0.0.0.0', 3001)
+"""
+
+import asyncio
+import json
+import urllib.parse
+from http import HTTPStatus
+
+from pybridge import logs
+
+log = logs.get_logger('http')
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 10 * 1024 * 1024
+# De quanto em quanto tempo um handler em espera confere se o cliente caiu
+DISCONNECT_CHECK_INTERVAL = 1.0
+
+
+class ClientDisconnected(Exception):
+    """O cliente fechou a conexão antes da resposta"""
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=''):
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    def __init__(self, method, target, version, headers, body):
+        self.method = method
+        self.version = version
+        self.headers = headers
+        self.body = body
+
+        parsed = urllib.parse.urlsplit(target)
+        self.path = parsed.path
+        self.query = dict(urllib.parse.parse_qsl(parsed.query))
+
+    def json(self):
+        if not self.body:
+            return {}
+        return json.loads(self.body.decode('utf-8'))
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+
+class Response:
+    def __init__(self, status=200, body=b'', headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    def encode(self, keep_alive):
+        reason = HTTPStatus(self.status).phrase
+        headers = dict(self.headers)
+        headers['Content-Length'] = str(len(self.body))
+        headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        lines = [f'HTTP/1.1 {self.status} {reason}']
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + self.body
+
+
+class StreamResponse:
+    """Resposta em streaming (ex.: SSE): `chunks` é um gerador assíncrono de bytes.
+    O fim do corpo é marcado pelo fechamento da conexão."""
+
+    def __init__(self, chunks, status=200, headers=None):
+        self.chunks = chunks
+        self.status = status
+        self.headers = headers or {}
+
+    def encode_head(self):
+        reason = HTTPStatus(self.status).phrase
+        headers = dict(self.headers)
+        headers['Connection'] = 'close'
+        lines = [f'HTTP/1.1 {self.status} {reason}']
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+def json_response(data, status=200):
+    body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    return Response(status, body, {'Content-type': 'application/json'})
+
+
+async def _read_request(reader):
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as error:
+        if not error.partial:
+            return None  # Cliente fechou a conexão ociosa
+        raise HTTPError(400, 'Requisição incompleta')
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431, 'Cabeçalhos grandes demais')
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ', 2)
+    except ValueError:
+        raise HTTPError(400, 'Linha de requisição inválida')
+
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length') or 0)
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, 'Corpo grande demais')
+    body = await reader.readexactly(length) if length else b''
+
+    return Request(method.upper(), target, version, headers, body)
+
+
+async def _run_handler(handler, request, reader, writer):
+    """Roda o handler; se a conexão cair no meio, cancela a task (as esperas
+    por vaga/resposta terminam e a mensagem sai da fila). EOF na leitura não
+    conta: o cliente pode ter só fechado o envio (shutdown(SHUT_WR)) e ainda
+    aguardar a resposta; vale a perda da conexão informada pelo transporte"""
+    task = asyncio.ensure_future(handler(request))
+    try:
+        while True:
+            done, _pending = await asyncio.wait({task}, timeout=DISCONNECT_CHECK_INTERVAL)
+            if done:
+                return task.result()
+            if writer.is_closing():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                raise ClientDisconnected()
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+
+async def _handle_connection(handler, reader, writer):
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except HTTPError as error:
+                writer.write(Response(error.status).encode(keep_alive=False))
+                await writer.drain()
+                return
+            if request is None:
+                return
+
+            try:
+                response = await _run_handler(handler, request, reader, writer)
+            except ClientDisconnected:
+                return
+            except Exception as error:
+                log.error(f"❌ Erro na API: {error}")
+                response = json_response({"reply": "Erro interno do servidor."}, 500)
+
+            if isinstance(response, StreamResponse):
+                writer.write(response.encode_head())
+                await writer.drain()
+                try:
+                    async for chunk in response.chunks:
+                        writer.write(chunk)
+                        await writer.drain()
+                finally:
+                    await response.chunks.aclose()
+                return
+
+            keep_alive = request.keep_alive
+            writer.write(response.encode(keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                return
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(handler, host, port):
+    """Inicia o servidor; retorna o asyncio.Server já escutando"""
+    return await asyncio.start_server(
+        lambda r, w: _handle_connection(handler, r, w),
+        host, port,
+        limit=MAX_HEADER_BYTES,
+        backlog=1024
+    )
@@ -0,0 +1,252 @@
+"""
+Prazo por requisição e cancelamento das esperas quando o cliente desiste.
+
+O gateway do WhatsApp informa quanto tempo ainda vai esperar (header
+`X-Request-Timeout` em segundos ou campo "timeout" no corpo), limitado pelo
+teto do servidor. Cada requisição ganha um CancelToken com esse prazo e as
+esperas (fila do agendador, lote do contato, resposta do Claude) terminam
+assim que o prazo acaba ou a conexão cai, em vez de segurar a thread por
+2 minutos. Mensagens ainda não injetadas saem da fila.
+
+    token = CancelToken.from_request(data, headers, cap=120)
+    with disconnect_watcher.watch(connection, token):
+        if not token.wait(future, timeout=120):
+            ...                     # token.reason: 'deadline', 'disconnect' ou None
+
+No servidor asyncio a queda da conexão cancela a task do handler
+(aio_http); o token serve só para o prazo.
+"""
+
+import selectors
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from pybridge import logs
+from pybridge.metrics import REGISTRY
+
+log = logs.get_logger('cancel')
+
+DEADLINE_HEADER = 'X-Request-Timeout'
+
+WAITS_CANCELLED = REGISTRY.counter(
+    'bridge_waits_cancelled_total', 'Esperas encerradas antes do tempo', ['reason']
+)
+WAIT_RECLAIMED_SECONDS = REGISTRY.counter(
+    'bridge_wait_reclaimed_seconds_total',
+    'Segundos de espera economizados por prazo esgotado ou cliente desconectado', ['reason']
+)
+MESSAGES_WITHDRAWN = REGISTRY.counter(
+    'bridge_messages_withdrawn_total', 'Mensagens retiradas antes da injeção', ['stage']
+)
+
+
+class RequestCancelled(Exception):
+    """A requisição perdeu o prazo ('deadline') ou o cliente caiu ('disconnect')"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def requested_timeout(data, headers):
+    """Segundos que o cliente aceita esperar, ou None se não informou"""
+    value = headers.get(DEADLINE_HEADER) or headers.get(DEADLINE_HEADER.lower())
+    if value is None and isinstance(data, dict):
+        value = data.get('timeout')
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        return None
+    return timeout if timeout > 0 else None
+
+
+def reclaim(reason, seconds):
+    """Conta uma espera encerrada antes do tempo e os segundos economizados"""
+    WAITS_CANCELLED.labels(reason=reason).inc()
+    if seconds > 0:
+        WAIT_RECLAIMED_SECONDS.labels(reason=reason).inc(seconds)
+
+
+class CancelToken:
+    def __init__(self, deadline=None):
+        # Prazo em time.monotonic(); None = só o timeout de cada espera
+        self.deadline = deadline
+        self.reason = None
+        self._lock = threading.Lock()
+        self._events = set()
+
+    @classmethod
+    def from_request(cls, data, headers, cap):
+        timeout = requested_timeout(data, headers)
+        if timeout is None:
+            return cls()
+        return cls(time.monotonic() + min(timeout, cap))
+
+    def cancel(self, reason):
+        with self._lock:
+            if self.reason is not None:
+                return
+            self.reason = reason
+            events = list(self._events)
+        for event in events:
+            event.set()
+
+    @property
+    def cancelled(self):
+        if self.reason is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel('deadline')
+        return self.reason is not None
+
+    @contextmanager
+    def on_cancel(self, callback):
+        """Chama callback() se o token for cancelado dentro do bloco (para
+        esperas em Condition, que não enxergam o Event de wait())"""
+        waker = _Waker(callback)
+        with self._lock:
+            self._events.add(waker)
+            cancelled = self.reason is not None
+        if cancelled:
+            callback()
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._events.discard(waker)
+
+    def check(self):
+        """Levanta RequestCancelled se o prazo acabou ou o cliente caiu"""
+        if self.cancelled:
+            raise RequestCancelled(self.reason)
+
+    def remaining(self, timeout):
+        """timeout limitado pelo prazo da requisição"""
+        if self.deadline is None:
+            return timeout
+        return max(0.0, min(timeout, self.deadline - time.monotonic()))
+
+    def wait(self, future, timeout):
+        """Espera o Future por até `timeout` (limitado pelo prazo); True se resolveu"""
+        started = time.monotonic()
+        done = threading.Event()
+        future.add_done_callback(lambda _future: done.set())
+        with self._lock:
+            self._events.add(done)
+            if self.reason is not None:
+                done.set()
+        try:
+            done.wait(self.remaining(timeout))
+        finally:
+            with self._lock:
+                self._events.discard(done)
+
+        if future.done():
+            return True
+        if self.cancelled:
+            reclaim(self.reason, timeout - (time.monotonic() - started))
+        return False
+
+    async def wait_async(self, future, timeout):
+        """Versão asyncio de wait; a queda do cliente chega como CancelledError
+        da task (o Future em si não é cancelado)"""
+        import asyncio  # só o transporte asyncio chega aqui
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                                   timeout=self.remaining(timeout))
+        except asyncio.TimeoutError:
+            if self.cancelled:
+                reclaim(self.reason, timeout - (time.monotonic() - started))
+            return False
+        except asyncio.CancelledError:
+            reclaim('disconnect', timeout - (time.monotonic() - started))
+            raise
+        return True
+
+
+class _Waker:
+    """Adapta um callback à interface de Event usada por cancel()"""
+
+    def __init__(self, callback):
+        self.set = callback
+
+
+class DisconnectWatcher:
+    """Uma thread observa os sockets das requisições em espera e cancela o
+    token quando o cliente fecha a conexão"""
+
+    def __init__(self):
+        self._selector = None
+        self._lock = threading.Lock()
+        self._wake_r = self._wake_w = None
+
+    @contextmanager
+    def watch(self, sock, token):
+        if sock is None:
+            yield token
+            return
+        self._ensure_started()
+        try:
+            self._selector.register(sock, selectors.EVENT_READ, token)
+        except (KeyError, ValueError, OSError):
+            # Socket já observado ou fechado
+            yield token
+            return
+        self._wake()
+        try:
+            yield token
+        finally:
+            try:
+                self._selector.unregister(sock)
+            except (KeyError, ValueError, OSError):
+                pass
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._selector is not None:
+                return
+            self._selector = selectors.DefaultSelector()
+            self._wake_r, self._wake_w = socket.socketpair()
+            self._wake_r.setblocking(False)
+            self._selector.register(self._wake_r, selectors.EVENT_READ)
+            threading.Thread(target=self._run, daemon=True, name='disconnect-watcher').start()
+
+    def _wake(self):
+        # Alguns seletores (select/poll) só enxergam sockets novos na próxima volta
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            pass
+
+    def _run(self):
+        while True:
+            for key, _events in self._selector.select():
+                if key.fileobj is self._wake_r:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                    continue
+
+                sock, token = key.fileobj, key.data
+                try:
+                    sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+                    lost = False
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    lost = True
+                try:
+                    self._selector.unregister(sock)
+                except (KeyError, ValueError, OSError):
+                    pass
+                # Só erro (reset) é queda. EOF pode ser só o fim do envio
+                # (shutdown(SHUT_WR)) com o cliente ainda aguardando; dados
+                # são a próxima requisição. Em ambos para de observar
+                if lost:
+                    token.cancel('disconnect')
+
+
+disconnect_watcher = DisconnectWatcher()
@@ -0,0 +1,282 @@
+"""
+Escritor único do ~/.claude.json com group commit.
+
+Todas as injeções passam por uma fila limitada consumida por uma única
+thread. As mutações que chegam dentro de uma janela curta são aplicadas
+juntas em um só ciclo ler → alterar → gravar, e o arquivo é publicado de
+forma atômica (arquivo temporário + fsync + os.replace), então o Claude
+nunca lê um JSON truncado e duas injeções simultâneas não se perdem.
+
+Vários processos do bridge podem gravar o mesmo arquivo: cada ciclo
+ler → alterar → gravar roda com flock num arquivo ao lado
+(`.claude.json.lock`), então um processo nunca sobrescreve as injeções do
+outro. O lock também guarda um contador de gravações, incrementado a cada
+publicação.
+
+O config já parseado fica em memória e só é reaproveitado, dentro do lock,
+se o contador não mudou (nenhum outro bridge gravou) e a assinatura do
+arquivo (st_mtime_ns, st_size, st_ino) também não (o próprio Claude Code não
+alterou o arquivo). `indent=None` grava em formato compacto.
+
+    writer = ConfigWriter('/home/user/.claude.json')
+    future = writer.submit(lambda config: config.setdefault('x', 1))
+    future.result()   # True quando o arquivo foi gravado
+"""
+
+import fcntl
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from pybridge import jsonlib
+from pybridge.fsutil import write_atomic
+from pybridge.cancel import MESSAGES_WITHDRAWN
+from pybridge.metrics import REGISTRY
+
+CONFIG_IO_SECONDS = REGISTRY.histogram(
+    'bridge_config_io_seconds',
+    'Tempo de cada etapa do ciclo ler/alterar/gravar do .claude.json',
+    ['stage']
+)
+CONFIG_BATCH_SIZE = REGISTRY.histogram(
+    'bridge_config_batch_size',
+    'Injeções agrupadas em cada gravação do .claude.json',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500)
+)
+CONFIG_CACHE = REGISTRY.counter(
+    'bridge_config_cache_total',
+    'Leituras do config servidas pelo cache (hit) ou pelo disco (miss)',
+    ['result']
+)
+CONFIG_QUEUE_DEPTH = REGISTRY.gauge(
+    'bridge_config_queue_depth',
+    'Injeções aguardando o escritor do .claude.json'
+)
+
+
+class ConfigWriter:
+    def __init__(self, path, window=0.025, max_queue=1000, max_batch=500, indent=2):
+        self.path = path
+        # Quanto tempo esperar por mais mutações depois da primeira
+        self.window = window
+        self.max_batch = max_batch
+        self.indent = indent
+        self.running = True
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        CONFIG_QUEUE_DEPTH.set_function(self._queue.qsize)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # Cache do config parseado, a assinatura do arquivo e o contador de
+        # gravações do lock que o geraram
+        self._cached_config = None
+        self._cached_signature = None
+        self._cached_generation = None
+        self.lock_path = path + '.lock'
+        self._lock_fd = None
+
+        # Estatísticas simples para /api/status
+        self.commits = 0
+        self.mutations = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def submit(self, mutation):
+        """Enfileira mutation(config) e retorna um Future resolvido após a gravação.
+        Com a fila cheia o Future já volta com queue.Full (backpressure)."""
+        future = Future()
+        if not self.running:
+            future.set_exception(RuntimeError('Escritor do config encerrado'))
+            return future
+
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((mutation, future))
+        except queue.Full:
+            future.set_exception(queue.Full('Fila de escrita do config cheia'))
+        return future
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def close(self, timeout=5):
+        """Grava o que já está na fila e encerra a thread"""
+        self.running = False
+        if self._thread is not None:
+            self._queue.put((None, None))
+            self._thread.join(timeout)
+        if self._lock_fd is not None and (self._thread is None or not self._thread.is_alive()):
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name='config-writer',
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _next_batch(self):
+        """Bloqueia pela primeira mutação e junta as que chegarem na janela"""
+        first = self._queue.get()
+        batch = [first]
+        if first[0] is None:
+            return batch
+
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item[0] is None:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = any(mutation is None for mutation, _ in batch)
+            batch = [(mutation, future) for mutation, future in batch if mutation is not None]
+
+            if batch:
+                self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch):
+        # Injeções canceladas enquanto esperavam na fila (cliente desistiu) saem do lote
+        pending = [(mutation, future) for mutation, future in batch if future.set_running_or_notify_cancel()]
+        if len(pending) < len(batch):
+            MESSAGES_WITHDRAWN.labels(stage='config_writer').inc(len(batch) - len(pending))
+        batch = pending
+        if not batch:
+            return
+
+        try:
+            generation = self._lock()
+        except OSError as error:
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        try:
+            self._apply(batch, generation)
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _lock(self):
+        """flock exclusivo no arquivo ao lado; retorna o contador de gravações"""
+        if self._lock_fd is None:
+            self._lock_fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        with CONFIG_IO_SECONDS.labels(stage='lock').time():
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            return int(os.pread(self._lock_fd, 32, 0) or 0)
+        except ValueError:
+            return 0
+
+    def _apply(self, batch, generation):
+        # Chamado com o flock adquirido: ler, alterar e gravar sem outro processo no meio
+        CONFIG_BATCH_SIZE.observe(len(batch))
+        while True:
+            try:
+                config = self._load(generation)
+            except Exception as error:
+                for _, future in batch:
+                    future.set_exception(error)
+                return
+
+            applied = []
+            for mutation, future in batch:
+                try:
+                    mutation(config)
+                    applied.append((mutation, future))
+                except Exception as error:
+                    future.set_exception(error)
+            if len(applied) == len(batch):
+                break
+            # A mutação que falhou pode ter deixado o dict em cache pela
+            # metade: recomeça do disco só com as que deram certo
+            self._invalidate()
+            batch = applied
+            if not batch:
+                return
+        applied = [future for _, future in applied]
+
+        try:
+            self._write_atomic(config, generation + 1)
+        except Exception as error:
+            # O dict em memória já tem mutações que não foram gravadas
+            self._invalidate()
+            for future in applied:
+                future.set_exception(error)
+            return
+
+        self.commits += 1
+        self.mutations += len(applied)
+        for future in applied:
+            future.set_result(True)
+
+    @staticmethod
+    def _signature(st):
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _invalidate(self):
+        self._cached_config = None
+        self._cached_signature = None
+        self._cached_generation = None
+
+    def _load(self, generation):
+        """Config atual: do cache se ninguém gravou o arquivo, senão do disco"""
+        try:
+            signature = self._signature(os.stat(self.path))
+        except OSError:
+            self._invalidate()
+            raise
+
+        if (self._cached_config is not None and generation == self._cached_generation
+                and signature == self._cached_signature):
+            self.cache_hits += 1
+            CONFIG_CACHE.labels(result='hit').inc()
+            return self._cached_config
+
+        self.cache_misses += 1
+        CONFIG_CACHE.labels(result='miss').inc()
+        self._invalidate()
+        with CONFIG_IO_SECONDS.labels(stage='read').time():
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+        with CONFIG_IO_SECONDS.labels(stage='parse').time():
+            config = jsonlib.loads(raw)
+        self._cached_config = config
+        self._cached_signature = signature
+        self._cached_generation = generation
+        return config
+
+    def _write_atomic(self, config, generation):
+        with CONFIG_IO_SECONDS.labels(stage='serialize').time():
+            data = jsonlib.dumps(config, indent=self.indent)
+
+        with CONFIG_IO_SECONDS.labels(stage='write').time():
+            self._publish(config, data, generation)
+
+    def _publish(self, config, data, generation):
+        st = write_atomic(self.path, data, fsync=True, keep_mode=True, sync_dir=True)
+        # Avisa os outros processos que o cache deles ficou velho
+        os.pwrite(self._lock_fd, b'%020d' % generation, 0)
+        # O dict em memória continua válido até alguém mais alterar o arquivo
+        self._cached_config = config
+        self._cached_signature = self._signature(st)
+        self._cached_generation = generation
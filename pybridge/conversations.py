@@ -0,0 +1,90 @@
+"""
+Estado de conversa por remetente (senderId).
+
+Cada contato tem seu próprio ring buffer (`deque(maxlen=...)`) com as
+últimas mensagens e respostas, e a injeção inclui só o contexto daquele
+contato. Um orçamento global de memória (em caracteres) limita o total:
+quando estourado, os contatos ociosos há mais tempo (LRU) são descartados.
+
+    conversations = ConversationStore(per_sender=20, memory_budget=2_000_000)
+    conversations.add('5516...', 'user', 'oi')
+    conversations.recent('5516...', 6)   # [(role, texto, timestamp), ...]
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+ROLE_LABELS = {'user': '👤 Contato', 'assistant': '🤖 Claude'}
+
+
+class ConversationStore:
+    def __init__(self, per_sender=20, memory_budget=2_000_000):
+        self.per_sender = per_sender
+        self.memory_budget = memory_budget
+
+        # senderId -> deque de (role, texto, timestamp); ordem = LRU
+        self._senders = OrderedDict()
+        self._lock = threading.Lock()
+        self._chars = 0
+        self.evicted_senders = 0
+
+    def add(self, sender_id, role, text):
+        """Registra um turno na conversa do contato"""
+        if sender_id is None or not text:
+            return
+        text = str(text)
+        with self._lock:
+            turns = self._senders.get(sender_id)
+            if turns is None:
+                turns = self._senders[sender_id] = deque(maxlen=self.per_sender)
+            else:
+                self._senders.move_to_end(sender_id)
+
+            if len(turns) == turns.maxlen:
+                # O deque descartaria sozinho; tiramos antes para manter a conta
+                self._chars -= len(turns.popleft()[1])
+            turns.append((role, text, time.time()))
+            self._chars += len(text)
+
+            self._evict(keep=sender_id)
+
+    def recent(self, sender_id, limit=None):
+        """Últimos turnos do contato, do mais antigo para o mais recente"""
+        with self._lock:
+            turns = self._senders.get(sender_id)
+            if not turns:
+                return []
+            self._senders.move_to_end(sender_id)
+            turns = list(turns)
+        return turns[-limit:] if limit else turns
+
+    def stats(self):
+        with self._lock:
+            return {
+                "senders": len(self._senders),
+                "memory_chars": self._chars,
+                "memory_budget": self.memory_budget,
+                "evicted_senders": self.evicted_senders
+            }
+
+    def _evict(self, keep):
+        # Chamado com self._lock adquirido
+        while self._chars > self.memory_budget and len(self._senders) > 1:
+            sender_id = next(iter(self._senders))
+            if sender_id == keep:
+                self._senders.move_to_end(sender_id)
+                continue
+            turns = self._senders.pop(sender_id)
+            self._chars -= sum(len(text) for _role, text, _ts in turns)
+            self.evicted_senders += 1
+
+
+def format_turns(turns, max_chars=500):
+    """Texto do contexto para o prompt injetado"""
+    lines = []
+    for role, text, _ts in turns:
+        if len(text) > max_chars:
+            text = text[:max_chars] + '…'
+        lines.append(f'{ROLE_LABELS.get(role, role)}: {text}')
+    return '\n'.join(lines)
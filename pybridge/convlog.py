@@ -0,0 +1,566 @@
+"""
+Log de conversas segmentado, somente append, com índice por contato.
+
+Substitui o conversation_log.json (um dict único reescrito a cada troca):
+cada troca concluída vira uma linha JSON no segmento ativo e o índice em
+memória guarda, por senderId, a posição (segmento, offset) das últimas
+`index_depth` trocas. Buscar as últimas N trocas de um contato lê só essas
+N linhas, sem passar pelo histórico dos outros.
+
+    conversation_log = ConversationLog('/home/user/conversation_log')
+    conversation_log.record(sender_id, message, reply, message_id)
+    conversation_log.recent(sender_id, 10)   # [{timestamp, message, reply, ...}]
+
+Arquivos no diretório:
+    00000001.jsonl.gz ...   segmentos selados (gzip opcional)
+    00000007.jsonl          segmento ativo
+    index.json              índice salvo a cada rotação (reconstruível)
+
+O segmento ativo é selado quando passa de `segment_bytes` ou de
+`segment_max_age` segundos; a compressão dos selados e a compactação
+(últimas `keep_per_sender` trocas por contato e/ou idade máxima) rodam numa
+thread de manutenção. Os offsets são sempre do conteúdo descomprimido, então
+o índice não muda quando um segmento é comprimido.
+
+Um único processo escreve no diretório (trava com flock). Para compactar
+com o bridge parado:
+
+    python -m pybridge.convlog compact /home/user/conversation_log --keep 500
+"""
+
+import argparse
+import atexit
+import fcntl
+import gzip
+import json
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+
+from pybridge import logs
+from pybridge.fsutil import iso_utc, remove_if_exists, write_atomic
+from pybridge.metrics import REGISTRY
+
+log = logs.get_logger('convlog')
+
+SEGMENT_PATTERN = re.compile(r'^(\d{8})\.jsonl(\.gz)?$')
+
+CONVLOG_RECORDS = REGISTRY.counter(
+    'bridge_conversation_log_records_total', 'Trocas gravadas no log de conversas'
+)
+CONVLOG_ROTATIONS = REGISTRY.counter(
+    'bridge_conversation_log_rotations_total', 'Segmentos do log de conversas selados'
+)
+
+
+def parse_limit(value, default=20):
+    """?limit= da consulta de conversa (inteiro positivo)"""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, limit)
+
+
+class ConversationLogLocked(RuntimeError):
+    """Outro processo já escreve neste diretório"""
+
+
+class ConversationLog:
+    def __init__(self, directory, segment_bytes=4 * 1024 * 1024, segment_max_age=24 * 3600,
+                 compress=True, index_depth=100, keep_per_sender=None, max_age=None,
+                 compact_interval=6 * 3600, fsync=False):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_max_age = segment_max_age
+        self.compress = compress
+        # Quantas posições por contato ficam no índice (limite do recent())
+        self.index_depth = index_depth
+        # Política da compactação automática (None = sem limite)
+        self.keep_per_sender = keep_per_sender
+        self.max_age = max_age
+        # None desliga a compactação automática
+        self.compact_interval = compact_interval
+        self.fsync = fsync
+
+        self._lock = threading.RLock()
+        # senderId -> deque de (segmento, offset)
+        self._index = {}
+        # Segmentos comprimidos já descomprimidos (poucos, LRU), por
+        # (compactação, segmento): o gzip não tem seek barato, então o custo é
+        # no máximo um segmento por leitura, feito fora do lock da escrita
+        self._sealed_cache = OrderedDict()
+        self._sealed_cache_size = 2
+        self._cache_lock = threading.Lock()
+        self._tasks = queue.Queue()
+        # Compressão e compactação nunca mexem nos segmentos ao mesmo tempo
+        self._maintenance_lock = threading.Lock()
+        self.records = 0
+        self.compactions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, '.lock'), 'a')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise ConversationLogLocked(f'{directory} já está em uso por outro processo')
+
+        self._open_active()
+        self._load_index()
+
+        self._maintenance = threading.Thread(target=self._maintenance_loop, daemon=True,
+                                             name='conversation-log')
+        self._maintenance.start()
+        atexit.register(self.close)
+
+    # ---- escrita --------------------------------------------------------
+
+    def record(self, sender_id, message, reply, message_id=None):
+        """Grava uma troca concluída (mensagem do contato + resposta)"""
+        now = time.time()
+        entry = {
+            "senderId": sender_id,
+            "messageId": message_id,
+            "timestamp": iso_utc(now),
+            "ts": now,
+            "message": message,
+            "reply": reply,
+        }
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+
+        with self._lock:
+            if self._fd is None:
+                return
+            if self._active_size and (
+                self._active_size + len(line) > self.segment_bytes
+                or now - self._active_started >= self.segment_max_age
+            ):
+                self._rotate()
+            offset = self._active_size
+            os.write(self._fd, line)
+            if self.fsync:
+                os.fsync(self._fd)
+            self._active_size += len(line)
+            if self._active_started is None:
+                self._active_started = now
+            self._remember(sender_id, (self._active, offset))
+            self.records += 1
+        CONVLOG_RECORDS.inc()
+
+    def _remember(self, sender_id, location):
+        locations = self._index.get(sender_id)
+        if locations is None:
+            locations = self._index[sender_id] = deque(maxlen=self.index_depth)
+        locations.append(location)
+
+    def _rotate(self):
+        """Sela o segmento ativo e abre o próximo (chamar com o lock)"""
+        os.close(self._fd)
+        sealed = self._active
+        self._active += 1
+        self._fd = os.open(self.segment_path(self._active),
+                           os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._active_size = 0
+        self._active_started = None
+        self._save_index()
+        CONVLOG_ROTATIONS.inc()
+        if self.compress:
+            self._tasks.put(('compress', sealed))
+
+    # ---- leitura --------------------------------------------------------
+
+    def recent(self, sender_id, limit=20):
+        """Últimas `limit` trocas do contato (até index_depth), mais antiga primeiro"""
+        while True:
+            with self._lock:
+                locations = list(self._index.get(sender_id, ()))[-limit:] if limit else []
+                generation = self.compactions
+            # Lê sem o lock (record() não espera a descompressão de um selado)
+            entries = [self._read_at(s, o, generation) for s, o in locations]
+            with self._lock:
+                if generation == self.compactions:
+                    return [entry for entry in entries if entry]
+            # A compactação trocou os segmentos no meio da leitura: relê com o índice novo
+
+    def history(self, sender_id):
+        """Todas as trocas do contato (varre o log inteiro; para exportação)"""
+        return [entry for entry in self._scan() if entry.get('senderId') == sender_id]
+
+    def export_json(self, path):
+        """Gera o conversation_log.json legado ({senderId: [{timestamp, message, reply}]})"""
+        conversations = {}
+        for entry in self._scan():
+            conversations.setdefault(entry.get('senderId'), []).append(
+                {"timestamp": entry.get('timestamp'), "message": entry.get('message'),
+                 "reply": entry.get('reply')}
+            )
+        write_atomic(path, json.dumps(conversations, ensure_ascii=False, indent=2).encode('utf-8'))
+        return len(conversations)
+
+    def _read_at(self, segment, offset, generation):
+        try:
+            # Segmento ativo ou ainda não comprimido: seek direto na linha
+            with open(self.segment_path(segment), 'rb') as f:
+                f.seek(offset)
+                line = f.readline()
+        except FileNotFoundError:
+            data = self._compressed_bytes(segment, generation)
+            if data is None:
+                return None
+            end = data.find(b'\n', offset)
+            line = data[offset:end if end >= 0 else len(data)]
+        try:
+            return json.loads(line)
+        except ValueError:
+            log.warning(f"⚠️ Registro inválido no log de conversas: {segment}@{offset}")
+            return None
+
+    def _compressed_bytes(self, segment, generation):
+        key = (generation, segment)
+        with self._cache_lock:
+            data = self._sealed_cache.get(key)
+            if data is not None:
+                self._sealed_cache.move_to_end(key)
+                return data
+        try:
+            with gzip.open(self.segment_path(segment) + '.gz', 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        with self._cache_lock:
+            self._sealed_cache[key] = data
+            if len(self._sealed_cache) > self._sealed_cache_size:
+                self._sealed_cache.popitem(last=False)
+        return data
+
+    def _scan(self, segments=None):
+        """Registros do log em ordem (sem lock: segmentos selados não mudam)"""
+        for segment in segments or self.segments():
+            for _offset, entry in self._iter_segment(segment):
+                yield entry
+
+    def _iter_segment(self, segment, start=0):
+        path = self.segment_path(segment)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            try:
+                f = gzip.open(path + '.gz', 'rb')
+            except FileNotFoundError:
+                return
+        with f:
+            if start:
+                f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # registro ainda sendo gravado
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    entry = None
+                if entry is not None:
+                    yield offset, entry
+                offset += len(line)
+
+    # ---- segmentos e índice ---------------------------------------------
+
+    def segment_path(self, segment):
+        return os.path.join(self.directory, f'{segment:08d}.jsonl')
+
+    def segments(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted({int(m.group(1)) for m in map(SEGMENT_PATTERN.match, names) if m})
+
+    def _open_active(self):
+        segments = self.segments()
+        last = segments[-1] if segments else 1
+        # Um segmento já comprimido está selado: começa o próximo
+        self._active = last + 1 if os.path.exists(self.segment_path(last) + '.gz') else last
+        path = self.segment_path(self._active)
+        self._fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        size = os.fstat(self._fd).st_size
+        if size:
+            # Linha pela metade de uma queda: descarta para manter o alinhamento
+            with open(path, 'rb') as f:
+                data = f.read()
+            complete = data.rfind(b'\n') + 1
+            if complete != size:
+                os.ftruncate(self._fd, complete)
+                log.warning(f"⚠️ Log de conversas: {size - complete} bytes incompletos descartados")
+                size = complete
+        self._active_size = size
+        self._active_started = None
+        for _offset, entry in self._iter_segment(self._active):
+            self._active_started = entry.get('ts') or time.time()
+            break
+
+    def _load_index(self):
+        """Carrega o index.json e completa com o que foi gravado depois"""
+        path = os.path.join(self.directory, 'index.json')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (FileNotFoundError, ValueError):
+            saved = None
+
+        segments = self.segments()
+        if saved and saved.get('segments') == [s for s in segments if s <= saved.get('active')]:
+            for sender_id, locations in saved.get('senders', {}).items():
+                for segment, offset in locations:
+                    self._remember(sender_id, (segment, offset))
+            pending = [(s, saved['size'] if s == saved['active'] else 0)
+                       for s in segments if s >= saved['active']]
+        else:
+            if saved:
+                log.warning("⚠️ Índice do log de conversas desatualizado; reconstruindo")
+            pending = [(s, 0) for s in segments]
+
+        for segment, start in pending:
+            for offset, entry in self._iter_segment(segment, start):
+                self._remember(entry.get('senderId'), (segment, offset))
+
+    def _save_index(self):
+        # Chamado com o lock
+        data = {
+            "active": self._active,
+            "size": self._active_size,
+            "segments": [s for s in self.segments() if s <= self._active],
+            "senders": {sender: list(locations) for sender, locations in self._index.items()},
+        }
+        write_atomic(os.path.join(self.directory, 'index.json'),
+                      json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+    # ---- manutenção -----------------------------------------------------
+
+    def _maintenance_loop(self):
+        next_compaction = None
+        if self.compact_interval:
+            next_compaction = time.monotonic() + self.compact_interval
+        while True:
+            timeout = None
+            if next_compaction is not None:
+                timeout = max(0.0, next_compaction - time.monotonic())
+            try:
+                task = self._tasks.get(timeout=timeout)
+            except queue.Empty:
+                task = ('compact', None)
+            if task is None:
+                return
+            try:
+                if task[0] == 'compress':
+                    self._compress(task[1])
+                elif self.keep_per_sender or self.max_age:
+                    self.compact(self.keep_per_sender, self.max_age)
+            except Exception as error:
+                log.error(f"❌ Erro na manutenção do log de conversas: {error}")
+            if task[0] == 'compact' and next_compaction is not None:
+                next_compaction = time.monotonic() + self.compact_interval
+
+    def _compress(self, segment):
+        with self._maintenance_lock:
+            self._compress_locked(segment)
+
+    def _compress_locked(self, segment):
+        plain = self.segment_path(segment)
+        if segment == self._active or not os.path.exists(plain):
+            return
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{segment:08d}.', suffix='.gz', dir=self.directory)
+        try:
+            with open(plain, 'rb') as src, os.fdopen(fd, 'wb') as raw, \
+                    gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp_path, plain + '.gz')
+        except BaseException:
+            remove_if_exists(tmp_path)
+            raise
+        # Leituras já abertas no arquivo antigo continuam válidas
+        remove_if_exists(plain)
+
+    def compact(self, keep_per_sender=None, max_age=None):
+        """Reescreve os segmentos selados mantendo só as últimas `keep_per_sender`
+        trocas de cada contato e/ou as mais novas que `max_age` segundos"""
+        with self._maintenance_lock:
+            return self._compact_locked(keep_per_sender, max_age)
+
+    def _compact_locked(self, keep_per_sender, max_age):
+        with self._lock:
+            sealed = [s for s in self.segments() if s < self._active]
+            active, active_size = self._active, self._active_size
+        if not sealed:
+            return 0
+
+        # Trocas por contato no log todo: as mais novas contam para o limite
+        totals = {}
+        for segment in sealed + [active]:
+            for offset, entry in self._iter_segment(segment):
+                if segment == active and offset >= active_size:
+                    break
+                sender_id = entry.get('senderId')
+                totals[sender_id] = totals.get(sender_id, 0) + 1
+
+        cutoff = time.time() - max_age if max_age else None
+        seen = {}
+        outputs = []
+        new_locations = []
+        out = None
+        dropped = 0
+        try:
+            for segment in sealed:
+                for _offset, entry in self._iter_segment(segment):
+                    sender_id = entry.get('senderId')
+                    seen[sender_id] = seen.get(sender_id, 0) + 1
+                    newer = totals[sender_id] - seen[sender_id]
+                    if (keep_per_sender and newer >= keep_per_sender) or \
+                            (cutoff and entry.get('ts', cutoff) < cutoff):
+                        dropped += 1
+                        continue
+                    line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+                    if out is None or (out['size'] and out['size'] + len(line) > self.segment_bytes):
+                        if out is not None:
+                            out['file'].close()
+                        out = self._compaction_output(len(outputs))
+                        outputs.append(out)
+                    new_locations.append((sender_id, (sealed[0] + len(outputs) - 1, out['size'])))
+                    out['file'].write(line)
+                    out['size'] += len(line)
+            if out is not None:
+                out['file'].close()
+        except BaseException:
+            for output in outputs:
+                output['file'].close()
+                remove_if_exists(output['path'])
+            raise
+
+        with self._lock:
+            # Cada saída substitui um número antigo (há no máximo tantas saídas
+            # quanto selados): uma queda no meio duplica trocas, não perde
+            for position, output in enumerate(outputs):
+                target = self.segment_path(sealed[0] + position)
+                remove_if_exists(target)
+                os.replace(output['path'], target + ('.gz' if self.compress else ''))
+                if not self.compress:
+                    remove_if_exists(target + '.gz')
+            for segment in sealed[len(outputs):]:
+                remove_if_exists(self.segment_path(segment))
+                remove_if_exists(self.segment_path(segment) + '.gz')
+
+            index = {}
+            self._index, old_index = index, self._index
+            for sender_id, location in new_locations:
+                self._remember(sender_id, location)
+            for sender_id, locations in old_index.items():
+                for location in locations:
+                    if location[0] > sealed[-1]:
+                        self._remember(sender_id, location)
+            self.compactions += 1
+            with self._cache_lock:
+                self._sealed_cache.clear()
+            self._save_index()
+
+        log.info(f"🧹 Log de conversas compactado: {dropped} troca(s) removida(s), "
+                 f"{len(sealed)} → {len(outputs)} segmento(s)")
+        return dropped
+
+    def _compaction_output(self, number):
+        fd, path = tempfile.mkstemp(prefix=f'.compact.{number:08d}.', suffix='.tmp', dir=self.directory)
+        raw = os.fdopen(fd, 'wb')
+        if self.compress:
+            return {"path": path, "size": 0, "file": _GzipWriter(raw)}
+        return {"path": path, "size": 0, "file": raw}
+
+    # ---- estado ---------------------------------------------------------
+
+    def stats(self):
+        with self._lock:
+            segments = self.segments()
+            return {
+                "segments": len(segments),
+                "active_segment": self._active,
+                "active_bytes": self._active_size,
+                "indexed_senders": len(self._index),
+                "records": self.records,
+                "compactions": self.compactions,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._fd is None:
+                return
+            self._save_index()
+            os.close(self._fd)
+            self._fd = None
+        self._tasks.put(None)
+        self._maintenance.join(timeout=5)
+        self._lock_file.close()
+
+
+class _GzipWriter:
+    """GzipFile que fecha também o arquivo de baixo"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.gzip = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6)
+
+    def write(self, data):
+        self.gzip.write(data)
+
+    def close(self):
+        if not self.raw.closed:
+            self.gzip.close()
+            self.raw.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ferramentas do log de conversas do bridge')
+    commands = parser.add_subparsers(dest='command', required=True)
+    compact = commands.add_parser('compact', help='compacta os segmentos selados')
+    compact.add_argument('directory')
+    compact.add_argument('--keep', type=int, help='trocas mantidas por contato')
+    compact.add_argument('--max-age-days', type=float, help='descarta trocas mais antigas')
+    export = commands.add_parser('export', help='gera o conversation_log.json legado')
+    export.add_argument('directory')
+    export.add_argument('output')
+    show = commands.add_parser('recent', help='últimas trocas de um contato')
+    show.add_argument('directory')
+    show.add_argument('sender_id')
+    show.add_argument('-n', type=int, default=10)
+    args = parser.parse_args()
+
+    try:
+        conversation_log = ConversationLog(args.directory, compact_interval=None)
+    except ConversationLogLocked as error:
+        parser.exit(1, f"❌ {error} (pare o bridge antes)\n")
+
+    try:
+        if args.command == 'compact':
+            if args.keep is None and args.max_age_days is None:
+                parser.error('informe --keep e/ou --max-age-days')
+            with conversation_log._lock:
+                # Sela o ativo para que tudo entre na compactação
+                if conversation_log._active_size:
+                    conversation_log._rotate()
+            max_age = args.max_age_days * 86400 if args.max_age_days is not None else None
+            dropped = conversation_log.compact(args.keep, max_age)
+            print(f"🧹 {dropped} troca(s) removida(s)")
+        elif args.command == 'export':
+            senders = conversation_log.export_json(args.output)
+            print(f"📦 {senders} contato(s) exportado(s) para {args.output}")
+        else:
+            for entry in conversation_log.recent(args.sender_id, args.n):
+                print(json.dumps(entry, ensure_ascii=False))
+    finally:
+        conversation_log.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,929 @@
+"""
+Núcleo das pontes Python: configuração, métricas e a classe ClaudeBridge.
+
+Importar este módulo não cria nada nem sobe servidor: o bridge é construído
+explicitamente por quem vai servir (pybridge.launcher) ou testar. Os
+transportes HTTP ficam em módulos próprios, importados só quando escolhidos:
+
+    pybridge.http_flask     Flask (claude_bridge.py)
+    pybridge.http_threaded  http.server com uma thread por conexão
+    pybridge.http_async     asyncio (pybridge.aio_http)
+
+    bridge = ClaudeBridge()
+    bridge.start_monitoring()
+    ...
+    bridge.close()
+
+A configuração continua em constantes do módulo, lidas quando usadas:
+testes e benchmarks trocam os caminhos (core.CLAUDE_CONFIG_PATH = ...)
+antes de construir o bridge.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from pybridge import ingest, jsonlib, logs
+from pybridge.aggregator import MessageAggregator
+from pybridge.cancel import MESSAGES_WITHDRAWN, CancelToken, RequestCancelled
+from pybridge.config_writer import ConfigWriter
+from pybridge.conversations import ConversationStore, format_turns
+from pybridge.convlog import ConversationLog, ConversationLogLocked, parse_limit
+from pybridge.dedup import RETRY, ReplyDeduplicator
+from pybridge.followup import FollowupPusher
+from pybridge.hedge import Hedger, HedgedReply
+from pybridge.metrics import REGISTRY, Meter
+from pybridge.replies import ReplyMailbox
+from pybridge.responders import DEFAULT_RULES_PATH, KeywordResponder, ResponderChain
+from pybridge.scheduler import SenderScheduler, Throttled
+from pybridge.spool import Spool
+from pybridge.store import MessageStore, SqliteConversations
+from pybridge.trace import Tracer
+from pybridge.workers import WorkerPool
+from pybridge.watcher import create_watcher
+
+
+# Configuração
+WHATSAPP_MESSAGES_PATH = '/home/user/whatsapp_messages.json'
+CLAUDE_RESPONSE_PATH = '/home/user/claude_response.json'
+CLAUDE_CONFIG_PATH = '/home/user/.claude.json'
+CLAUDE_REPLIES_DIR = '/home/user/claude_replies'
+# Spool JSONL de entrada (o currentMessage legado é copiado para cá)
+WHATSAPP_SPOOL_DIR = '/home/user/whatsapp_spool'
+# Onde ficam fila, respostas e histórico: 'sqlite' (banco WAL compartilhado
+# entre processos do bridge) ou 'files' (spool + histórico em memória)
+BRIDGE_STORE = os.environ.get('BRIDGE_STORE', 'sqlite')
+BRIDGE_STORE_PATH = '/home/user/whatsapp_bridge.db'
+# Retenção no banco: mensagens tratadas e respostas; turnos do histórico
+# (que também ficam limitados a CONVERSATION_TURNS_PER_SENDER por contato)
+STORE_RETENTION = 7 * 24 * 3600
+STORE_HISTORY_RETENTION = 30 * 24 * 3600
+# Workers que aguardam as respostas das mensagens do monitor e tamanho da
+# fila; com todos os workers ocupados o monitor para de consumir o spool
+# (no máximo MONITOR_MAX_WORKERS mensagens do monitor com o Claude)
+MONITOR_MAX_WORKERS = 16
+MONITOR_QUEUE_SIZE = 64
+# Conversa por contato: turnos guardados, turnos enviados no prompt e
+# orçamento global (caracteres) antes de descartar contatos ociosos
+CONVERSATION_TURNS_PER_SENDER = 20
+CONVERSATION_PROMPT_TURNS = 6
+CONVERSATION_MEMORY_BUDGET = 2_000_000
+# Log de conversas segmentado (substitui o conversation_log.json): segmento
+# selado por tamanho ou idade e comprimido; a compactação guarda as últimas
+# trocas de cada contato dentro da retenção
+CONVERSATION_LOG_DIR = '/home/user/conversation_log'
+CONVERSATION_LOG_SEGMENT_BYTES = 4 * 1024 * 1024
+CONVERSATION_LOG_SEGMENT_MAX_AGE = 24 * 3600
+CONVERSATION_LOG_KEEP_PER_SENDER = 500
+CONVERSATION_LOG_RETENTION = 180 * 24 * 3600
+# Tamanho máximo do histórico do projeto no .claude.json
+CLAUDE_HISTORY_LIMIT = 100
+
+log = logs.get_logger()
+
+# Métricas expostas em GET /api/metrics
+MESSAGES_TOTAL = REGISTRY.counter(
+    'bridge_messages_total', 'Mensagens recebidas do WhatsApp', ['source']
+)
+REPLY_WAIT_SECONDS = REGISTRY.histogram(
+    'bridge_claude_reply_wait_seconds', 'Espera pela resposta do Claude', ['outcome']
+)
+REPLY_TIMEOUTS = REGISTRY.counter(
+    'bridge_claude_reply_timeouts_total', 'Mensagens sem resposta do Claude no prazo'
+)
+MONITOR_LAG_SECONDS = REGISTRY.histogram(
+    'bridge_monitor_lag_seconds', 'Atraso entre a entrada no spool e o processamento pelo monitor'
+)
+MONITOR_RATE = REGISTRY.gauge(
+    'bridge_monitor_messages_per_second', 'Mensagens processadas pelo monitor (média de 60 s)'
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    'bridge_http_requests_in_flight', 'Requisições HTTP em andamento'
+)
+# Grava o .claude.json sem indentação (menor e mais rápido de serializar)
+CLAUDE_CONFIG_COMPACT = False
+
+# Tempo máximo de espera pela resposta do Claude (segundos)
+CLAUDE_MAX_WAIT = 120
+FALLBACK_REPLY = "Desculpe, não consegui processar sua mensagem no momento. Tente novamente."
+INJECT_ERROR_REPLY = "Erro interno do servidor. Tente novamente."
+# Mensagens repetidas do mesmo contato reaproveitam a resposta por este tempo (s)
+REPLY_CACHE_TTL = 30
+# Retenção das respostas por chave de idempotência do cliente (s)
+IDEMPOTENCY_TTL = 600
+REPLY_CACHE_MAX_ENTRIES = 1000
+# Agregação: mensagens do mesmo contato separadas por menos que a janela de
+# silêncio viram um único prompt (até o prazo máximo ou o limite de
+# mensagens); 0 desliga
+AGGREGATION_QUIET_WINDOW = 4
+AGGREGATION_MAX_WAIT = 10
+AGGREGATION_MAX_MESSAGES = 10
+# Agendador por contato: taxa e rajada do token bucket, fila por contato e
+# mensagens aguardando o Claude ao mesmo tempo
+SENDER_RATE_PER_MINUTE = 12
+SENDER_BURST = 5
+SENDER_MAX_QUEUED = 3
+SCHEDULER_MAX_IN_FLIGHT = 32
+SCHEDULER_MAX_QUEUE_WAIT = 30
+# Números atendidos antes dos demais (BRIDGE_PRIORITY_SENDERS="5516...,5511...")
+PRIORITY_SENDERS = {
+    sender.strip() for sender in os.environ.get('BRIDGE_PRIORITY_SENDERS', '').split(',')
+    if sender.strip()
+}
+THROTTLED_REPLY = "Muitas mensagens em pouco tempo. Aguarde um instante e tente novamente."
+# Quanto uma mensagem agregada espera pela resposta do lote
+AGGREGATION_FOLLOWER_WAIT = AGGREGATION_MAX_WAIT + SCHEDULER_MAX_QUEUE_WAIT + CLAUDE_MAX_WAIT
+
+# Hedge: sem resposta do Claude até o p95 observado (no mínimo HEDGE_MIN_SECONDS,
+# no máximo o orçamento da requisição), o respondedor local responde antes se
+# alguma regra específica casar (a regra "any" não conta) e a resposta do
+# Claude fica num ticket como follow-up, empurrada para BRIDGE_FOLLOWUP_URL.
+# Sem essa URL ninguém entregaria a resposta tardia: o hedge fica desligado
+FOLLOWUP_URL = os.environ.get('BRIDGE_FOLLOWUP_URL', '').strip()
+HEDGE_ENABLED = bool(FOLLOWUP_URL)
+HEDGE_QUANTILE = 0.95
+HEDGE_DEFAULT_SECONDS = 60
+HEDGE_MIN_SECONDS = 15
+LOCAL_RESPONDER_RULES = DEFAULT_RULES_PATH
+# Consulta das últimas trocas de um contato: GET /api/conversations/<senderId>
+CONVERSATIONS_PREFIX = '/api/conversations/'
+BATCH_PATH = '/api/whatsapp-chat/batch'
+# Traces por mensagem guardados em memória (GET /api/trace/<id>); os mais
+# antigos saem primeiro
+TRACE_CAPACITY = 2048
+
+
+class ClaudeBridge:
+    def __init__(self, title='Claude Bridge Python'):
+        self.title = title
+        self.last_processed_id = None
+        self.running = True
+        self.mailbox = ReplyMailbox(CLAUDE_REPLIES_DIR, legacy_path=CLAUDE_RESPONSE_PATH)
+        self.workers = WorkerPool(MONITOR_MAX_WORKERS, MONITOR_QUEUE_SIZE, name='monitor-worker')
+        self.monitor_meter = Meter()
+        MONITOR_RATE.set_function(self.monitor_meter.rate)
+        if BRIDGE_STORE == 'sqlite':
+            # Vários processos compartilham a fila e o histórico pelo banco
+            self.store = MessageStore(BRIDGE_STORE_PATH, retention=STORE_RETENTION,
+                                      history_retention=STORE_HISTORY_RETENTION)
+            self.spool = self.store.inbox
+            # Inserções de outros processos chegam como escrita no -wal
+            self.inbox_watch_path = BRIDGE_STORE_PATH + '-wal'
+            self.inbox_modified = [self.inbox_watch_path]
+            self.conversations = SqliteConversations(
+                self.store, per_sender=CONVERSATION_TURNS_PER_SENDER
+            )
+        else:
+            self.store = None
+            self.spool = Spool(WHATSAPP_SPOOL_DIR)
+            self.inbox_watch_path = WHATSAPP_SPOOL_DIR
+            self.inbox_modified = []
+            self.conversations = ConversationStore(
+                per_sender=CONVERSATION_TURNS_PER_SENDER,
+                memory_budget=CONVERSATION_MEMORY_BUDGET
+            )
+        try:
+            self.conversation_log = ConversationLog(
+                CONVERSATION_LOG_DIR,
+                segment_bytes=CONVERSATION_LOG_SEGMENT_BYTES,
+                segment_max_age=CONVERSATION_LOG_SEGMENT_MAX_AGE,
+                keep_per_sender=CONVERSATION_LOG_KEEP_PER_SENDER,
+                max_age=CONVERSATION_LOG_RETENTION
+            )
+        except ConversationLogLocked as error:
+            # Outro processo do bridge já grava o log (o histórico segue no store)
+            log.warning(f"⚠️ Log de conversas desativado: {error}")
+            self.conversation_log = None
+        # Vagas justas por contato na frente da injeção
+        self.scheduler = SenderScheduler(
+            rate=SENDER_RATE_PER_MINUTE / 60,
+            burst=SENDER_BURST,
+            max_in_flight=SCHEDULER_MAX_IN_FLIGHT,
+            max_queued_per_sender=SENDER_MAX_QUEUED,
+            max_queue_wait=SCHEDULER_MAX_QUEUE_WAIT,
+            priority_senders=PRIORITY_SENDERS
+        )
+        # Rajadas do mesmo contato viram um único prompt
+        self.aggregator = MessageAggregator(
+            quiet_window=AGGREGATION_QUIET_WINDOW,
+            max_wait=AGGREGATION_MAX_WAIT,
+            max_messages=AGGREGATION_MAX_MESSAGES
+        )
+        # Resposta local quando o Claude passa do ponto de hedge (só regras
+        # específicas; a resposta genérica não substitui a do Claude)
+        self.responders = ResponderChain([KeywordResponder.from_file(LOCAL_RESPONDER_RULES, fallback=False)])
+        self.hedger = Hedger(
+            quantile=HEDGE_QUANTILE,
+            default_delay=HEDGE_DEFAULT_SECONDS,
+            min_delay=HEDGE_MIN_SECONDS,
+            enabled=HEDGE_ENABLED
+        )
+        # Entrega das respostas tardias do Claude ao gateway
+        self.followups = FollowupPusher(FOLLOWUP_URL) if FOLLOWUP_URL else None
+        # Duplicatas e retentativas compartilham uma única ida ao Claude
+        self.dedup = ReplyDeduplicator(
+            ttl=REPLY_CACHE_TTL,
+            idempotency_ttl=IDEMPOTENCY_TTL,
+            max_entries=REPLY_CACHE_MAX_ENTRIES
+        )
+        # Único escritor do .claude.json (group commit + escrita atômica)
+        self.config_writer = ConfigWriter(
+            CLAUDE_CONFIG_PATH,
+            indent=None if CLAUDE_CONFIG_COMPACT else 2
+        )
+        # Timestamps de cada etapa das últimas mensagens
+        self.tracer = Tracer(TRACE_CAPACITY)
+        self._id_lock = threading.Lock()
+        self._last_message_id = 0
+        # Sufixo dos ids deste processo: vários bridges dividem o store e o
+        # diretório de respostas, e os ids do lado Node são Date.now() puros
+        self.process_tag = uuid.uuid4().hex[:8]
+        print(f"🐍 {title} iniciado!")
+        print(f"📱 Monitorando: {WHATSAPP_MESSAGES_PATH}")
+        print(f"🧠 Injetando em: {CLAUDE_CONFIG_PATH}")
+        print(f"⏰ Iniciado em: {datetime.now().strftime('%d/%m/%Y, %H:%M:%S')}")
+        print("========================\n")
+
+    def new_message_id(self):
+        """Gera um message_id '<milissegundos>-<processo>', único mesmo sob
+        concorrência e entre processos do bridge (nomeia também o arquivo de
+        resposta, <id>.json)"""
+        with self._id_lock:
+            self._last_message_id = max(int(time.time() * 1000), self._last_message_id + 1)
+            return f'{self._last_message_id}-{self.process_tag}'
+
+    def submit_injection(self, sender_id, message, message_id):
+        """Enfileira a injeção no escritor do config; retorna um Future (True ao gravar)"""
+        return self.submit_injections([(sender_id, message, message_id)])
+
+    def submit_injections(self, messages):
+        """Várias mensagens (sender_id, message, message_id) numa única mutação,
+        ou seja, numa única gravação do config; retorna um Future (True ao gravar)"""
+        history_entries = [self._prepare_injection(*item) for item in messages]
+        injection = self.config_writer.submit(
+            lambda claude_config: self._add_history_entries(claude_config, history_entries)
+        )
+        for sender_id, message, message_id in messages:
+            injection.add_done_callback(self.tracer.mark_done(message_id, 'inject_end'))
+            injection.add_done_callback(
+                lambda future, sender_id=sender_id, message=message:
+                    self._record_user_turn(sender_id, message, future)
+            )
+            if self.store is not None:
+                injection.add_done_callback(
+                    lambda future, message_id=message_id: self._mark_injection(message_id, future)
+                )
+        return injection
+
+    def _prepare_injection(self, sender_id, message, message_id):
+        """Registra o waiter e o contexto da mensagem; retorna a entrada do histórico"""
+        # Cada mensagem tem seu próprio arquivo de resposta; o waiter é
+        # registrado antes da injeção para não perder respostas rápidas
+        reply_future = self.mailbox.expect(message_id)
+        reply_path = self.mailbox.reply_path(message_id)
+
+        # Só o contexto deste contato vai no prompt
+        context = self.conversations.recent(sender_id, CONVERSATION_PROMPT_TURNS)
+        context_block = ""
+        if context:
+            context_block = f"""
+🗂️ **Conversa recente com este contato:**
+{format_turns(context)}
+"""
+        if self.store is not None:
+            # Mensagens da API não passam pela inbox; registra para o status
+            self.store.track(message_id, sender_id, message)
+        reply_future.add_done_callback(
+            lambda future: self._record_reply(sender_id, message_id, message, future)
+        )
+        self.tracer.mark(message_id, 'inject_start')
+
+        # Preparar mensagem formatada para o Claude ver
+        whatsapp_message = f"""🔔 MENSAGEM WHATSAPP RECEBIDA!
+
+📱 **De:** {sender_id}
+💬 **Mensagem:** "{message}"
+🆔 **ID:** {message_id}
+⏰ **Horário:** {datetime.now().strftime('%d/%m/%Y, %H:%M:%S')}
+{context_block}
+🎯 **AÇÃO NECESSÁRIA:**
+Claude, por favor responda esta mensagem do WhatsApp usando Write tool para salvar em:
+`{reply_path}`
+
+Formato: `{{"reply": "sua resposta aqui"}}`
+
+Esta é uma mensagem REAL de um usuário do WhatsApp aguardando sua resposta!"""
+
+        # Criar entrada no histórico como se o usuário tivesse digitado
+        return {
+            "display": whatsapp_message,
+            "pastedContents": {}
+        }
+
+    def _record_user_turn(self, sender_id, message, injection):
+        """Turno do contato na conversa só depois que o Claude recebeu a
+        mensagem (falha, 429 ou desistência antes do commit não entram)"""
+        if injection.cancelled() or injection.exception() is not None:
+            return
+        self.conversations.add(sender_id, 'user', message)
+
+    def _mark_injection(self, message_id, injection):
+        if injection.cancelled():
+            # Cliente desistiu antes do commit: a mensagem nunca chegou ao Claude
+            status = 'withdrawn'
+        elif injection.exception() is not None:
+            status = 'failed'
+        else:
+            status = 'injected'
+        self.store.mark(message_id, status)
+
+    def find_ticket(self, message_id):
+        """(Future, prazo) do ticket; com o store, vale também para tickets
+        abertos por outro processo do bridge"""
+        ticket = self.mailbox.ticket(message_id)
+        if ticket is None and self.store is not None:
+            ticket = self.store.remote_ticket(message_id, CLAUDE_MAX_WAIT)
+        return ticket
+
+    def inject_message_to_claude_history(self, sender_id, message, message_id):
+        """Injeta mensagem no histórico do Claude Config"""
+        try:
+            # Aguarda o group commit que inclui esta mensagem
+            self.submit_injection(sender_id, message, message_id).result()
+
+            logs.event(log, 'message_injected', "✅ Mensagem INJETADA no Claude Config!",
+                       message_id=message_id, sender=sender_id)
+            return True
+            
+        except Exception as error:
+            logs.event(log, 'inject_failed', f"❌ Erro ao injetar no Claude Config: {error}",
+                       level=logging.ERROR, message_id=message_id, sender=sender_id)
+            self.mailbox.discard(message_id)
+            return False
+
+    def reply_to(self, sender_id, message, message_id, idempotency_key=None, token=None):
+        """Injeta e aguarda a resposta; retorna o texto para o cliente.
+        Mensagens repetidas em andamento ou recém-respondidas não voltam ao Claude.
+        Com `token`, as esperas terminam no prazo da requisição ou na queda do
+        cliente (RequestCancelled)"""
+        token = token or CancelToken()
+        key = self.dedup.key(sender_id, message, idempotency_key)
+        while True:
+            future, leader = self.dedup.claim(key)
+            if leader:
+                break
+            logs.event(log, 'duplicate_coalesced', "♻️ Mensagem repetida: usando a resposta da original",
+                       message_id=message_id, sender=sender_id)
+            if not token.wait(future, CLAUDE_MAX_WAIT):
+                token.check()
+                return FALLBACK_REPLY
+            if future.result() is not RETRY:
+                return future.result()
+
+        try:
+            reply, answer = self._reply_batched(sender_id, message, message_id, token)
+        except RequestCancelled:
+            self._hand_off_duplicates(key, future, message_id)
+            raise
+        except Throttled:
+            # Cada duplicata passa pelo próprio agendador (429 com Retry-After)
+            self.dedup.release(key, future)
+            raise
+        except BaseException:
+            self.dedup.resolve(key, future, INJECT_ERROR_REPLY, cache=False)
+            raise
+        # Só respostas reais ficam no cache; timeout/erro liberam a chave
+        self.dedup.resolve(key, future, answer, cache=bool(reply))
+        return answer
+
+    def _hand_off_duplicates(self, key, future, message_id):
+        """A líder desistiu. Com a mensagem já no Claude (a espera virou
+        ticket), as duplicatas recebem a resposta tardia; sem ela, a chave é
+        liberada e uma duplicata refaz o trabalho"""
+        pending = self.mailbox.waiter(message_id)
+        if pending is None:
+            self.dedup.release(key, future)
+            return
+
+        def resolve(reply_future):
+            reply = None if reply_future.cancelled() or reply_future.exception() else reply_future.result()
+            if reply:
+                self.dedup.resolve(key, future, reply)
+            else:
+                self.dedup.release(key, future)
+        pending.add_done_callback(resolve)
+
+    def _reply_batched(self, sender_id, message, message_id, token):
+        """Junta a mensagem ao lote do contato; (resposta do Claude, texto para o cliente).
+        Só o líder do lote passa pelo agendador e vai ao Claude"""
+        batch, leader = self.aggregator.join(sender_id, message_id, message)
+        if not leader:
+            logs.event(log, 'message_aggregated', "🧺 Mensagem juntada ao lote do contato",
+                       message_id=message_id, sender=sender_id, batch=batch.message_id)
+            self.tracer.annotate(message_id, batch=batch.message_id)
+            if not token.wait(batch.future, AGGREGATION_FOLLOWER_WAIT):
+                if token.cancelled:
+                    self.aggregator.withdraw(batch, message_id)
+                    raise RequestCancelled(token.reason)
+                return None, FALLBACK_REPLY
+            return batch.future.result()
+
+        # A janela do lote respeita o prazo do líder
+        if self.aggregator.close(batch, token) is None:
+            if not self.aggregator.abandon(batch):
+                # Outras mensagens no lote: ele segue sem o líder
+                self._run_batch_detached(sender_id, batch)
+            raise RequestCancelled(token.reason)
+
+        if len(batch.parts) == 1:
+            return self._run_batch(sender_id, batch, token)
+
+        # A ida ao Claude do lote não depende do prazo do líder: roda à parte
+        # e o líder espera o resultado como as outras requisições do lote
+        self._run_batch_detached(sender_id, batch)
+        if not token.wait(batch.future, AGGREGATION_FOLLOWER_WAIT):
+            token.check()
+            return None, FALLBACK_REPLY
+        return batch.future.result()
+
+    def _run_batch(self, sender_id, batch, token):
+        """Fecha o lote (se ainda aberto), injeta e aguarda; resolve batch.future"""
+        message_id, message = self.aggregator.close(batch)
+        self.tracer.mark(message_id, 'batch_closed')
+        self._log_batch(batch)
+        token = self._batch_token(batch, token)
+        result = (None, INJECT_ERROR_REPLY)
+        try:
+            # Vaga no agendador do contato; Throttled sobe para o handler (429)
+            with self.scheduler.slot(sender_id, token):
+                self.tracer.mark(message_id, 'slot_granted')
+                if self.inject_message_to_claude_history(sender_id, message, message_id):
+                    result = self._await_reply(sender_id, message, message_id, token)
+        except Throttled as throttled:
+            # As outras requisições do lote também recebem 429
+            batch.fail(throttled)
+            raise
+        finally:
+            batch.resolve(result)
+        return result
+
+    def _run_batch_detached(self, sender_id, batch):
+        """Lote com várias requisições: roda numa thread própria, sem prazo"""
+        def run():
+            try:
+                self._run_batch(sender_id, batch, CancelToken())
+            except Throttled:
+                pass  # já entregue ao lote por batch.fail
+            except Exception as error:
+                logs.event(log, 'batch_failed', f"❌ Erro no lote do contato: {error}",
+                           level=logging.ERROR, sender=sender_id, batch=batch.message_id)
+        threading.Thread(target=run, daemon=True, name=f'batch-{batch.message_id}').start()
+
+    @staticmethod
+    def _batch_token(batch, token):
+        """Token da ida ao Claude depois de fechar o lote. Sozinho, desistir
+        antes da injeção tira a mensagem; com outras requisições no lote, segue
+        sem prazo (o líder espera o resultado com o próprio prazo)"""
+        if len(batch.parts) > 1:
+            return CancelToken()
+        if token.cancelled:
+            MESSAGES_WITHDRAWN.labels(stage='aggregation').inc()
+            raise RequestCancelled(token.reason)
+        return token
+
+    def _log_batch(self, batch):
+        if len(batch.parts) > 1:
+            logs.event(log, 'batch_closed', f"🧺 {len(batch.parts)} mensagens do contato num único prompt",
+                       message_id=batch.message_id, sender=batch.sender_id,
+                       merged=[message_id for message_id, _text in batch.parts[1:]])
+
+    def open_reply_ticket(self, sender_id, message, message_id):
+        """Modo assíncrono: injeta (passando pelo agendador) e abre o ticket.
+        A vaga só é segurada durante a injeção; o limite por contato vale igual"""
+        with self.scheduler.slot(sender_id):
+            self.tracer.mark(message_id, 'slot_granted')
+            if not self.inject_message_to_claude_history(sender_id, message, message_id):
+                return False
+        self.mailbox.open_ticket(message_id, max_wait=CLAUDE_MAX_WAIT)
+        return True
+
+    def ingest_batch(self, items):
+        """Lote do gateway: injeta as mensagens aceitas numa única gravação do
+        config e abre um ticket para cada uma; um item por mensagem, na ordem"""
+        results, accepted, injection = self._submit_batch(items)
+        error = None
+        if injection is not None:
+            try:
+                injection.result()
+            except Exception as exc:
+                error = exc
+        return self._open_batch_tickets(results, accepted, error)
+
+    def wait_batch_replies(self, results, token):
+        """Espera as respostas dos itens do lote até CLAUDE_MAX_WAIT (ou o prazo
+        do token); itens sem resposta continuam com o ticket pendente"""
+        deadline = time.monotonic() + CLAUDE_MAX_WAIT
+        futures = self._batch_futures(results)
+        for future in futures.values():
+            if not token.wait(future, max(0.0, deadline - time.monotonic())):
+                break
+        if token.reason == 'disconnect':
+            raise RequestCancelled(token.reason)
+        return self._batch_replies(results, futures)
+
+    def _submit_batch(self, items):
+        """Passa cada mensagem pelo token bucket do contato e enfileira as
+        aceitas numa única mutação; (itens, aceitas, Future da injeção)"""
+        results = []
+        accepted = []
+        for sender_id, message in items:
+            message_id = self.new_message_id()
+            MESSAGES_TOTAL.labels(source='batch').inc()
+            logs.event(log, 'message_received', "🔔 NOVA MENSAGEM VIA API!",
+                       source='batch', message_id=message_id, sender=sender_id, body=message)
+            self.tracer.begin(message_id, sender_id, 'batch')
+            try:
+                self.scheduler.admit(sender_id)
+            except Throttled as throttled:
+                logs.event(log, 'throttled', "🚦 Mensagem limitada pelo agendador",
+                           level=logging.WARNING, sender=sender_id, reason=throttled.reason)
+                results.append(ingest.throttled_item(sender_id, throttled, THROTTLED_REPLY))
+                continue
+            results.append(ingest.accepted_item(sender_id, message_id))
+            accepted.append((sender_id, message, message_id))
+
+        injection = self.submit_injections(accepted) if accepted else None
+        return results, accepted, injection
+
+    def _open_batch_tickets(self, results, accepted, error):
+        if error is not None:
+            logs.event(log, 'inject_failed', f"❌ Erro ao injetar no Claude Config: {error}",
+                       level=logging.ERROR, messages=len(accepted))
+            for _sender_id, _message, message_id in accepted:
+                self.mailbox.discard(message_id)
+            return [ingest.failed_item(item['senderId'], INJECT_ERROR_REPLY) if item['status'] == 'pending'
+                    else item for item in results]
+
+        for _sender_id, _message, message_id in accepted:
+            self.mailbox.open_ticket(message_id, max_wait=CLAUDE_MAX_WAIT)
+        if accepted:
+            logs.event(log, 'batch_injected', f"📦 {len(accepted)} mensagens do lote injetadas numa gravação",
+                       messages=[message_id for _sender_id, _message, message_id in accepted])
+        return results
+
+    def _batch_futures(self, results):
+        futures = {}
+        for item in results:
+            if item['status'] == 'pending':
+                ticket = self.mailbox.ticket(item['ticket'])
+                if ticket is not None:
+                    futures[item['ticket']] = ticket[0]
+        return futures
+
+    @staticmethod
+    def _batch_replies(results, futures):
+        return [ingest.replied_item(item, futures.get(item.get('ticket')), FALLBACK_REPLY)
+                for item in results]
+
+    def _await_reply(self, sender_id, message, message_id, token):
+        """Espera a resposta do lote já injetado; (resposta do Claude, texto para
+        o cliente). Passado o ponto de hedge, responde com o respondedor local"""
+        hedge_after = self.hedger.delay(token.remaining(CLAUDE_MAX_WAIT))
+        future = self.mailbox.expect(message_id)
+        started = time.perf_counter()
+        self.hedger.track(future, started, hedge_after)
+
+        answered = token.wait(future, CLAUDE_MAX_WAIT if hedge_after is None else hedge_after)
+        if not answered and hedge_after is not None and not token.cancelled:
+            local = self._hedge(sender_id, message, message_id, started, hedge_after)
+            if local is not None:
+                return None, local
+            answered = token.wait(future, CLAUDE_MAX_WAIT - hedge_after)
+
+        reply = future.result() if answered else None
+        self._observe_reply_wait(message_id, started, reply, token)
+        self.mailbox.discard(message_id)
+        reply = self._log_reply(message_id, reply, CLAUDE_MAX_WAIT)
+        return reply, reply or FALLBACK_REPLY
+
+    def _hedge(self, sender_id, message, message_id, started, hedge_after):
+        """Resposta local no ponto de hedge; a do Claude segue pelo ticket"""
+        local = self.responders.respond(sender_id, message)
+        if local is None:
+            return None
+        future = self.mailbox.open_ticket(message_id, max_wait=CLAUDE_MAX_WAIT - hedge_after)
+        if self.followups is not None:
+            future.add_done_callback(lambda done: self._push_followup(sender_id, message_id, done))
+        self.tracer.annotate(message_id, hedged=True)
+        self.hedger.observe('local', time.perf_counter() - started)
+        logs.event(log, 'reply_hedged',
+                   f"⚡ Claude sem resposta em {hedge_after:.0f}s: respondedor local respondeu",
+                   message_id=message_id, sender=sender_id)
+        return HedgedReply(local, followup=message_id)
+
+    def _push_followup(self, sender_id, message_id, reply_future):
+        """Resposta tardia de uma mensagem com hedge: vai para o gateway"""
+        if reply_future.cancelled() or reply_future.exception() is not None:
+            return
+        reply = reply_future.result()
+        if reply:
+            self.followups.push(sender_id, message_id, reply)
+
+    def _log_reply(self, message_id, reply, max_attempts):
+        if reply:
+            logs.event(log, 'reply_received', "🎉 CLAUDE RESPONDEU",
+                       message_id=message_id, reply=reply)
+            return reply
+
+        if self.running:
+            logs.event(log, 'reply_timeout',
+                       f"⏰ Timeout - Claude não respondeu em {max_attempts} segundos",
+                       level=logging.WARNING, message_id=message_id)
+        return None
+
+    def _observe_reply_wait(self, message_id, started, reply, token=None):
+        if not reply and token is not None and token.cancelled:
+            self._abandon_reply_wait(message_id, started)
+            raise RequestCancelled(token.reason)
+
+        outcome = 'reply' if reply else 'timeout'
+        REPLY_WAIT_SECONDS.labels(outcome=outcome).observe(time.perf_counter() - started)
+        if not reply:
+            REPLY_TIMEOUTS.inc()
+            if self.store is not None:
+                self.store.mark(message_id, 'timeout')
+
+    def _abandon_reply_wait(self, message_id, started):
+        """Prazo da requisição ou queda do cliente com a mensagem já injetada:
+        a espera vira ticket até o fim do CLAUDE_MAX_WAIT. Se o Claude
+        responder depois, a resposta ainda vai para a conversa, o log e o
+        store (_record_reply) e fica em GET /api/reply/<id>"""
+        elapsed = time.perf_counter() - started
+        REPLY_WAIT_SECONDS.labels(outcome='cancelled').observe(elapsed)
+        if self.store is not None:
+            self.store.mark(message_id, 'cancelled')
+        self.mailbox.open_ticket(message_id, max_wait=max(0.0, CLAUDE_MAX_WAIT - elapsed))
+
+    def _record_reply(self, sender_id, message_id, message, reply_future):
+        """Guarda a resposta do Claude na conversa do contato"""
+        if reply_future.cancelled() or reply_future.exception() is not None:
+            return
+        reply = reply_future.result()
+        if reply:
+            self._trace_reply(message_id, reply_future)
+        self.conversations.add(sender_id, 'assistant', reply)
+        if reply and self.conversation_log is not None:
+            self.conversation_log.record(sender_id, message, reply, message_id)
+        if self.store is not None:
+            if reply:
+                self.store.save_reply(message_id, reply)
+            else:
+                # Ticket sem resposta no prazo
+                self.store.mark(message_id, 'timeout')
+
+    def _trace_reply(self, message_id, reply_future):
+        self.tracer.mark(message_id, 'reply_detected')
+        written_at = getattr(reply_future, 'written_at', None)
+        if written_at:
+            self.tracer.mark(message_id, 'reply_written', written_at)
+
+    @staticmethod
+    def _add_history_entries(claude_config, history_entries):
+        """Adiciona as entradas no histórico do projeto (roda na thread do escritor)"""
+        # Verificar se o projeto existe no config
+        if 'projects' not in claude_config:
+            claude_config['projects'] = {}
+        
+        project_path = '/home/user'
+        if project_path not in claude_config['projects']:
+            claude_config['projects'][project_path] = {
+                "allowedTools": [],
+                "history": [],
+                "mcpContextUris": [],
+                "mcpServers": {},
+                "enabledMcpjsonServers": [],
+                "disabledMcpjsonServers": [],
+                "hasTrustDialogAccepted": False,
+                "projectOnboardingSeenCount": 1,
+                "hasClaudeMdExternalIncludesApproved": False,
+                "hasClaudeMdExternalIncludesWarningShown": False,
+                "lastTotalWebSearchRequests": 0
+            }
+        
+        # Adicionar no INÍCIO do histórico (mais recente primeiro)
+        claude_config['projects'][project_path]['history'][0:0] = reversed(history_entries)
+
+        # Manter apenas os últimos itens para performance (sem copiar a lista)
+        del claude_config['projects'][project_path]['history'][CLAUDE_HISTORY_LIMIT:]
+
+    def wait_for_claude_response(self, message_id, max_attempts=120, token=None):
+        """Aguarda resposta do Claude por até 2 minutos (ou até o prazo do token)"""
+        # Cada tentativa equivale a 1 segundo de espera
+        token = token or CancelToken()
+        started = time.perf_counter()
+        future = self.mailbox.expect(message_id)
+        reply = future.result() if token.wait(future, max_attempts) else None
+        # Com o token cancelado o waiter continua, como ticket
+        self._observe_reply_wait(message_id, started, reply, token)
+        self.mailbox.discard(message_id)
+
+        return self._log_reply(message_id, reply, max_attempts)
+
+    def ingest_current_message(self):
+        """Copia o currentMessage do arquivo legado para o spool (uma vez por id)"""
+        try:
+            with open(WHATSAPP_MESSAGES_PATH, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            # Sem arquivo ou lido no meio da escrita: o próximo evento relê
+            return False
+
+        message = data.get('currentMessage')
+        if not message or not message.get('id'):
+            return False
+
+        _position, meta = self.spool.checkpoint()
+        if message['id'] == meta.get('legacy_id'):
+            return False
+
+        self.spool.append(message)
+        self.spool.set_meta(legacy_id=message['id'])
+        return True
+
+    def _await_spooled_message(self, message, injection):
+        """Tarefa do pool: confirma a injeção e aguarda a resposta do Claude"""
+        try:
+            injection.result()
+        except Exception as error:
+            logs.event(log, 'inject_failed', f"❌ Erro ao injetar no Claude Config: {error}",
+                       level=logging.ERROR, message_id=message['id'], sender=message['senderId'])
+            self.mailbox.discard(message['id'])
+            return
+
+        logs.event(log, 'message_injected', "💉 MENSAGEM INJETADA! Aguardando resposta do Claude...",
+                   message_id=message['id'], sender=message['senderId'])
+        self.wait_for_claude_response(message['id'])
+
+    def monitor_whatsapp_messages(self):
+        """Monitora mensagens do WhatsApp em loop"""
+        if self.store is None:
+            os.makedirs(WHATSAPP_SPOOL_DIR, exist_ok=True)
+        # Bloqueia em eventos dos arquivos em vez de dormir entre leituras;
+        # o intervalo só vale para o fallback por polling
+        watcher = create_watcher([WHATSAPP_MESSAGES_PATH, self.inbox_watch_path], poll_interval=2,
+                                 modified=self.inbox_modified)
+        while self.running:
+            try:
+                self.ingest_current_message()
+
+                # Backpressure: só vai ao Claude o que um worker livre já pode
+                # aguardar (o prazo da resposta corre desde a injeção); o
+                # resto fica no spool
+                idle = self.workers.idle_workers()
+                if not idle:
+                    self.workers.record_deferred()
+                    self.workers.wait_for_idle(timeout=2)
+                    continue
+
+                # Mensagens novas desde o último checkpoint, uma por worker livre
+                messages, position = self.spool.read_batch(max_records=idle)
+                if not messages:
+                    watcher.wait(2)
+                    continue
+
+                # Enfileira o lote inteiro antes de esperar: vira um único
+                # group commit no .claude.json
+                injections = []
+                now = time.time()
+                self.monitor_meter.mark(len(messages))
+                MESSAGES_TOTAL.labels(source='monitor').inc(len(messages))
+                for message in messages:
+                    spooled_at = message.get('spooledAt')
+                    if isinstance(spooled_at, (int, float)):
+                        MONITOR_LAG_SECONDS.observe(max(0.0, now - spooled_at))
+                    else:
+                        spooled_at = None
+                    # No trace, o recebimento é a gravação no spool
+                    self.tracer.begin(message['id'], message['senderId'], 'monitor', at=spooled_at)
+                    self.tracer.mark(message['id'], 'monitor_picked', now)
+                    logs.event(log, 'message_received', "🔔 NOVA MENSAGEM WHATSAPP DETECTADA!",
+                               source='monitor', message_id=message['id'],
+                               sender=message['senderId'], body=message['message'],
+                               timestamp=message.get('timestamp'))
+                    injections.append((message, self.submit_injection(
+                        message['senderId'],
+                        message['message'],
+                        message['id']
+                    )))
+
+                for message, injection in injections:
+                    # Aguardar resposta no pool para não bloquear o monitor;
+                    # há um worker livre para cada uma, então não há rejeição
+                    self.workers.try_submit(self._await_spooled_message, message, injection)
+
+                    # Marcar como processada
+                    self.last_processed_id = message['id']
+
+                # Confirma o lote no checkpoint do spool
+                self.spool.commit(position)
+                
+            except Exception as error:
+                logs.event(log, 'monitor_error', f"❌ Erro ao processar mensagem WhatsApp: {error}",
+                           level=logging.ERROR)
+                watcher.wait(2)
+
+    def start_monitoring(self):
+        """Inicia monitoramento em thread separada"""
+        monitor_thread = threading.Thread(target=self.monitor_whatsapp_messages)
+        monitor_thread.daemon = True
+        monitor_thread.start()
+        return monitor_thread
+
+    def close(self):
+        """Para o monitor, a caixa postal, o escritor do config e os workers"""
+        self.running = False
+        self.mailbox.close()
+        self.config_writer.close()
+        self.workers.shutdown()
+        if self.followups is not None:
+            self.followups.shutdown()
+        if self.store is not None:
+            self.store.close()
+
+
+def build_test_response(bridge):
+    """Corpo do GET /api/test (compartilhado pelos transportes)"""
+    return {
+        "status": f"{bridge.title} ativo!",
+        "timestamp": datetime.now().isoformat(),
+        "claude_config_exists": os.path.exists(CLAUDE_CONFIG_PATH),
+        "message": "Sistema pronto para integração com Claude Code"
+    }
+
+
+def build_throttled_response(throttled):
+    """Corpo do 429 devolvido quando o agendador recusa a mensagem"""
+    return {
+        "reply": THROTTLED_REPLY,
+        "error": throttled.reason,
+        "retry_after": throttled.retry_after
+    }
+
+
+def build_cancelled_response():
+    """Corpo do 504 devolvido quando o prazo pedido pelo cliente acaba"""
+    return {
+        "reply": FALLBACK_REPLY,
+        "error": "deadline"
+    }
+
+
+def log_cancelled(cancelled, **fields):
+    logs.event(log, 'request_cancelled', f"🛑 Espera encerrada ({cancelled.reason})",
+               level=logging.WARNING, reason=cancelled.reason, **fields)
+
+
+def build_conversation_response(bridge, sender_id, limit):
+    """(status HTTP, corpo) das últimas trocas de um contato"""
+    if bridge.conversation_log is None:
+        return 503, {"error": "Log de conversas desativado neste processo"}
+    return 200, bridge.conversation_log.recent(sender_id, parse_limit(limit))
+
+
+def build_status_response(bridge):
+    """Corpo do GET /api/status (compartilhado pelos transportes)"""
+    return {
+        "bridge_running": bridge.running,
+        "last_processed_id": bridge.last_processed_id,
+        "pending_replies": bridge.mailbox.pending(),
+        "open_tickets": bridge.mailbox.tickets(),
+        "spool_backlog_bytes": bridge.spool.backlog_bytes(),
+        "store": bridge.store.stats() if bridge.store is not None else {"backend": "files"},
+        "monitor_workers": bridge.workers.stats(),
+        "conversations": bridge.conversations.stats(),
+        "conversation_log": bridge.conversation_log.stats() if bridge.conversation_log is not None else None,
+        "reply_dedup": bridge.dedup.stats(),
+        "scheduler": bridge.scheduler.stats(),
+        "aggregator": bridge.aggregator.stats(),
+        "hedging": bridge.hedger.stats(),
+        "followups": bridge.followups.stats() if bridge.followups is not None else None,
+        "trace": bridge.tracer.stats(),
+        "config_writer": {
+            "queue_depth": bridge.config_writer.queue_depth(),
+            "commits": bridge.config_writer.commits,
+            "injections": bridge.config_writer.mutations,
+            "cache_hits": bridge.config_writer.cache_hits,
+            "cache_misses": bridge.config_writer.cache_misses,
+            "json_backend": jsonlib.BACKEND
+        },
+        "files_status": {
+            "whatsapp_messages": os.path.exists(WHATSAPP_MESSAGES_PATH),
+            "claude_config": os.path.exists(CLAUDE_CONFIG_PATH),
+            "claude_response": os.path.exists(CLAUDE_RESPONSE_PATH),
+            "claude_replies_dir": os.path.isdir(CLAUDE_REPLIES_DIR)
+        }
+    }
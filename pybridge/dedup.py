@@ -0,0 +1,146 @@
+"""
+Deduplicação de mensagens repetidas: singleflight + cache curto de respostas.
+
+Mensagens iguais do mesmo contato (mesmo texto normalizado) ou com a mesma
+chave de idempotência do cliente compartilham uma única ida ao Claude:
+
+  • em andamento: a duplicata espera o Future da primeira (singleflight);
+  • já respondida: a resposta sai do cache enquanto não expirar (TTL),
+    com limite de entradas (LRU).
+
+Só respostas reais do Claude entram no cache; timeout e erro liberam a
+chave para a próxima tentativa. Se a primeira requisição desiste (prazo ou
+queda do cliente) ou é limitada pelo agendador, release() entrega RETRY às
+duplicatas: a chave fica livre e uma delas passa a ser a líder (e passa
+pelo agendador do contato).
+
+    dedup = ReplyDeduplicator(ttl=30, idempotency_ttl=600, max_entries=1000)
+    key = dedup.key(sender_id, message, idempotency_key(data, headers))
+    future, leader = dedup.claim(key)
+    if leader:
+        reply = ...                      # injeta e aguarda o Claude
+        dedup.resolve(key, future, reply, cache=bool(reply))
+    else:
+        reply = future.result(timeout)   # resposta da primeira requisição
+        if reply is RETRY:
+            ...                          # a primeira desistiu: claim() de novo
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from pybridge.metrics import REGISTRY
+
+DEDUP_LOOKUPS = REGISTRY.counter(
+    'bridge_reply_dedup_total',
+    'Mensagens por resultado da deduplicação (hit=cache, coalesced=em andamento, miss=nova)',
+    ['result']
+)
+
+_SPACES = re.compile(r'\s+')
+
+# Entregue às duplicatas quando a líder desiste sem resposta
+RETRY = object()
+
+
+def normalize(message):
+    """Texto comparável: sem espaços extras e sem diferença de caixa"""
+    return _SPACES.sub(' ', str(message or '')).strip().casefold()
+
+
+def idempotency_key(data, headers):
+    """Chave enviada pelo cliente (header Idempotency-Key ou "idempotencyKey")"""
+    key = headers.get('Idempotency-Key') or headers.get('idempotency-key')
+    if not key and isinstance(data, dict):
+        key = data.get('idempotencyKey')
+    return str(key) if key else None
+
+
+class ReplyDeduplicator:
+    def __init__(self, ttl=30, idempotency_ttl=600, max_entries=1000):
+        # Retenção das respostas por conteúdo e por chave de idempotência
+        self.ttl = ttl
+        self.idempotency_ttl = idempotency_ttl
+        self.max_entries = max_entries
+
+        # chave -> [Future, expira_em]; expira_em None = em andamento
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def key(self, sender_id, message, idempotency=None):
+        if idempotency:
+            return ('idempotency', sender_id, idempotency)
+        return ('message', sender_id, normalize(message))
+
+    def claim(self, key):
+        """(future, leader): leader=True se esta requisição deve chamar o Claude"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= now:
+                del self._entries[key]
+                entry = None
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if entry[1] is None:
+                    self.coalesced += 1
+                    DEDUP_LOOKUPS.labels(result='coalesced').inc()
+                else:
+                    self.hits += 1
+                    DEDUP_LOOKUPS.labels(result='hit').inc()
+                return entry[0], False
+
+            self.misses += 1
+            DEDUP_LOOKUPS.labels(result='miss').inc()
+            future = Future()
+            self._entries[key] = [future, None]
+            self._evict()
+            return future, True
+
+    def resolve(self, key, future, reply, cache=True):
+        """Entrega a resposta às duplicatas e (opcionalmente) guarda no cache"""
+        ttl = self.idempotency_ttl if key[0] == 'idempotency' else self.ttl
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is future:
+                if cache and ttl > 0:
+                    entry[1] = time.monotonic() + ttl
+                else:
+                    del self._entries[key]
+        if not future.done():
+            future.set_result(reply)
+
+    def release(self, key, future):
+        """Libera a chave sem resposta: as duplicatas recebem RETRY e tentam de novo"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is future:
+                del self._entries[key]
+        if not future.done():
+            future.set_result(RETRY)
+
+    def _evict(self):
+        # Descarta as respostas menos usadas; as em andamento ficam
+        excess = len(self._entries) - self.max_entries
+        if excess <= 0:
+            return
+        for key in [k for k, entry in self._entries.items() if entry[1] is not None][:excess]:
+            del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            in_flight = sum(1 for entry in self._entries.values() if entry[1] is None)
+            return {
+                "entries": len(self._entries),
+                "in_flight": in_flight,
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+            }
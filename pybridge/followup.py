@@ -0,0 +1,78 @@
+"""
+Entrega das respostas tardias do Claude (follow-up do hedge) ao gateway.
+
+Com hedge, o cliente recebe a resposta local e a do Claude chega depois.
+O gateway do WhatsApp só lê o campo "reply" do POST /api/whatsapp-chat, então
+o bridge empurra a resposta tardia para uma URL configurada
+(BRIDGE_FOLLOWUP_URL), num POST JSON:
+
+    {"senderId": "...", "messageId": "...", "reply": "...", "followup": true}
+
+Os POSTs saem de um pool pequeno (pybridge.workers), com algumas tentativas
+e backoff; a espera da requisição original nunca depende deles.
+
+    pusher = FollowupPusher(url, timeout=10, attempts=3)
+    pusher.push(sender_id, message_id, reply)
+"""
+
+import json
+import logging
+import time
+import urllib.error
+import urllib.request
+
+from pybridge import logs
+from pybridge.metrics import REGISTRY
+from pybridge.workers import WorkerPool
+
+log = logs.get_logger('followup')
+
+FOLLOWUPS = REGISTRY.counter(
+    'bridge_followups_total', 'Respostas tardias do Claude empurradas ao gateway (sent, failed, dropped)',
+    ['result']
+)
+
+
+class FollowupPusher:
+    def __init__(self, url, timeout=10, attempts=3, backoff=2.0, max_workers=2, max_queue=256):
+        self.url = url
+        self.timeout = timeout
+        self.attempts = attempts
+        self.backoff = backoff
+        self.pool = WorkerPool(max_workers, max_queue, name='followup')
+
+    def push(self, sender_id, message_id, reply):
+        """Agenda o POST; False se a fila estiver cheia (a resposta continua no ticket)"""
+        payload = {"senderId": sender_id, "messageId": message_id, "reply": reply, "followup": True}
+        if self.pool.try_submit(self._post, payload):
+            return True
+        FOLLOWUPS.labels(result='dropped').inc()
+        logs.event(log, 'followup_dropped', "⚠️ Fila de follow-ups cheia: resposta fica só no ticket",
+                   message_id=message_id)
+        return False
+
+    def _post(self, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        for attempt in range(1, self.attempts + 1):
+            request = urllib.request.Request(self.url, data=body, method='POST',
+                                             headers={'Content-Type': 'application/json'})
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+                FOLLOWUPS.labels(result='sent').inc()
+                logs.event(log, 'followup_sent', "📨 Resposta tardia do Claude entregue ao gateway",
+                           message_id=payload["messageId"], sender=payload["senderId"])
+                return
+            except (urllib.error.URLError, OSError) as error:
+                if attempt == self.attempts:
+                    FOLLOWUPS.labels(result='failed').inc()
+                    logs.event(log, 'followup_failed', f"❌ Follow-up não entregue: {error}",
+                               level=logging.WARNING, message_id=payload["messageId"])
+                    return
+                time.sleep(self.backoff * attempt)
+
+    def stats(self):
+        return {"url": self.url, **self.pool.stats()}
+
+    def shutdown(self):
+        self.pool.shutdown()
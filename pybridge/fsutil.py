@@ -0,0 +1,76 @@
+"""
+Utilitários de arquivo e de data compartilhados pelos módulos do bridge.
+
+`write_atomic()` é a gravação usada em todo arquivo que outro processo pode
+ler a qualquer momento (.claude.json, checkpoint do spool, índice do log,
+JSONs exportados): grava num temporário no mesmo diretório e publica com
+os.replace, então o leitor vê o arquivo antigo ou o novo, nunca metade.
+
+    write_atomic(path, data)                       # bytes
+    write_atomic(path, data, fsync=True)           # sobrevive a queda de energia
+    st = write_atomic(path, data, fsync=True, keep_mode=True, sync_dir=True)
+"""
+
+import os
+import tempfile
+from datetime import datetime, timezone
+
+
+def iso_utc(timestamp):
+    """time.time() -> '2024-01-31T12:00:00.000Z'"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+def remove_if_exists(path):
+    """Apaga o arquivo; False se ele já não existia"""
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def write_atomic(path, data, fsync=False, keep_mode=False, sync_dir=False):
+    """Grava `data` (bytes) em `path` via temporário + os.replace.
+
+    fsync: força os dados ao disco antes do rename; keep_mode: mantém as
+    permissões do arquivo atual (mkstemp cria com 0600); sync_dir: força
+    também o rename ao disco. Retorna o os.stat_result do arquivo gravado
+    (o rename preserva inode, tamanho e mtime do temporário)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path).lstrip(".")}.',
+                                    suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+            st = os.fstat(f.fileno())
+        if keep_mode:
+            try:
+                os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+            except FileNotFoundError:
+                pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        remove_if_exists(tmp_path)
+        raise
+
+    if sync_dir:
+        fsync_directory(directory)
+    return st
+
+
+def fsync_directory(directory):
+    """Garante que criações/renames no diretório chegaram ao disco (melhor esforço)"""
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
@@ -0,0 +1,138 @@
+"""
+Hedge da espera pelo Claude: limita a latência de cauda.
+
+Em vez de segurar o cliente até o timeout (2 min) e devolver a resposta
+padrão de falha, a espera vai só até o ponto de hedge: o quantil observado
+da latência do Claude (p95 por padrão), entre `min_delay` e o orçamento da
+requisição. Sem resposta até lá, o respondedor local (pybridge.responders)
+responde se alguma regra específica casar, e a resposta do Claude, quando
+chegar, fica num ticket como follow-up (GET /api/reply/<id>) e é empurrada
+ao gateway (pybridge.followup). Sem URL de follow-up o hedge fica desligado.
+
+    hedge_after = hedger.delay(budget)         # None = hedge desligado
+    hedger.track(future, started, hedge_after) # latência por caminho
+    ...
+    return HedgedReply(local_reply, followup=message_id)
+
+Caminhos medidos (bridge_reply_path_seconds e /api/status):
+  • claude:      Claude respondeu antes do ponto de hedge;
+  • local:       respondedor local respondeu no ponto de hedge;
+  • claude_late: resposta do Claude que virou follow-up.
+O quantil usa todas as respostas do Claude (inclusive as tardias), para o
+ponto de hedge não ir descendo sozinho.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+from pybridge import tickets
+from pybridge.metrics import REGISTRY
+
+PATHS = ('claude', 'local', 'claude_late')
+
+REPLY_PATH_SECONDS = REGISTRY.histogram(
+    'bridge_reply_path_seconds', 'Tempo até a resposta, por caminho (claude, local, claude_late)',
+    ['path'], buckets=(0.5, 1, 2.5, 5, 10, 15, 20, 30, 45, 60, 90, 120, 180)
+)
+
+# Folga para a resposta local sair antes do prazo pedido pelo cliente
+DEADLINE_MARGIN = 1.0
+
+
+class HedgedReply(str):
+    """Resposta local dada no lugar do Claude; `followup` é o ticket onde a
+    resposta do Claude chega depois"""
+
+    def __new__(cls, text, followup):
+        reply = super().__new__(cls, text)
+        reply.followup = followup
+        return reply
+
+
+def reply_payload(reply):
+    """Corpo do POST /api/whatsapp-chat; com hedge, inclui o ticket do follow-up"""
+    payload = {"reply": reply}
+    followup = getattr(reply, 'followup', None)
+    if followup:
+        payload["hedged"] = True
+        payload["followup"] = tickets.accepted_payload(followup)
+    return payload
+
+
+def quantile(sorted_samples, q):
+    """Quantil por posição mais próxima (amostras já ordenadas)"""
+    if not sorted_samples:
+        return None
+    return sorted_samples[min(len(sorted_samples) - 1, int(q * len(sorted_samples)))]
+
+
+class Hedger:
+    def __init__(self, quantile=0.95, default_delay=60, min_delay=15, min_samples=20,
+                 window=500, enabled=True):
+        self.quantile = quantile
+        # Ponto de hedge enquanto não há amostras suficientes
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        # Latências recentes do Claude (todas as respostas) e de cada caminho
+        self._claude = deque(maxlen=window)
+        self._paths = {path: deque(maxlen=window) for path in PATHS}
+        self._counts = dict.fromkeys(PATHS, 0)
+
+    def delay(self, budget):
+        """Segundos de espera antes do hedge, limitado pelo orçamento da
+        requisição; None com o hedge desligado"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            samples = sorted(self._claude) if len(self._claude) >= self.min_samples else None
+        target = quantile(samples, self.quantile) if samples else self.default_delay
+        return max(0.0, min(max(target, self.min_delay), budget - DEADLINE_MARGIN))
+
+    def track(self, future, started, hedge_after):
+        """Mede a resposta do Claude quando o Future (da caixa postal) resolver;
+        started em time.perf_counter()"""
+        def observe(future):
+            if future.cancelled() or future.exception() is not None or not future.result():
+                return
+            seconds = time.perf_counter() - started
+            with self._lock:
+                self._claude.append(seconds)
+            late = hedge_after is not None and seconds >= hedge_after
+            self.observe('claude_late' if late else 'claude', seconds)
+        future.add_done_callback(observe)
+
+    def observe(self, path, seconds):
+        REPLY_PATH_SECONDS.labels(path=path).observe(seconds)
+        with self._lock:
+            self._paths[path].append(seconds)
+            self._counts[path] += 1
+
+    def stats(self):
+        with self._lock:
+            samples = len(self._claude)
+            paths = {path: (self._counts[path], sorted(window)) for path, window in self._paths.items()}
+        stats = {
+            "enabled": self.enabled,
+            "quantile": self.quantile,
+            "samples": samples,
+            "hedge_after": self.delay(math.inf),
+            "paths": {},
+        }
+        for path, (count, window) in paths.items():
+            stats["paths"][path] = {
+                "count": count,
+                "p50": _round(quantile(window, 0.5)),
+                "p95": _round(quantile(window, 0.95)),
+                "p99": _round(quantile(window, 0.99)),
+            }
+        return stats
+
+
+def _round(value):
+    return round(value, 3) if value is not None else None
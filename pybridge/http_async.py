@@ -0,0 +1,393 @@
+"""
+Transporte HTTP asyncio (pybridge.aio_http): uma coroutine por requisição.
+
+Milhares de requisições paradas esperando o Claude custam só memória, não
+threads. AsyncClaudeBridge acrescenta ao ClaudeBridge as versões asyncio
+das esperas (vaga no agendador, injeção, resposta); a queda do cliente
+chega como cancelamento da task.
+
+Nada que toque o SQLite ou o disco roda no loop: com vários processos no
+mesmo banco, uma escrita pode esperar até o busy_timeout (5 s) e pararia
+todas as conexões. Essas chamadas vão para o executor padrão do loop
+(`_in_thread`), como a gravação do .claude.json já vai para o escritor.
+
+    bridge = AsyncClaudeBridge()
+    asyncio.run(serve_forever(bridge, '0.0.0.0', 3001))
+"""
+
+import asyncio
+import functools
+import logging
+import time
+import urllib.parse
+
+from pybridge import aio_http, core, ingest, logs, tickets
+from pybridge.cancel import CancelToken, RequestCancelled
+from pybridge.core import (
+    HTTP_IN_FLIGHT, MESSAGES_TOTAL, ClaudeBridge, build_cancelled_response,
+    build_conversation_response, build_status_response, build_test_response,
+    build_throttled_response, log_cancelled
+)
+from pybridge.dedup import RETRY, idempotency_key
+from pybridge.hedge import reply_payload
+from pybridge.metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from pybridge.scheduler import Throttled
+from pybridge.trace import answered_ids, parse_trace_path, trace_response
+
+log = logs.get_logger()
+
+
+def _in_thread(fn, *args):
+    """fn(*args) no executor padrão do loop (SQLite e disco); retorna um awaitable"""
+    return asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args))
+
+
+class AsyncClaudeBridge(ClaudeBridge):
+    async def submit_injections_async(self, messages):
+        """submit_injections fora do loop (_prepare_injection lê e grava no
+        store); retorna o Future da gravação"""
+        pending = _in_thread(self.submit_injections, messages)
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            # Cliente caiu durante a preparação: a injeção sai da fila do escritor
+            pending.add_done_callback(
+                lambda done: done.cancelled() or done.exception() or done.result().cancel()
+            )
+            raise
+
+    async def inject_message_to_claude_history_async(self, sender_id, message, message_id):
+        """Versão asyncio de inject_message_to_claude_history (não ocupa thread)"""
+        try:
+            injection = await self.submit_injections_async([(sender_id, message, message_id)])
+            await asyncio.wrap_future(injection)
+
+            logs.event(log, 'message_injected', "✅ Mensagem INJETADA no Claude Config!",
+                       message_id=message_id, sender=sender_id)
+            return True
+
+        except asyncio.CancelledError:
+            # Cliente caiu: a injeção sai da fila do escritor se ainda não foi gravada
+            self.mailbox.discard(message_id)
+            raise
+        except Exception as error:
+            logs.event(log, 'inject_failed', f"❌ Erro ao injetar no Claude Config: {error}",
+                       level=logging.ERROR, message_id=message_id, sender=sender_id)
+            self.mailbox.discard(message_id)
+            return False
+
+    async def reply_to_async(self, sender_id, message, message_id, idempotency_key=None, token=None):
+        """Versão asyncio de reply_to (não ocupa thread). A queda do cliente
+        chega como cancelamento da task (aio_http)"""
+        token = token or CancelToken()
+        key = self.dedup.key(sender_id, message, idempotency_key)
+        while True:
+            future, leader = self.dedup.claim(key)
+            if leader:
+                break
+            logs.event(log, 'duplicate_coalesced', "♻️ Mensagem repetida: usando a resposta da original",
+                       message_id=message_id, sender=sender_id)
+            if not await token.wait_async(future, core.CLAUDE_MAX_WAIT):
+                token.check()
+                return core.FALLBACK_REPLY
+            if future.result() is not RETRY:
+                return future.result()
+
+        try:
+            reply, answer = await self._reply_batched_async(sender_id, message, message_id, token)
+        except (RequestCancelled, asyncio.CancelledError):
+            self._hand_off_duplicates(key, future, message_id)
+            raise
+        except Throttled:
+            self.dedup.release(key, future)
+            raise
+        except BaseException:
+            self.dedup.resolve(key, future, core.INJECT_ERROR_REPLY, cache=False)
+            raise
+        self.dedup.resolve(key, future, answer, cache=bool(reply))
+        return answer
+
+    async def _reply_batched_async(self, sender_id, message, message_id, token):
+        """Versão asyncio de _reply_batched"""
+        batch, leader = self.aggregator.join(sender_id, message_id, message)
+        if not leader:
+            logs.event(log, 'message_aggregated', "🧺 Mensagem juntada ao lote do contato",
+                       message_id=message_id, sender=sender_id, batch=batch.message_id)
+            self.tracer.annotate(message_id, batch=batch.message_id)
+            try:
+                done = await token.wait_async(batch.future, core.AGGREGATION_FOLLOWER_WAIT)
+            except asyncio.CancelledError:
+                self.aggregator.withdraw(batch, message_id)
+                raise
+            if not done:
+                if token.cancelled:
+                    self.aggregator.withdraw(batch, message_id)
+                    raise RequestCancelled(token.reason)
+                return None, core.FALLBACK_REPLY
+            return batch.future.result()
+
+        work = asyncio.ensure_future(self._run_batch_async(sender_id, batch, token))
+        try:
+            # O líder espera com o próprio prazo, inclusive durante a janela
+            return await asyncio.wait_for(asyncio.shield(work),
+                                          token.remaining(core.AGGREGATION_FOLLOWER_WAIT))
+        except asyncio.TimeoutError:
+            self._leave_batch(batch, work)
+            token.check()
+            return None, core.FALLBACK_REPLY
+        except asyncio.CancelledError:
+            self._leave_batch(batch, work)
+            raise
+
+    def _leave_batch(self, batch, work):
+        """O líder desistiu (prazo ou queda): sozinho, o lote é abandonado; com
+        outras requisições no lote, a ida ao Claude segue para elas"""
+        if self.aggregator.abandon(batch):
+            work.cancel()
+        # Ninguém mais aguarda a task: consome o resultado (Throttled etc.)
+        work.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def _run_batch_async(self, sender_id, batch, token):
+        result = (None, core.INJECT_ERROR_REPLY)
+        try:
+            message_id, message = await self.aggregator.close_async(batch)
+            self.tracer.mark(message_id, 'batch_closed')
+            self._log_batch(batch)
+            token = self._batch_token(batch, token)
+            async with self.scheduler.slot_async(sender_id, token):
+                self.tracer.mark(message_id, 'slot_granted')
+                if await self.inject_message_to_claude_history_async(sender_id, message, message_id):
+                    result = await self._await_reply_async(sender_id, message, message_id, token)
+        except Throttled as throttled:
+            batch.fail(throttled)
+            raise
+        finally:
+            batch.resolve(result)
+        return result
+
+    async def open_reply_ticket_async(self, sender_id, message, message_id):
+        """Versão asyncio de open_reply_ticket"""
+        async with self.scheduler.slot_async(sender_id):
+            self.tracer.mark(message_id, 'slot_granted')
+            if not await self.inject_message_to_claude_history_async(sender_id, message, message_id):
+                return False
+        await _in_thread(self.mailbox.open_ticket, message_id, core.CLAUDE_MAX_WAIT)
+        return True
+
+    async def ingest_batch_async(self, items):
+        """Versão asyncio de ingest_batch"""
+        pending = _in_thread(self._submit_batch, items)
+        try:
+            results, accepted, injection = await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            pending.add_done_callback(
+                lambda done: done.cancelled() or done.exception() or self._withdraw_batch(*done.result()[1:])
+            )
+            raise
+        error = None
+        if injection is not None:
+            try:
+                await asyncio.wrap_future(injection)
+            except asyncio.CancelledError:
+                self._withdraw_batch(accepted, injection)
+                raise
+            except Exception as exc:
+                error = exc
+        return await _in_thread(self._open_batch_tickets, results, accepted, error)
+
+    def _withdraw_batch(self, accepted, injection):
+        if injection is not None:
+            injection.cancel()
+        for _sender_id, _message, message_id in accepted:
+            self.mailbox.discard(message_id)
+
+    async def find_ticket_async(self, message_id):
+        """Versão asyncio de find_ticket (o ticket remoto é lido do store)"""
+        return await _in_thread(self.find_ticket, message_id)
+
+    async def wait_batch_replies_async(self, results, token):
+        """Versão asyncio de wait_batch_replies"""
+        futures = await _in_thread(self._batch_futures, results)
+        if futures:
+            await asyncio.wait([asyncio.wrap_future(future) for future in futures.values()],
+                               timeout=token.remaining(core.CLAUDE_MAX_WAIT))
+        return self._batch_replies(results, futures)
+
+    async def _await_reply_async(self, sender_id, message, message_id, token):
+        """Versão asyncio de _await_reply"""
+        hedge_after = self.hedger.delay(token.remaining(core.CLAUDE_MAX_WAIT))
+        started = time.perf_counter()
+        try:
+            future = await _in_thread(self.mailbox.expect, message_id)
+            self.hedger.track(future, started, hedge_after)
+            answered = await token.wait_async(future, core.CLAUDE_MAX_WAIT if hedge_after is None else hedge_after)
+            if not answered and hedge_after is not None and not token.cancelled:
+                local = await _in_thread(self._hedge, sender_id, message, message_id, started, hedge_after)
+                if local is not None:
+                    return None, local
+                answered = await token.wait_async(future, core.CLAUDE_MAX_WAIT - hedge_after)
+        except asyncio.CancelledError:
+            # Cliente caiu: a espera vira ticket (fora do loop, grava no store)
+            asyncio.get_running_loop().run_in_executor(None, self._abandon_reply_wait, message_id, started)
+            raise
+
+        reply = future.result() if answered else None
+        await _in_thread(self._observe_reply_wait, message_id, started, reply, token)
+        self.mailbox.discard(message_id)
+        reply = self._log_reply(message_id, reply, core.CLAUDE_MAX_WAIT)
+        return reply, reply or core.FALLBACK_REPLY
+
+
+async def _route_batch(bridge, request):
+    try:
+        data = request.json()
+        items = ingest.parse_batch(data)
+    except ValueError as error:
+        return aio_http.json_response({"error": str(error)}, 400)
+
+    results = await bridge.ingest_batch_async(items)
+    options = ingest.options(data)
+    if tickets.wants_async(options, request.headers):
+        return aio_http.json_response({"messages": results}, 202)
+
+    token = CancelToken.from_request(options, request.headers, core.CLAUDE_MAX_WAIT)
+    results = await bridge.wait_batch_replies_async(results, token)
+    bridge.tracer.mark_all(answered_ids(results), 'response_sent')
+    return aio_http.json_response({"messages": results})
+
+
+def make_handler(bridge):
+    """Handler do aio_http com as rotas do bridge: mesmo contrato do WhatsAppHandler"""
+    async def handle(request):
+        with HTTP_IN_FLIGHT.track_inprogress():
+            return await _route(bridge, request)
+    return handle
+
+
+async def _route(bridge, request):
+    if request.method == 'POST' and request.path == core.BATCH_PATH:
+        return await _route_batch(bridge, request)
+
+    if request.method == 'POST' and request.path == '/api/whatsapp-chat':
+        data = request.json()
+        sender_id = data.get('senderId')
+        message = data.get('message')
+
+        MESSAGES_TOTAL.labels(source='api').inc()
+
+        message_id = bridge.new_message_id()
+        logs.event(log, 'message_received', "🔔 NOVA MENSAGEM VIA API!",
+                   source='api', message_id=message_id, sender=sender_id, body=message)
+        bridge.tracer.begin(message_id, sender_id, 'api')
+
+        try:
+            if tickets.wants_async(data, request.headers):
+                if not await bridge.open_reply_ticket_async(sender_id, message, message_id):
+                    return aio_http.json_response({"reply": core.INJECT_ERROR_REPLY})
+                logs.event(log, 'ticket_issued', "🎫 Mensagem injetada! Ticket emitido",
+                           message_id=message_id)
+                return aio_http.json_response(tickets.accepted_payload(message_id), 202)
+
+            token = CancelToken.from_request(data, request.headers, core.CLAUDE_MAX_WAIT)
+            reply = await bridge.reply_to_async(sender_id, message, message_id,
+                                                idempotency_key(data, request.headers), token)
+        except RequestCancelled as cancelled:
+            log_cancelled(cancelled, message_id=message_id, sender=sender_id)
+            bridge.tracer.mark(message_id, 'response_sent')
+            return aio_http.json_response(build_cancelled_response(), 504)
+        except asyncio.CancelledError:
+            # aio_http cancela a task quando o cliente fecha a conexão
+            log_cancelled(RequestCancelled('disconnect'), message_id=message_id, sender=sender_id)
+            raise
+        except Throttled as throttled:
+            logs.event(log, 'throttled', "🚦 Mensagem limitada pelo agendador",
+                       level=logging.WARNING, sender=sender_id, reason=throttled.reason)
+            response = aio_http.json_response(build_throttled_response(throttled), 429)
+            response.headers['Retry-After'] = str(throttled.retry_after)
+            return response
+        logs.event(log, 'reply_sent', "📤 Enviando resposta para WhatsApp",
+                   message_id=message_id)
+        bridge.tracer.mark(message_id, 'response_sent')
+        return aio_http.json_response(reply_payload(reply))
+
+    if request.method == 'GET' and request.path == '/api/test':
+        return aio_http.json_response(build_test_response(bridge))
+
+    if request.method == 'GET' and request.path == '/api/status':
+        return aio_http.json_response(await _in_thread(build_status_response, bridge))
+
+    if request.method == 'GET' and request.path == '/api/metrics':
+        return aio_http.Response(
+            200, REGISTRY.render().encode('utf-8'), {'Content-type': METRICS_CONTENT_TYPE}
+        )
+
+    if request.method == 'GET' and request.path.startswith(core.CONVERSATIONS_PREFIX):
+        status_code, payload = await _in_thread(
+            build_conversation_response,
+            bridge,
+            urllib.parse.unquote(request.path[len(core.CONVERSATIONS_PREFIX):]),
+            request.query.get('limit')
+        )
+        return aio_http.json_response(payload, status_code)
+
+    trace_id = parse_trace_path(request.path)
+    if request.method == 'GET' and trace_id:
+        status_code, payload = trace_response(bridge.tracer, trace_id, request.query.get('limit'))
+        return aio_http.json_response(payload, status_code)
+
+    ticket_id, stream = tickets.parse_reply_path(request.path)
+    if request.method == 'GET' and ticket_id:
+        ticket = await bridge.find_ticket_async(ticket_id)
+        if ticket is None:
+            return aio_http.json_response(
+                {"ticket": ticket_id, "error": "Ticket não encontrado ou expirado"}, 404
+            )
+        future, deadline = ticket
+        reply_future = asyncio.wrap_future(future)
+
+        if stream:
+            return aio_http.StreamResponse(
+                _stream_reply_events(bridge, ticket_id, future, reply_future),
+                headers={'Content-type': 'text/event-stream', 'Cache-Control': 'no-cache'}
+            )
+
+        timeout = min(tickets.parse_timeout(request.query.get('timeout')), tickets.remaining(deadline) + 1)
+        try:
+            await asyncio.wait_for(asyncio.shield(reply_future), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        status_code, payload = tickets.ticket_payload(ticket_id, future, core.FALLBACK_REPLY)
+        if future.done():
+            bridge.tracer.mark(ticket_id, 'response_sent')
+        return aio_http.json_response(payload, status_code)
+
+    return aio_http.Response(404)
+
+
+async def _stream_reply_events(bridge, message_id, future, reply_future):
+    """Eventos SSE de um ticket: pending, keep-alives e reply"""
+    yield tickets.sse_event('pending', {"ticket": message_id, "status": "pending"})
+    while True:
+        try:
+            await asyncio.wait_for(asyncio.shield(reply_future), timeout=tickets.SSE_KEEPALIVE_INTERVAL)
+            break
+        except asyncio.TimeoutError:
+            yield tickets.SSE_KEEPALIVE
+    _status_code, payload = tickets.ticket_payload(message_id, future, core.FALLBACK_REPLY)
+    bridge.tracer.mark(message_id, 'response_sent')
+    yield tickets.sse_event('reply', payload)
+
+
+# Classe do bridge que este transporte serve (pybridge.launcher)
+bridge_class = AsyncClaudeBridge
+
+
+async def serve_forever(bridge, host='0.0.0.0', port=3001):
+    server = await aio_http.serve(make_handler(bridge), host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def run(bridge, host='0.0.0.0', port=3001):
+    """Serve até Ctrl+C"""
+    asyncio.run(serve_forever(bridge, host, port))
@@ -0,0 +1,211 @@
+"""
+Transporte Flask (claude_bridge.py --transport flask).
+
+Só é importado quando este transporte é escolhido: o custo de importar o
+Flask não entra na partida dos outros transportes nem em health checks.
+
+    app = create_app(bridge)
+    app.run(host='0.0.0.0', port=3001, threaded=True)
+"""
+
+import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from flask import Flask, Response, jsonify, request
+
+from pybridge import core, ingest, logs, tickets
+from pybridge.cancel import CancelToken, RequestCancelled, disconnect_watcher
+from pybridge.core import (
+    HTTP_IN_FLIGHT, MESSAGES_TOTAL, ClaudeBridge, build_cancelled_response,
+    build_conversation_response, build_status_response, build_test_response,
+    build_throttled_response, log_cancelled
+)
+from pybridge.dedup import idempotency_key
+from pybridge.hedge import reply_payload
+from pybridge.metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from pybridge.scheduler import Throttled
+from pybridge.trace import answered_ids, trace_response
+
+# Classe do bridge que este transporte serve (pybridge.launcher)
+bridge_class = ClaudeBridge
+
+log = logs.get_logger()
+
+
+def create_app(bridge):
+    """App Flask com as rotas servindo `bridge`"""
+    app = Flask(__name__)
+
+    @app.before_request
+    def track_request_start():
+        HTTP_IN_FLIGHT.inc()
+
+    @app.teardown_request
+    def track_request_end(error=None):
+        HTTP_IN_FLIGHT.dec()
+
+    def traced(response, *message_ids):
+        """Marca response_sent no trace quando o Flask terminar de enviar a resposta"""
+        response.call_on_close(lambda: bridge.tracer.mark_all(message_ids, 'response_sent'))
+        return response
+
+    @app.route('/api/whatsapp-chat', methods=['POST'])
+    def whatsapp_chat():
+        """Endpoint para receber mensagens do WhatsApp"""
+        try:
+            data = request.get_json()
+            sender_id = data.get('senderId')
+            message = data.get('message')
+
+            MESSAGES_TOTAL.labels(source='api').inc()
+
+            # Processar mensagem diretamente
+            message_id = bridge.new_message_id()
+            logs.event(log, 'message_received', "🔔 NOVA MENSAGEM VIA API!",
+                       source='api', message_id=message_id, sender=sender_id, body=message)
+            bridge.tracer.begin(message_id, sender_id, 'api')
+
+            # Modo assíncrono: devolve o ticket e libera a conexão
+            if tickets.wants_async(data, request.headers):
+                if not bridge.open_reply_ticket(sender_id, message, message_id):
+                    return jsonify({"reply": core.INJECT_ERROR_REPLY})
+                logs.event(log, 'ticket_issued', "🎫 Mensagem injetada! Ticket emitido",
+                           message_id=message_id)
+                return jsonify(tickets.accepted_payload(message_id)), 202
+
+            # Injetar e aguardar resposta do Claude (duplicatas compartilham a espera);
+            # a espera termina no prazo pedido pelo cliente ou, quando o servidor
+            # expõe o socket (werkzeug), se ele desconectar
+            token = CancelToken.from_request(data, request.headers, core.CLAUDE_MAX_WAIT)
+            with disconnect_watcher.watch(request.environ.get('werkzeug.socket'), token):
+                reply = bridge.reply_to(sender_id, message, message_id,
+                                        idempotency_key(data, request.headers), token)
+            logs.event(log, 'reply_sent', "📤 Enviando resposta para WhatsApp",
+                       message_id=message_id)
+            return traced(jsonify(reply_payload(reply)), message_id)
+
+        except RequestCancelled as cancelled:
+            log_cancelled(cancelled, message_id=message_id, sender=sender_id)
+            if cancelled.reason == 'disconnect':
+                # Ninguém para receber a resposta; 499 só aparece no log de acesso
+                return '', 499
+            return traced(jsonify(build_cancelled_response()), message_id), 504
+        except Throttled as throttled:
+            logs.event(log, 'throttled', "🚦 Mensagem limitada pelo agendador",
+                       level=logging.WARNING, sender=sender_id, reason=throttled.reason)
+            return (jsonify(build_throttled_response(throttled)), 429,
+                    {'Retry-After': str(throttled.retry_after)})
+        except Exception as error:
+            logs.event(log, 'api_error', f"❌ Erro na API: {error}", level=logging.ERROR)
+            return jsonify({"reply": "Erro interno do servidor."}), 500
+
+    @app.route('/api/whatsapp-chat/batch', methods=['POST'])
+    def whatsapp_chat_batch():
+        """Várias mensagens numa requisição, injetadas numa única gravação do config"""
+        data = request.get_json(silent=True)
+        try:
+            items = ingest.parse_batch(data)
+        except ValueError as error:
+            return jsonify({"error": str(error)}), 400
+
+        try:
+            results = bridge.ingest_batch(items)
+            options = ingest.options(data)
+            if tickets.wants_async(options, request.headers):
+                return jsonify({"messages": results}), 202
+
+            token = CancelToken.from_request(options, request.headers, core.CLAUDE_MAX_WAIT)
+            with disconnect_watcher.watch(request.environ.get('werkzeug.socket'), token):
+                results = bridge.wait_batch_replies(results, token)
+            return traced(jsonify({"messages": results}), *answered_ids(results))
+
+        except RequestCancelled as cancelled:
+            log_cancelled(cancelled, batch=len(items))
+            return '', 499
+        except Exception as error:
+            logs.event(log, 'api_error', f"❌ Erro na API: {error}", level=logging.ERROR)
+            return jsonify({"reply": "Erro interno do servidor."}), 500
+
+    @app.route('/api/reply/<message_id>', methods=['GET'])
+    def reply_long_poll(message_id):
+        """Long-poll da resposta de um ticket (?timeout=segundos)"""
+        ticket = bridge.find_ticket(message_id)
+        if ticket is None:
+            return jsonify({"ticket": message_id, "error": "Ticket não encontrado ou expirado"}), 404
+
+        future, deadline = ticket
+        timeout = min(tickets.parse_timeout(request.args.get('timeout')), tickets.remaining(deadline) + 1)
+        try:
+            future.result(timeout=timeout)
+        except FutureTimeoutError:
+            pass
+
+        status_code, payload = tickets.ticket_payload(message_id, future, core.FALLBACK_REPLY)
+        if future.done():
+            return traced(jsonify(payload), message_id), status_code
+        return jsonify(payload), status_code
+
+    @app.route('/api/reply/<message_id>/stream', methods=['GET'])
+    def reply_stream(message_id):
+        """Resposta de um ticket via Server-Sent Events"""
+        ticket = bridge.find_ticket(message_id)
+        if ticket is None:
+            return jsonify({"ticket": message_id, "error": "Ticket não encontrado ou expirado"}), 404
+
+        future, _deadline = ticket
+
+        def events():
+            yield tickets.sse_event('pending', {"ticket": message_id, "status": "pending"})
+            while True:
+                try:
+                    future.result(timeout=tickets.SSE_KEEPALIVE_INTERVAL)
+                    break
+                except FutureTimeoutError:
+                    yield tickets.SSE_KEEPALIVE
+            _status_code, payload = tickets.ticket_payload(message_id, future, core.FALLBACK_REPLY)
+            bridge.tracer.mark(message_id, 'response_sent')
+            yield tickets.sse_event('reply', payload)
+
+        return Response(events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache'})
+
+    @app.route('/api/conversations/<sender_id>', methods=['GET'])
+    def conversation(sender_id):
+        """Últimas trocas de um contato (?limit=N)"""
+        status_code, payload = build_conversation_response(bridge, sender_id, request.args.get('limit'))
+        return jsonify(payload), status_code
+
+    @app.route('/api/trace/slowest', methods=['GET'])
+    def trace_slowest():
+        """Traces mais lentos do buffer (?limit=N)"""
+        status_code, payload = trace_response(bridge.tracer, 'slowest', request.args.get('limit'))
+        return jsonify(payload), status_code
+
+    @app.route('/api/trace/<message_id>', methods=['GET'])
+    def trace(message_id):
+        """Tempo de cada etapa do ciclo de vida da mensagem"""
+        status_code, payload = trace_response(bridge.tracer, message_id)
+        return jsonify(payload), status_code
+
+    @app.route('/api/test', methods=['GET'])
+    def test():
+        """Endpoint de teste"""
+        return jsonify(build_test_response(bridge))
+
+    @app.route('/api/status', methods=['GET'])
+    def status():
+        """Status do sistema"""
+        return jsonify(build_status_response(bridge))
+
+    @app.route('/api/metrics', methods=['GET'])
+    def metrics():
+        """Métricas no formato de exposição do Prometheus"""
+        return Response(REGISTRY.render(), headers={'Content-Type': METRICS_CONTENT_TYPE})
+
+
+    return app
+
+
+def run(bridge, host='0.0.0.0', port=3001):
+    """Serve até Ctrl+C"""
+    create_app(bridge).run(host=host, port=port, debug=False, threaded=True)
@@ -0,0 +1,274 @@
+"""
+Transporte HTTP com threads (http.server, somente biblioteca padrão).
+
+Uma thread por conexão: long-poll e SSE não travam as outras rotas. As
+conexões são HTTP/1.1 persistentes; cada uma segura uma thread enquanto
+estiver aberta.
+
+    server = BridgeHTTPServer(('0.0.0.0', 3001), bridge)
+    server.serve_forever()
+"""
+
+import json
+import logging
+import urllib.parse
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pybridge import core, ingest, logs, tickets
+from pybridge.cancel import CancelToken, RequestCancelled, disconnect_watcher
+from pybridge.core import (
+    HTTP_IN_FLIGHT, MESSAGES_TOTAL, ClaudeBridge, build_cancelled_response,
+    build_conversation_response, build_status_response, build_test_response,
+    build_throttled_response, log_cancelled
+)
+from pybridge.dedup import idempotency_key
+from pybridge.hedge import reply_payload
+from pybridge.metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from pybridge.scheduler import Throttled
+from pybridge.trace import answered_ids, parse_trace_path, trace_response
+
+# HTTP/1.1 persistente: o gateway reaproveita a conexão entre mensagens.
+# Conexões ociosas por mais que isso são fechadas (cada uma segura uma thread)
+HTTP_KEEPALIVE_TIMEOUT = 30
+# Conexões aguardando accept() no socket do servidor
+HTTP_REQUEST_QUEUE_SIZE = 128
+
+# Classe do bridge que este transporte serve (pybridge.launcher)
+bridge_class = ClaudeBridge
+
+log = logs.get_logger()
+
+
+class BridgeHTTPServer(ThreadingHTTPServer):
+    request_queue_size = HTTP_REQUEST_QUEUE_SIZE
+
+    def __init__(self, server_address, bridge, handler_class=None):
+        super().__init__(server_address, handler_class or WhatsAppHandler)
+        self.bridge = bridge
+
+
+class WhatsAppHandler(BaseHTTPRequestHandler):
+    # Keep-alive: toda resposta leva Content-Length
+    protocol_version = 'HTTP/1.1'
+    timeout = HTTP_KEEPALIVE_TIMEOUT
+    # Cabeçalhos e corpo saem em escritas separadas; sem TCP_NODELAY o corpo
+    # esperaria o ACK atrasado do cliente (~40 ms) numa conexão reaproveitada
+    disable_nagle_algorithm = True
+
+    @property
+    def bridge(self):
+        return self.server.bridge
+
+    def do_POST(self):
+        """Handle POST requests"""
+        with HTTP_IN_FLIGHT.track_inprogress():
+            self._handle_post()
+
+    def do_GET(self):
+        """Handle GET requests"""
+        with HTTP_IN_FLIGHT.track_inprogress():
+            self._handle_get()
+
+    def _handle_post(self):
+        if self.path == core.BATCH_PATH:
+            self._handle_batch()
+        elif self.path == '/api/whatsapp-chat':
+            try:
+                # Ler dados do POST
+                data = self._read_json()
+                
+                sender_id = data.get('senderId')
+                message = data.get('message')
+                
+                MESSAGES_TOTAL.labels(source='api').inc()
+                
+                # Processar mensagem diretamente
+                message_id = self.bridge.new_message_id()
+                logs.event(log, 'message_received', "🔔 NOVA MENSAGEM VIA API!",
+                           source='api', message_id=message_id, sender=sender_id, body=message)
+                self.bridge.tracer.begin(message_id, sender_id, 'api')
+                
+                if tickets.wants_async(data, self.headers):
+                    # Modo assíncrono: devolve o ticket e libera a conexão
+                    if not self.bridge.open_reply_ticket(sender_id, message, message_id):
+                        self._send_json(200, {"reply": core.INJECT_ERROR_REPLY})
+                        return
+                    logs.event(log, 'ticket_issued', "🎫 Mensagem injetada! Ticket emitido",
+                               message_id=message_id)
+                    self._send_json(202, tickets.accepted_payload(message_id))
+                    return
+
+                # Injetar e aguardar resposta do Claude (duplicatas compartilham a espera);
+                # a espera termina no prazo pedido pelo cliente ou se ele desconectar
+                token = CancelToken.from_request(data, self.headers, core.CLAUDE_MAX_WAIT)
+                with disconnect_watcher.watch(self.connection, token):
+                    reply = self.bridge.reply_to(sender_id, message, message_id,
+                                            idempotency_key(data, self.headers), token)
+                logs.event(log, 'reply_sent', "📤 Enviando resposta para WhatsApp",
+                           message_id=message_id)
+                self._send_json(200, reply_payload(reply))
+                self.bridge.tracer.mark(message_id, 'response_sent')
+                
+            except RequestCancelled as cancelled:
+                log_cancelled(cancelled, message_id=message_id, sender=sender_id)
+                if cancelled.reason == 'disconnect':
+                    # Ninguém para receber a resposta
+                    self.close_connection = True
+                    return
+                self._send_json(504, build_cancelled_response())
+                self.bridge.tracer.mark(message_id, 'response_sent')
+            except Throttled as throttled:
+                logs.event(log, 'throttled', "🚦 Mensagem limitada pelo agendador",
+                           level=logging.WARNING, sender=sender_id, reason=throttled.reason)
+                self._send_json(429, build_throttled_response(throttled),
+                                {'Retry-After': str(throttled.retry_after)})
+            except Exception as error:
+                logs.event(log, 'api_error', f"❌ Erro na API: {error}", level=logging.ERROR)
+                self._send_json(500, {"reply": "Erro interno do servidor."})
+        else:
+            # Corpo não lido: a conexão não pode ser reaproveitada
+            self.close_connection = True
+            self._send_empty(404)
+
+    def _handle_batch(self):
+        try:
+            data = self._read_json()
+            items = ingest.parse_batch(data)
+        except ValueError as error:
+            self._send_json(400, {"error": str(error)})
+            return
+
+        try:
+            results = self.bridge.ingest_batch(items)
+            options = ingest.options(data)
+            if tickets.wants_async(options, self.headers):
+                self._send_json(202, {"messages": results})
+                return
+
+            token = CancelToken.from_request(options, self.headers, core.CLAUDE_MAX_WAIT)
+            with disconnect_watcher.watch(self.connection, token):
+                results = self.bridge.wait_batch_replies(results, token)
+            self._send_json(200, {"messages": results})
+            self.bridge.tracer.mark_all(answered_ids(results), 'response_sent')
+        except RequestCancelled as cancelled:
+            log_cancelled(cancelled, batch=len(items))
+            self.close_connection = True
+        except Exception as error:
+            logs.event(log, 'api_error', f"❌ Erro na API: {error}", level=logging.ERROR)
+            self._send_json(500, {"reply": "Erro interno do servidor."})
+
+    def _read_json(self):
+        content_length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(content_length).decode('utf-8'))
+
+    def _handle_get(self):
+        parsed = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+        ticket_id, stream = tickets.parse_reply_path(parsed.path)
+        trace_id = parse_trace_path(parsed.path)
+
+        if parsed.path == '/api/test':
+            self._send_json(200, build_test_response(self.bridge))
+        elif parsed.path == '/api/status':
+            self._send_json(200, build_status_response(self.bridge))
+        elif parsed.path == '/api/metrics':
+            body = REGISTRY.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-type', METRICS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif parsed.path.startswith(core.CONVERSATIONS_PREFIX):
+            self._send_json(*build_conversation_response(
+                self.bridge,
+                urllib.parse.unquote(parsed.path[len(core.CONVERSATIONS_PREFIX):]),
+                query.get('limit')
+            ))
+        elif trace_id:
+            self._send_json(*trace_response(self.bridge.tracer, trace_id, query.get('limit')))
+        elif ticket_id and stream:
+            self._stream_reply(ticket_id)
+        elif ticket_id:
+            self._long_poll_reply(ticket_id, query.get('timeout'))
+        else:
+            self._send_empty(404)
+
+    def _send_json(self, status_code, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_empty(self, status_code):
+        self.send_response(status_code)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _long_poll_reply(self, message_id, timeout):
+        """Long-poll da resposta de um ticket"""
+        ticket = self.bridge.find_ticket(message_id)
+        if ticket is None:
+            self._send_json(404, {"ticket": message_id, "error": "Ticket não encontrado ou expirado"})
+            return
+
+        future, deadline = ticket
+        try:
+            future.result(timeout=min(tickets.parse_timeout(timeout), tickets.remaining(deadline) + 1))
+        except FutureTimeoutError:
+            pass
+
+        status_code, payload = tickets.ticket_payload(message_id, future, core.FALLBACK_REPLY)
+        self._send_json(status_code, payload)
+        if future.done():
+            self.bridge.tracer.mark(message_id, 'response_sent')
+
+    def _stream_reply(self, message_id):
+        """Resposta de um ticket via Server-Sent Events"""
+        ticket = self.bridge.find_ticket(message_id)
+        if ticket is None:
+            self._send_json(404, {"ticket": message_id, "error": "Ticket não encontrado ou expirado"})
+            return
+
+        future, _deadline = ticket
+        # O fim do stream é o fechamento da conexão
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+
+        try:
+            self.wfile.write(tickets.sse_event('pending', {"ticket": message_id, "status": "pending"}))
+            self.wfile.flush()
+            while True:
+                try:
+                    future.result(timeout=tickets.SSE_KEEPALIVE_INTERVAL)
+                    break
+                except FutureTimeoutError:
+                    self.wfile.write(tickets.SSE_KEEPALIVE)
+                    self.wfile.flush()
+            _status_code, payload = tickets.ticket_payload(message_id, future, core.FALLBACK_REPLY)
+            self.wfile.write(tickets.sse_event('reply', payload))
+            self.bridge.tracer.mark(message_id, 'response_sent')
+        except (BrokenPipeError, ConnectionResetError):
+            # Cliente desistiu; o ticket continua disponível para long-poll
+            pass
+
+    def log_message(self, format, *args):
+        """Suprimir logs automáticos do servidor"""
+        return
+
+
+def run(bridge, host='0.0.0.0', port=3001):
+    """Serve até Ctrl+C"""
+    server = BridgeHTTPServer((host, port), bridge)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
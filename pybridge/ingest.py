@@ -0,0 +1,72 @@
+"""
+Ingestão em lote: POST /api/whatsapp-chat/batch.
+
+O gateway manda várias mensagens numa requisição só (numa conexão
+persistente), em vez de uma conexão por mensagem:
+
+    {"messages": [{"senderId": "...", "message": "..."}, ...], "async": true}
+
+(a lista também pode vir direto no corpo). As mensagens aceitas pelo
+agendador entram no ~/.claude.json numa única gravação e cada uma ganha o
+seu ticket. Em modo assíncrono (`"async": true` ou Prefer: respond-async)
+a resposta é 202 com os tickets; senão a requisição espera as respostas do
+Claude (até o prazo) e devolve um item por mensagem, na mesma ordem.
+Mensagens de lote não passam pela deduplicação nem pela agregação.
+"""
+
+from pybridge import tickets
+
+MAX_BATCH_MESSAGES = 100
+
+
+class BatchError(ValueError):
+    """Corpo do lote inválido (HTTP 400)"""
+
+
+def parse_batch(data):
+    """Lista de (senderId, message) do corpo; BatchError se inválido"""
+    messages = data.get('messages') if isinstance(data, dict) else data
+    if not isinstance(messages, list) or not messages:
+        raise BatchError('Envie uma lista "messages" com {senderId, message}')
+    if len(messages) > MAX_BATCH_MESSAGES:
+        raise BatchError(f'No máximo {MAX_BATCH_MESSAGES} mensagens por lote')
+
+    items = []
+    for position, item in enumerate(messages):
+        if not isinstance(item, dict) or not item.get('senderId') or not isinstance(item.get('message'), str):
+            raise BatchError(f'Item {position}: senderId e message são obrigatórios')
+        items.append((item['senderId'], item['message']))
+    return items
+
+
+def options(data):
+    """Campos de controle do lote ("async", "timeout"); vazio quando o corpo é a lista"""
+    return data if isinstance(data, dict) else {}
+
+
+def accepted_item(sender_id, message_id):
+    return {"senderId": sender_id, **tickets.accepted_payload(message_id)}
+
+
+def throttled_item(sender_id, throttled, reply):
+    return {
+        "senderId": sender_id,
+        "status": "throttled",
+        "reply": reply,
+        "error": throttled.reason,
+        "retry_after": throttled.retry_after
+    }
+
+
+def failed_item(sender_id, reply):
+    return {"senderId": sender_id, "status": "failed", "reply": reply}
+
+
+def replied_item(item, future, timeout_reply):
+    """Item aceito com o estado atual do ticket (resposta, timeout ou pendente)"""
+    if item.get('status') != 'pending' or future is None:
+        return item
+    _status_code, payload = tickets.ticket_payload(item['ticket'], future, timeout_reply)
+    if payload['status'] == 'pending':
+        return item
+    return {"senderId": item['senderId'], **payload}
@@ -0,0 +1,43 @@
+"""
+Backend JSON do bridge: usa orjson quando instalado, senão a stdlib.
+
+    from pybridge import jsonlib
+    data = jsonlib.loads(raw_bytes)
+    raw = jsonlib.dumps(data, indent=2)   # bytes UTF-8
+
+`indent=None` gera a saída compacta. O orjson só sabe indentar com 2
+espaços; outros valores usam a stdlib.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+def dumps(obj, indent=None):
+    """Serializa para bytes UTF-8 (sem escapar acentos/emoji)"""
+    if orjson is not None and indent in (None, 2):
+        option = orjson.OPT_INDENT_2 if indent == 2 else 0
+        try:
+            return orjson.dumps(obj, option=option)
+        except (orjson.JSONEncodeError, TypeError):
+            # Ex.: inteiros acima de 64 bits; a stdlib aceita
+            pass
+    if indent is None:
+        text = json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+    else:
+        text = json.dumps(obj, ensure_ascii=False, indent=indent)
+    return text.encode('utf-8')
@@ -0,0 +1,84 @@
+"""
+Partida do bridge: escolhe o transporte, constrói o bridge e serve.
+
+O transporte só é importado depois de escolhido, então o Flask (o mais caro
+de importar) não pesa na partida dos outros:
+
+    python claude_bridge.py                          # Flask
+    python claude_bridge_simple.py                   # threads (http.server)
+    python claude_bridge_simple.py --transport async # asyncio
+    python -m pybridge.launcher --transport threaded --port 3002
+
+Cada transporte é um módulo com `bridge_class` (a classe do bridge que ele
+serve) e `run(bridge, host, port)`, que bloqueia até Ctrl+C.
+"""
+
+import argparse
+import importlib
+
+from pybridge import logs
+
+TRANSPORTS = {
+    'flask': 'pybridge.http_flask',
+    'threaded': 'pybridge.http_threaded',
+    'async': 'pybridge.http_async',
+}
+
+ENDPOINTS = (
+    "POST /api/whatsapp-chat - Receber mensagens (\"async\": true → 202 + ticket)",
+    "POST /api/whatsapp-chat/batch - Lote de mensagens numa única gravação",
+    "GET /api/reply/<id> - Long-poll da resposta de um ticket",
+    "GET /api/reply/<id>/stream - Resposta via SSE",
+    "GET /api/conversations/<senderId> - Últimas trocas de um contato",
+    "GET /api/test - Teste do sistema",
+    "GET /api/status - Status detalhado",
+    "GET /api/metrics - Métricas no formato Prometheus",
+    "GET /api/trace/<id> - Tempo de cada etapa da mensagem (/api/trace/slowest)",
+)
+
+
+def load_transport(name):
+    """Importa o módulo do transporte (ImportError se faltar a dependência)"""
+    return importlib.import_module(TRANSPORTS[name])
+
+
+def build_parser(default_transport, description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--transport', choices=sorted(TRANSPORTS), default=default_transport,
+                        help=f'servidor HTTP (padrão: {default_transport})')
+    parser.add_argument('--async', dest='transport', action='store_const', const='async',
+                        help='o mesmo que --transport async')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=3001)
+    return parser
+
+
+def main(argv=None, default_transport='threaded', title='Claude Bridge Python'):
+    args = build_parser(default_transport, title).parse_args(argv)
+    try:
+        transport = load_transport(args.transport)
+    except ImportError as error:
+        raise SystemExit(f"❌ Transporte {args.transport} indisponível: {error}")
+
+    logs.setup()
+    bridge = transport.bridge_class(title=title)
+    print("🔄 Iniciando monitoramento automático...")
+    bridge.start_monitoring()
+
+    print(f"🚀 {title} completo ativo!")
+    print(f"🌐 Servidor HTTP ({args.transport}) na porta {args.port}")
+    print("📋 Endpoints disponíveis:")
+    for endpoint in ENDPOINTS:
+        print(f"   • {endpoint}")
+    print("✍️ Claude deve usar Write tool para responder!\n")
+
+    try:
+        transport.run(bridge, args.host, args.port)
+    except KeyboardInterrupt:
+        print("\n🛑 Parando servidor...")
+    finally:
+        bridge.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+Logging estruturado que não bloqueia o caminho das requisições.
+
+Quem loga só coloca o registro numa fila (QueueHandler); a formatação
+(data, JSON, redação do corpo) e a escrita no stdout acontecem numa thread
+de fundo (QueueListener). Se a saída travar, a fila enche e os registros
+excedentes são descartados e contados, em vez de segurar a requisição.
+
+    from pybridge import logs
+
+    log = logs.get_logger()
+    logs.event(log, 'message_received', '🔔 NOVA MENSAGEM VIA API!',
+               message_id=message_id, sender=sender_id, body=message)
+
+Configuração por variáveis de ambiente (ou argumentos de setup()):
+    BRIDGE_LOG_LEVEL     DEBUG, INFO (padrão), WARNING...
+    BRIDGE_LOG_FORMAT    json (padrão, uma linha JSON por evento) ou text
+    BRIDGE_LOG_SAMPLE    amostragem por evento, "reply_received=10,..."
+                         (1 a cada N; avisos e erros nunca são amostrados)
+    BRIDGE_LOG_MAX_BODY  limite de caracteres de body/reply (padrão 200)
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime
+
+from pybridge.metrics import REGISTRY
+
+LOGGER_NAME = 'bridge'
+QUEUE_SIZE = 10_000
+DEFAULT_MAX_BODY = 200
+
+# Campos com texto do usuário/Claude: truncados e sem vCards inteiros
+BODY_FIELDS = ('body', 'reply')
+
+LOG_DROPPED = REGISTRY.counter(
+    'bridge_log_dropped_total', 'Registros de log descartados com a fila cheia'
+)
+
+_listener = None
+_handler = None
+_setup_lock = threading.Lock()
+
+
+def get_logger(name=None):
+    """Logger do bridge (ou filho: get_logger('replies') → bridge.replies)"""
+    return logging.getLogger(f'{LOGGER_NAME}.{name}' if name else LOGGER_NAME)
+
+
+def event(logger, name, text, level=logging.INFO, **fields):
+    """Registra o evento `name` com campos estruturados"""
+    if logger.isEnabledFor(level):
+        logger.log(level, text, extra={'event': name, 'fields': fields})
+
+
+def redact(text, max_chars=DEFAULT_MAX_BODY):
+    """Resume vCards e trunca textos longos"""
+    if not isinstance(text, str):
+        return text
+    if 'BEGIN:VCARD' in text:
+        return f"<vCard: {text.count('BEGIN:VCARD')} contato(s), {len(text)} caracteres>"
+    if len(text) > max_chars:
+        return f"{text[:max_chars]}… (+{len(text) - max_chars} caracteres)"
+    return text
+
+
+class SamplingFilter(logging.Filter):
+    """Mantém 1 a cada N registros dos eventos configurados"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = dict(rates)
+        self._counters = {name: itertools.count() for name in self.rates}
+
+    def filter(self, record):
+        rate = self.rates.get(getattr(record, 'event', None))
+        if not rate or rate <= 1 or record.levelno >= logging.WARNING:
+            return True
+        # next() de itertools.count é atômico sob o GIL
+        return next(self._counters[record.event]) % rate == 0
+
+
+class _Formatter(logging.Formatter):
+    def __init__(self, max_body):
+        super().__init__()
+        self.max_body = max_body
+
+    def _fields(self, record):
+        fields = dict(getattr(record, 'fields', None) or {})
+        for key in BODY_FIELDS:
+            if key in fields:
+                fields[key] = redact(fields[key], self.max_body)
+        return fields
+
+
+class JsonFormatter(_Formatter):
+    """Uma linha JSON por registro"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, 'event', None),
+            "msg": record.getMessage(),
+        }
+        entry.update(self._fields(record))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(_Formatter):
+    """Formato legível, próximo dos prints antigos"""
+
+    def format(self, record):
+        line = (f"{datetime.fromtimestamp(record.created).strftime('%d/%m/%Y, %H:%M:%S')} "
+                f"{record.getMessage()}")
+        fields = self._fields(record)
+        if fields:
+            line += ' | ' + ' '.join(f'{key}={value!r}' for key, value in fields.items())
+        return line
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que descarta (e conta) em vez de bloquear com a fila cheia"""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+
+
+def _parse_sample(spec):
+    rates = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        name, _, rate = item.partition('=')
+        try:
+            rates[name.strip()] = int(rate)
+        except ValueError:
+            print(f"⚠️ BRIDGE_LOG_SAMPLE inválido ignorado: {item}", file=sys.stderr)
+    return rates
+
+
+def setup(level=None, fmt=None, sample=None, max_body=None, stream=None):
+    """Liga o logger do bridge à thread de escrita (idempotente)"""
+    global _listener, _handler
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        level = level or os.environ.get('BRIDGE_LOG_LEVEL', 'INFO')
+        fmt = fmt or os.environ.get('BRIDGE_LOG_FORMAT', 'json')
+        if sample is None:
+            sample = _parse_sample(os.environ.get('BRIDGE_LOG_SAMPLE'))
+        if max_body is None:
+            max_body = int(os.environ.get('BRIDGE_LOG_MAX_BODY', DEFAULT_MAX_BODY))
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(TextFormatter(max_body) if fmt == 'text' else JsonFormatter(max_body))
+
+        records = queue.Queue(maxsize=QUEUE_SIZE)
+        _handler = _DroppingQueueHandler(records)
+        # Amostragem antes de enfileirar: o registro descartado não custa nada
+        _handler.addFilter(SamplingFilter(sample))
+
+        logger = get_logger()
+        logger.setLevel(level.upper() if isinstance(level, str) else level)
+        logger.addHandler(_handler)
+        logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(records, output)
+        _listener.start()
+        # Esvazia a fila no encerramento
+        atexit.register(shutdown)
+        return _listener
+
+
+def shutdown():
+    """Para a thread de escrita depois de gravar o que estiver na fila"""
+    global _listener, _handler
+    with _setup_lock:
+        if _listener is not None:
+            get_logger().removeHandler(_handler)
+            _listener.stop()
+            _listener = _handler = None
@@ -0,0 +1,266 @@
+"""
+Registro de métricas em processo com exposição no formato texto do
+Prometheus (GET /api/metrics).
+
+Sem dependências; cada métrica tem seu próprio lock, segurado só pelo
+tempo de somar um número, então pode ser usada no caminho quente:
+
+    from pybridge.metrics import REGISTRY
+
+    MESSAGES = REGISTRY.counter('bridge_messages_total', 'Mensagens recebidas', ['source'])
+    MESSAGES.labels(source='api').inc()
+
+    WAIT = REGISTRY.histogram('bridge_wait_seconds', 'Espera pela resposta')
+    with WAIT.time():
+        ...
+
+    REGISTRY.render()   # texto para a resposta HTTP
+"""
+
+import bisect
+import threading
+import time
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Buckets padrão (segundos): de 1 ms até o timeout de 2 minutos
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start)
+        return False
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=(), **kwargs):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._kwargs = kwargs
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._init_value()
+
+    def labels(self, **labels):
+        """Série filha para os valores de label informados"""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = type(self)(self.name, self.documentation, **self._kwargs)
+                    self._children[key] = child
+        return child
+
+    def _samples(self):
+        """[(sufixo, labels extras, valor)] desta série"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        series = sorted(self._children.items()) if self.labelnames else [((), self)]
+        for values, metric in series:
+            for suffix, extra, value in metric._samples():
+                labels = _format_labels(self.labelnames, values, extra)
+                lines.append(f'{self.name}{suffix}{labels} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _init_value(self):
+        self._value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+    def _samples(self):
+        return [('', None, self._value)]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _init_value(self):
+        self._value = 0
+        self._callback = None
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value):
+        self._value = value
+
+    def set_function(self, callback):
+        """Valor lido na hora da coleta (ex.: tamanho de uma fila)"""
+        self._callback = callback
+
+    def track_inprogress(self):
+        """Context manager: +1 na entrada, -1 na saída"""
+        gauge = self
+
+        class _InProgress:
+            def __enter__(self):
+                gauge.inc()
+
+            def __exit__(self, *exc):
+                gauge.dec()
+                return False
+
+        return _InProgress()
+
+    @property
+    def value(self):
+        if self._callback is not None:
+            return self._callback()
+        return self._value
+
+    def _samples(self):
+        return [('', None, self.value)]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, buckets=self.buckets)
+
+    def _init_value(self):
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def time(self):
+        """Context manager que observa a duração do bloco em segundos"""
+        return _Timer(self)
+
+    @property
+    def count(self):
+        return self._count
+
+    def _samples(self):
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            samples.append(('_bucket', ('le', _format_value(bound)), cumulative))
+        samples.append(('_sum', None, total))
+        samples.append(('_count', None, count))
+        return samples
+
+
+class Meter:
+    """Eventos por segundo numa janela deslizante (buckets de 1 s).
+    Use com Gauge.set_function(meter.rate)."""
+
+    def __init__(self, window=60):
+        self.window = window
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def mark(self, count=1):
+        second = int(time.monotonic())
+        with self._lock:
+            self._buckets[second] = self._buckets.get(second, 0) + count
+            if len(self._buckets) > self.window * 2:
+                self._trim(second)
+
+    def rate(self):
+        second = int(time.monotonic())
+        with self._lock:
+            self._trim(second)
+            return sum(self._buckets.values()) / self.window
+
+    def _trim(self, second):
+        oldest = second - self.window
+        for key in [k for k in self._buckets if k <= oldest]:
+            del self._buckets[key]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+# Registro global usado pelas pontes
+REGISTRY = Registry()
@@ -0,0 +1,309 @@
+"""
+Caixa postal de respostas do Claude correlacionadas por message_id.
+
+Cada mensagem injetada pede ao Claude que grave a resposta em
+`<replies_dir>/<message_id>.json`. Uma única thread coletora, bloqueada
+em eventos do diretório (ver pybridge.watcher), acorda exatamente o waiter
+daquela mensagem através de um `concurrent.futures.Future`, em vez de cada
+requisição ficar fazendo polling no mesmo arquivo compartilhado.
+
+O arquivo legado (`claude_response.json`) continua aceito: se trouxer
+`message_id` a resposta vai para esse waiter; sem id, vai para o waiter
+mais antigo (mesmo comportamento de antes, mas sem disputa entre threads).
+
+Tickets (modo assíncrono da API): `open_ticket()` mantém o Future vivo
+depois da resposta, por `retention` segundos, para que o cliente busque a
+resposta depois via long-poll ou SSE.
+
+Mensagens descartadas sem resposta (timeout, cliente desistiu, ticket
+expirado) ficam numa lista de tombstones por `tombstone_ttl` segundos: se o
+Claude gravar a resposta depois, o arquivo é apagado em vez de ficar para
+sempre no diretório.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeoutError
+
+from pybridge import logs
+from pybridge.fsutil import remove_if_exists
+from pybridge.watcher import create_watcher
+
+log = logs.get_logger('replies')
+
+
+class ReplyMailbox:
+    def __init__(self, replies_dir, legacy_path=None, poll_interval=0.2,
+                 rescan_interval=5.0, watcher_backend=None, tombstone_ttl=600):
+        self.replies_dir = replies_dir
+        self.legacy_path = legacy_path
+        # Intervalo do fallback por polling; com inotify só vale o rescan
+        self.poll_interval = poll_interval
+        # Varredura de segurança caso algum evento se perca
+        self.rescan_interval = rescan_interval
+        self.watcher_backend = watcher_backend
+        self.running = True
+
+        # message_id -> Future (ordem de inserção = ordem de chegada). O
+        # Future fica registrado mesmo depois de resolvido, até discard(),
+        # para que um segundo expect() do mesmo id ainda receba a resposta
+        self._waiters = {}
+        self._cond = threading.Condition()
+        self._collector = None
+        self._watcher = None
+
+        # message_id -> (prazo do Claude, expiração do ticket), por ordem de criação
+        self._tickets = OrderedDict()
+        # message_id -> expiração, das mensagens descartadas sem resposta
+        self.tombstone_ttl = tombstone_ttl
+        self._tombstones = OrderedDict()
+
+    def reply_path(self, message_id):
+        """Caminho onde o Claude deve gravar a resposta desta mensagem"""
+        return os.path.join(self.replies_dir, f'{message_id}.json')
+
+    def expect(self, message_id):
+        """Registra um waiter para message_id e retorna seu Future"""
+        message_id = str(message_id)
+        with self._cond:
+            future = self._waiters.get(message_id)
+            if future is None:
+                future = Future()
+                self._waiters[message_id] = future
+            self._tombstones.pop(message_id, None)
+            self._ensure_collector()
+            self._cond.notify_all()
+
+        # A resposta pode ter sido gravada antes do registro
+        self._collect_file(message_id, self.reply_path(message_id))
+        return future
+
+    def discard(self, message_id):
+        """Remove o waiter de message_id (timeout ou resposta entregue)"""
+        message_id = str(message_id)
+        with self._cond:
+            self._bury(message_id, self._waiters.pop(message_id, None))
+
+    def _bury(self, message_id, future):
+        # Chamado com self._cond adquirido. Sem resposta entregue, um arquivo
+        # que chegar depois não tem mais dono: vira tombstone para ser apagado
+        if future is None or (future.done() and not future.cancelled() and future.result()):
+            return
+        self._tombstones[message_id] = time.monotonic() + self.tombstone_ttl
+        self._tombstones.move_to_end(message_id)
+        self._cond.notify_all()
+
+    def wait(self, message_id, timeout, token=None):
+        """Bloqueia até a resposta de message_id chegar ou o timeout expirar
+        (ou, com um CancelToken, até o prazo da requisição/queda do cliente)"""
+        future = self.expect(message_id)
+        try:
+            if token is not None:
+                return future.result() if token.wait(future, timeout) else None
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return None
+        finally:
+            self.discard(message_id)
+
+    def open_ticket(self, message_id, max_wait, retention=300):
+        """Registra um ticket: a resposta fica disponível para busca posterior"""
+        message_id = str(message_id)
+        future = self.expect(message_id)
+        now = time.monotonic()
+        with self._cond:
+            self._tickets[message_id] = (now + max_wait, now + max_wait + retention)
+            self._reap_tickets(now)
+        return future
+
+    def ticket(self, message_id):
+        """Retorna (Future, prazo monotônico) do ticket ou None se não existe/expirou"""
+        message_id = str(message_id)
+        with self._cond:
+            self._reap_tickets(time.monotonic())
+            entry = self._tickets.get(message_id)
+            future = self._waiters.get(message_id)
+            if entry is None or future is None:
+                return None
+            return future, entry[0]
+
+    def waiter(self, message_id):
+        """Future do waiter de message_id ainda registrado (aguardando ou ticket), ou None"""
+        with self._cond:
+            return self._waiters.get(str(message_id))
+
+    def tickets(self):
+        """Quantidade de tickets ainda disponíveis"""
+        with self._cond:
+            return len(self._tickets)
+
+    def _reap_tickets(self, now):
+        # Chamado com self._cond adquirido
+        expired = []
+        for message_id, (deadline, expires) in self._tickets.items():
+            future = self._waiters.get(message_id)
+            if now >= deadline and future is not None:
+                # Claude não respondeu no prazo: libera quem estiver esperando
+                _settle(future, None)
+            if now >= expires:
+                expired.append(message_id)
+        for message_id in expired:
+            del self._tickets[message_id]
+            self._bury(message_id, self._waiters.pop(message_id, None))
+
+    def pending(self):
+        """Quantidade de mensagens aguardando resposta"""
+        with self._cond:
+            return len(self._pending_ids())
+
+    def _pending_ids(self):
+        return [mid for mid, future in self._waiters.items() if not future.done()]
+
+    def close(self):
+        """Encerra a coletora e libera todos os waiters pendentes"""
+        with self._cond:
+            self.running = False
+            waiters = list(self._waiters.values())
+            self._waiters.clear()
+            self._tickets.clear()
+            self._tombstones.clear()
+            self._cond.notify_all()
+            if self._watcher is not None:
+                self._watcher.wake()
+        for future in waiters:
+            _settle(future, None)
+
+    def _ensure_collector(self):
+        if self._collector is None or not self._collector.is_alive():
+            os.makedirs(self.replies_dir, exist_ok=True)
+            self._collector = threading.Thread(
+                target=self._collect_loop,
+                name='reply-collector',
+                daemon=True
+            )
+            self._collector.start()
+
+    def _collect_loop(self):
+        paths = [self.replies_dir]
+        if self.legacy_path:
+            paths.append(self.legacy_path)
+        watcher = create_watcher(paths, poll_interval=self.poll_interval,
+                                 backend=self.watcher_backend)
+        with self._cond:
+            self._watcher = watcher
+
+        try:
+            while True:
+                with self._cond:
+                    # Sem ninguém esperando não há o que varrer
+                    while self.running and not self._pending_ids() and not self._tombstones:
+                        self._cond.wait()
+                    if not self.running:
+                        return
+
+                try:
+                    self._collect()
+                except Exception as error:
+                    log.error(f"❌ Erro ao coletar respostas: {error}")
+
+                with self._cond:
+                    self._reap_tickets(time.monotonic())
+
+                watcher.wait(self.rescan_interval)
+        finally:
+            with self._cond:
+                self._watcher = None
+            watcher.close()
+
+    def _collect(self):
+        with self._cond:
+            pending = self._pending_ids()
+
+        for message_id in pending:
+            self._collect_file(message_id, self.reply_path(message_id))
+
+        if self.legacy_path:
+            self._collect_legacy()
+
+        self._sweep_tombstones()
+
+    def _sweep_tombstones(self):
+        """Apaga respostas tardias de mensagens já descartadas"""
+        now = time.monotonic()
+        with self._cond:
+            buried = list(self._tombstones.items())
+        for message_id, expires in buried:
+            path = self.reply_path(message_id)
+            data = self._read_reply(path)
+            # Arquivo completo, ou o prazo acabou (um incompleto também sai)
+            if data is None and now < expires:
+                continue
+            if remove_if_exists(path):
+                log.warning(f"🗑️ Resposta tardia de {message_id} apagada (ninguém mais aguardava)")
+            with self._cond:
+                if self._tombstones.get(message_id) == expires:
+                    del self._tombstones[message_id]
+
+    def _read_reply(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            # Arquivo ainda sendo escrito; tenta de novo na próxima varredura
+            return None
+
+    def _collect_file(self, message_id, path):
+        data = self._read_reply(path)
+        if not isinstance(data, dict) or not data.get('reply'):
+            return False
+        if self._deliver(message_id, data['reply'], _mtime(path)):
+            remove_if_exists(path)
+            return True
+        return False
+
+    def _collect_legacy(self):
+        data = self._read_reply(self.legacy_path)
+        if not isinstance(data, dict) or not data.get('reply'):
+            return
+
+        message_id = data.get('message_id') or data.get('id')
+        if message_id is None:
+            with self._cond:
+                message_id = next(iter(self._pending_ids()), None)
+            if message_id is None:
+                return
+
+        if self._deliver(str(message_id), data['reply'], _mtime(self.legacy_path)):
+            remove_if_exists(self.legacy_path)
+
+    def _deliver(self, message_id, reply, written_at=None):
+        with self._cond:
+            future = self._waiters.get(message_id)
+        if future is None or future.done():
+            return False
+        # Quando o Claude gravou o arquivo (mtime), para o trace da mensagem
+        future.written_at = written_at
+        return _settle(future, reply)
+
+
+def _settle(future, result):
+    """set_result que perde a corrida em silêncio: a coletora, um expect() e o
+    prazo do ticket podem tentar resolver o mesmo Future (callbacks do Future
+    não rodam sob o lock da caixa postal). False se outro resolveu antes"""
+    try:
+        future.set_result(result)
+        return True
+    except InvalidStateError:
+        return False
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
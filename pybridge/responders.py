@@ -0,0 +1,173 @@
+"""
+Respondedores locais: resposta imediata quando o Claude demora.
+
+Cadeia plugável: cada respondedor tem `respond(sender_id, message)` e
+devolve o texto ou None; vale o primeiro que responder.
+
+    chain = ResponderChain([KeywordResponder.from_file(DEFAULT_RULES_PATH)])
+    reply = chain.respond(sender_id, "que horas vocês abrem?")
+
+O KeywordResponder usa as mesmas regras do smart-responder.js, num JSON
+(`responder_rules.json`) lido uma vez e indexado por palavra: achar a regra
+custa uma consulta por palavra da mensagem, não um regex por regra. Regras
+(na ordem do arquivo, a primeira que casar vence):
+  • "keywords": palavras ou frases sem acento; "preco*" casa prefixo;
+  • "match": "exact" exige a mensagem inteira igual a uma keyword;
+  • "requires": palavras que também precisam aparecer;
+  • "match": "question" casa perguntas ("?" ou começa com que/qual/como);
+  • "match": "any" casa qualquer mensagem (resposta padrão); com
+    fallback=False essa regra é ignorada e mensagens sem regra específica
+    ficam sem resposta local (é assim que o hedge usa o respondedor).
+As respostas aceitam {message}, {time} e {date} (horário de Brasília).
+
+    python -m pybridge.responders "quanto custa?"
+"""
+
+import argparse
+import os
+import random
+import re
+import unicodedata
+from datetime import datetime
+
+from pybridge import jsonlib
+from pybridge.metrics import REGISTRY
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+    try:
+        TIMEZONE = ZoneInfo('America/Sao_Paulo')
+    except ZoneInfoNotFoundError:
+        TIMEZONE = None
+except ImportError:
+    TIMEZONE = None
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'responder_rules.json')
+
+LOCAL_REPLIES = REGISTRY.counter(
+    'bridge_local_replies_total', 'Respostas dadas pelo respondedor local', ['rule']
+)
+
+WEEKDAYS = ('segunda-feira', 'terça-feira', 'quarta-feira', 'quinta-feira',
+            'sexta-feira', 'sábado', 'domingo')
+MONTHS = ('janeiro', 'fevereiro', 'março', 'abril', 'maio', 'junho', 'julho',
+          'agosto', 'setembro', 'outubro', 'novembro', 'dezembro')
+QUESTION_WORDS = ('que', 'qual', 'como')
+WORD = re.compile(r'\w+')
+
+
+def normalize(text):
+    """Minúsculas e sem acentos ("Orçamento" -> "orcamento")"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def words(text):
+    return WORD.findall(normalize(text))
+
+
+def template_fields(message):
+    now = datetime.now(TIMEZONE)
+    return {
+        "message": message,
+        "time": now.strftime('%H:%M:%S'),
+        "date": f"{WEEKDAYS[now.weekday()]}, {now.day} de {MONTHS[now.month - 1]} de {now.year}",
+    }
+
+
+class KeywordResponder:
+    def __init__(self, rules, fallback=True):
+        self.rules = rules
+        # Mensagem inteira normalizada -> regra (match "exact")
+        self._exact = {}
+        # Primeira palavra da keyword -> [(palavras da frase, regra)]
+        self._phrases = {}
+        # Três primeiras letras -> [(prefixo, regra)] para keywords "xxx*"
+        self._prefixes = {}
+        self._question = None
+        self._fallback = None
+
+        for position, rule in enumerate(rules):
+            match = rule.get('match', 'keywords')
+            if match == 'question' and self._question is None:
+                self._question = position
+            elif match == 'any' and fallback and self._fallback is None:
+                self._fallback = position
+            for keyword in rule.get('keywords', ()):
+                if match == 'exact':
+                    self._exact.setdefault(' '.join(words(keyword)), position)
+                elif keyword.endswith('*'):
+                    prefix = normalize(keyword[:-1])
+                    self._prefixes.setdefault(prefix[:3], []).append((prefix, position))
+                else:
+                    phrase = tuple(words(keyword))
+                    self._phrases.setdefault(phrase[0], []).append((phrase, position))
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_RULES_PATH, fallback=True):
+        with open(path, 'rb') as f:
+            return cls(jsonlib.loads(f.read()), fallback=fallback)
+
+    def match(self, message):
+        """Regra que responde a mensagem, ou None"""
+        tokens = words(message)
+        best = self._exact.get(' '.join(tokens))
+        present = set(tokens)
+
+        for i, token in enumerate(tokens):
+            for phrase, position in self._phrases.get(token, ()):
+                if (best is None or position < best) and tuple(tokens[i:i + len(phrase)]) == phrase \
+                        and self._requirements_met(position, present):
+                    best = position
+            for prefix, position in self._prefixes.get(token[:3], ()):
+                if (best is None or position < best) and token.startswith(prefix) \
+                        and self._requirements_met(position, present):
+                    best = position
+
+        if best is None and self._question is not None and (
+            '?' in message or (tokens and tokens[0] in QUESTION_WORDS)
+        ):
+            best = self._question
+        if best is None:
+            best = self._fallback
+        return self.rules[best] if best is not None else None
+
+    def respond(self, sender_id, message):
+        rule = self.match(message)
+        if rule is None:
+            return None
+        LOCAL_REPLIES.labels(rule=rule['name']).inc()
+        return random.choice(rule['replies']).format_map(template_fields(message))
+
+    def _requirements_met(self, position, present):
+        return all(word in present for word in self.rules[position].get('requires', ()))
+
+
+class ResponderChain:
+    def __init__(self, responders):
+        self.responders = list(responders)
+
+    def respond(self, sender_id, message):
+        for responder in self.responders:
+            reply = responder.respond(sender_id, message)
+            if reply is not None:
+                return reply
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Testa as regras do respondedor local')
+    parser.add_argument('message')
+    parser.add_argument('--rules', default=DEFAULT_RULES_PATH)
+    args = parser.parse_args()
+
+    responder = KeywordResponder.from_file(args.rules)
+    rule = responder.match(args.message)
+    if rule is None:
+        parser.exit(1, "❌ Nenhuma regra casou\n")
+    print(f"🧩 Regra: {rule['name']}")
+    print(random.choice(rule['replies']).format_map(template_fields(args.message)))
+
+
+if __name__ == '__main__':
+    main()
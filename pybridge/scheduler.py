@@ -0,0 +1,262 @@
+"""
+Agendador justo por remetente na frente da injeção.
+
+Cada senderId tem um token bucket (taxa + rajada). A mensagem que tem token
+entra na fila do seu contato; um número limitado de mensagens fica em
+andamento (injetada e aguardando o Claude) e as vagas são distribuídas em
+round-robin entre os contatos com fila, com os números da lista de
+prioridade atendidos antes. Sem token, com a fila do contato cheia ou depois
+de esperar demais por vaga, a requisição recebe `Throttled` na hora (HTTP
+429 + Retry-After) em vez de ficar pendurada por 2 minutos.
+
+    scheduler = SenderScheduler(rate=0.2, burst=5, max_in_flight=32)
+    try:
+        with scheduler.slot(sender_id):
+            ...                        # injeta e aguarda a resposta
+    except Throttled as throttled:
+        ...                            # 429, Retry-After: throttled.retry_after
+
+Versão asyncio: `async with scheduler.slot_async(sender_id): ...`
+
+Com um CancelToken (pybridge.cancel), a espera por vaga termina no prazo
+da requisição ou quando o cliente cai, e a mensagem sai da fila.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import asynccontextmanager, contextmanager
+
+from pybridge.cancel import MESSAGES_WITHDRAWN, RequestCancelled, reclaim
+from pybridge.metrics import REGISTRY
+
+SCHEDULER_THROTTLED = REGISTRY.counter(
+    'bridge_scheduler_throttled_total', 'Mensagens recusadas pelo agendador', ['reason']
+)
+SCHEDULER_QUEUE_WAIT = REGISTRY.histogram(
+    'bridge_scheduler_queue_wait_seconds', 'Espera por vaga no agendador'
+)
+
+
+class Throttled(Exception):
+    """Mensagem recusada; retry_after em segundos"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f'{reason} (tente em {retry_after}s)')
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now):
+        """Consome um token; retorna 0 ou os segundos até o próximo token"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class SenderScheduler:
+    def __init__(self, rate=0.2, burst=5, max_in_flight=32, max_queued_per_sender=3,
+                 max_queue_wait=30, priority_senders=(), max_buckets=10_000):
+        # rate em mensagens por segundo por contato; burst = rajada tolerada
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.max_queued_per_sender = max_queued_per_sender
+        self.max_queue_wait = max_queue_wait
+        self.priority_senders = set(priority_senders)
+        self.max_buckets = max_buckets
+
+        self._lock = threading.Lock()
+        # senderId -> TokenBucket; ordem = LRU (bucket esquecido = bucket cheio)
+        self._buckets = OrderedDict()
+        # senderId -> deque de Futures aguardando vaga
+        self._queues = {}
+        # Contatos com fila, na ordem do round-robin (prioritários à parte)
+        self._ready = deque()
+        self._ready_priority = deque()
+        self.in_flight = 0
+        self.dispatched = 0
+        self.throttled = 0
+
+    def submit(self, sender_id):
+        """Reserva um lugar na fila do contato; Future resolvido ao ganhar a vaga"""
+        now = time.monotonic()
+        with self._lock:
+            queue = self._queues.get(sender_id, ())
+            if len(queue) >= self.max_queued_per_sender:
+                self._reject('sender_queue_full')
+                raise Throttled('sender_queue_full', math.ceil(1 / self.rate))
+
+            wait = self._bucket(sender_id, now).take(now)
+            if wait:
+                self._reject('rate_limited')
+                raise Throttled('rate_limited', math.ceil(wait))
+
+            future = Future()
+            future.queued_at = now
+            if not queue:
+                queue = self._queues[sender_id] = deque()
+                ready = self._ready_priority if sender_id in self.priority_senders else self._ready
+                ready.append(sender_id)
+            queue.append(future)
+            to_start = self._dispatch()
+
+        self._start(to_start)
+        return future
+
+    def admit(self, sender_id):
+        """Só o token bucket do contato, sem fila nem vaga: para mensagens
+        injetadas na hora (lote) que não seguram vaga enquanto aguardam"""
+        now = time.monotonic()
+        with self._lock:
+            wait = self._bucket(sender_id, now).take(now)
+            if wait:
+                self._reject('rate_limited')
+                raise Throttled('rate_limited', math.ceil(wait))
+
+    def cancel(self, sender_id, future):
+        """Desiste da fila; False se a vaga já tinha sido concedida"""
+        with self._lock:
+            if not future.cancel():
+                return False
+            queue = self._queues.get(sender_id)
+            if queue is not None and future in queue:
+                queue.remove(future)
+                if not queue:
+                    del self._queues[sender_id]
+                    for ready in (self._ready, self._ready_priority):
+                        if sender_id in ready:
+                            ready.remove(sender_id)
+            return True
+
+    def release(self):
+        """Libera a vaga de uma mensagem concluída"""
+        with self._lock:
+            self.in_flight -= 1
+            to_start = self._dispatch()
+        self._start(to_start)
+
+    @contextmanager
+    def slot(self, sender_id, token=None):
+        """Vaga do contato; com `token`, desiste da fila se o prazo da
+        requisição acabar ou o cliente cair (RequestCancelled)"""
+        future = self.submit(sender_id)
+        if token is None:
+            try:
+                future.result(timeout=self.max_queue_wait)
+            except FutureTimeoutError:
+                pass
+        else:
+            token.wait(future, self.max_queue_wait)
+        if not future.done() and self.cancel(sender_id, future):
+            if token is not None and token.cancelled:
+                MESSAGES_WITHDRAWN.labels(stage='scheduler').inc()
+                raise RequestCancelled(token.reason)
+            self._reject('queue_timeout', locked=False)
+            raise Throttled('queue_timeout', math.ceil(self.max_queue_wait))
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def slot_async(self, sender_id, token=None):
+        import asyncio  # só o transporte asyncio chega aqui
+        future = self.submit(sender_id)
+        started = time.monotonic()
+        timeout = token.remaining(self.max_queue_wait) if token is not None else self.max_queue_wait
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=timeout)
+        except asyncio.TimeoutError:
+            if self.cancel(sender_id, future):
+                if token is not None and token.cancelled:
+                    reclaim(token.reason, self.max_queue_wait - (time.monotonic() - started))
+                    MESSAGES_WITHDRAWN.labels(stage='scheduler').inc()
+                    raise RequestCancelled(token.reason)
+                self._reject('queue_timeout', locked=False)
+                raise Throttled('queue_timeout', math.ceil(self.max_queue_wait))
+        except asyncio.CancelledError:
+            # Requisição abortada: devolve a vaga se ela já tinha sido concedida
+            if self.cancel(sender_id, future):
+                reclaim('disconnect', self.max_queue_wait - (time.monotonic() - started))
+                MESSAGES_WITHDRAWN.labels(stage='scheduler').inc()
+            else:
+                self.release()
+            raise
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "queued": sum(len(queue) for queue in self._queues.values()),
+                "senders_waiting": len(self._queues),
+                "dispatched": self.dispatched,
+                "throttled": self.throttled,
+                "tracked_senders": len(self._buckets),
+            }
+
+    def _bucket(self, sender_id, now):
+        bucket = self._buckets.get(sender_id)
+        if bucket is None:
+            bucket = self._buckets[sender_id] = TokenBucket(self.rate, self.burst, now)
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(sender_id)
+        return bucket
+
+    def _dispatch(self):
+        """Concede vagas livres em round-robin (chamar com o lock)"""
+        started = []
+        while self.in_flight < self.max_in_flight:
+            ready = self._ready_priority or self._ready
+            if not ready:
+                break
+            sender_id = ready.popleft()
+            queue = self._queues[sender_id]
+            future = queue.popleft()
+            if queue:
+                # Ainda tem mensagens: volta para o fim da vez
+                ready.append(sender_id)
+            else:
+                del self._queues[sender_id]
+            if not future.set_running_or_notify_cancel():
+                continue
+            self.in_flight += 1
+            self.dispatched += 1
+            started.append(future)
+        return started
+
+    def _start(self, futures):
+        # Fora do lock: set_result roda os callbacks dos waiters
+        now = time.monotonic()
+        for future in futures:
+            SCHEDULER_QUEUE_WAIT.observe(now - future.queued_at)
+            future.set_result(True)
+
+    def _reject(self, reason, locked=True):
+        if locked:
+            self.throttled += 1
+        else:
+            with self._lock:
+                self.throttled += 1
+        SCHEDULER_THROTTLED.labels(reason=reason).inc()
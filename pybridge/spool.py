@@ -0,0 +1,191 @@
+"""
+Spool de entrada durável: JSONL segmentado, somente append, com checkpoint
+do consumidor.
+
+    spool = Spool('/home/user/whatsapp_spool')
+    spool.append({"id": "...", "senderId": "...", "message": "..."})
+
+    records, position = spool.read_batch()
+    for record in records:
+        ...
+    spool.commit(position)
+
+Os segmentos são `00000001.jsonl`, `00000002.jsonl`, ... e sempre se grava
+no mais recente; quando ele passa de `segment_bytes` um novo é aberto. O
+consumidor guarda (segmento, offset) em `checkpoint.json` (escrita
+atômica), então depois de um restart a leitura recomeça com um seek direto
+no ponto certo, sem reler o arquivo inteiro. Segmentos já consumidos são
+apagados.
+
+Entrega é "pelo menos uma vez": uma queda entre processar e commit()
+reprocessa o lote.
+"""
+
+import fcntl
+import json
+import os
+import re
+import time
+
+from pybridge import logs
+from pybridge.fsutil import remove_if_exists, write_atomic
+
+log = logs.get_logger('spool')
+
+SEGMENT_PATTERN = re.compile(r'^(\d{8})\.jsonl$')
+
+
+class Spool:
+    def __init__(self, directory, segment_bytes=8 * 1024 * 1024, fsync=False,
+                 rotation_grace=5.0):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        # fsync a cada append: mais lento, sobrevive a queda de energia
+        self.fsync = fsync
+        # Só abandona um segmento antigo depois que o novo existe há esse
+        # tempo, para não perder appends de quem ainda estava no antigo
+        self.rotation_grace = rotation_grace
+
+        self._lock_path = os.path.join(directory, '.lock')
+        self._checkpoint_path = os.path.join(directory, 'checkpoint.json')
+        self._checkpoint = None
+
+    # ---- produtor -------------------------------------------------------
+
+    def append(self, record):
+        """Grava um registro no segmento atual; retorna (segmento, offset)"""
+        # Horário de entrada no spool: base do atraso do monitor nas métricas
+        if 'spooledAt' not in record:
+            record = {**record, 'spooledAt': time.time()}
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        os.makedirs(self.directory, exist_ok=True)
+
+        with open(self._lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            segments = self.segments()
+            segment = segments[-1] if segments else 1
+            path = self.segment_path(segment)
+            try:
+                size = os.path.getsize(path)
+            except FileNotFoundError:
+                size = 0
+            if size and size + len(line) > self.segment_bytes:
+                segment += 1
+                path = self.segment_path(segment)
+                size = 0
+
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+                if self.fsync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+        return segment, size
+
+    # ---- consumidor -----------------------------------------------------
+
+    def segment_path(self, segment):
+        return os.path.join(self.directory, f'{segment:08d}.jsonl')
+
+    def segments(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(int(m.group(1)) for m in map(SEGMENT_PATTERN.match, names) if m)
+
+    def checkpoint(self):
+        """Posição confirmada do consumidor e metadados: (segmento, offset), meta"""
+        if self._checkpoint is None:
+            try:
+                with open(self._checkpoint_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self._checkpoint = data
+            except (FileNotFoundError, ValueError):
+                segments = self.segments()
+                self._checkpoint = {"segment": segments[0] if segments else 1,
+                                    "offset": 0, "meta": {}}
+        data = self._checkpoint
+        return (data['segment'], data['offset']), data.get('meta', {})
+
+    def read_batch(self, max_records=100, position=None):
+        """Lê até max_records registros completos a partir do checkpoint.
+        Retorna (registros, próxima posição); a posição só vale após commit()."""
+        if position is None:
+            position, _meta = self.checkpoint()
+        segment, offset = position
+        records = []
+
+        while len(records) < max_records:
+            path = self.segment_path(segment)
+            try:
+                with open(path, 'rb') as f:
+                    f.seek(offset)
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            break  # registro ainda sendo gravado
+                        offset += len(line)
+                        line = line.strip()
+                        if line:
+                            try:
+                                records.append(json.loads(line))
+                            except ValueError:
+                                log.warning(f"⚠️ Registro inválido no spool ignorado: {path}@{offset}")
+                        if len(records) >= max_records:
+                            break
+            except FileNotFoundError:
+                pass
+
+            if len(records) >= max_records:
+                break
+
+            # Fim do segmento: segue para o próximo se ele já estiver estável
+            newer = [s for s in self.segments() if s > segment]
+            if not newer or not self._sealed(segment, newer[0]):
+                break
+            segment, offset = newer[0], 0
+
+        return records, (segment, offset)
+
+    def _sealed(self, segment, next_segment):
+        try:
+            age = time.time() - os.stat(self.segment_path(next_segment)).st_mtime
+        except FileNotFoundError:
+            return False
+        return age >= self.rotation_grace
+
+    def commit(self, position, **meta):
+        """Persiste a posição consumida (e metadados) e apaga segmentos consumidos"""
+        _old_position, old_meta = self.checkpoint()
+        data = {"segment": position[0], "offset": position[1],
+                "meta": {**old_meta, **meta}}
+
+        os.makedirs(self.directory, exist_ok=True)
+        write_atomic(self._checkpoint_path, json.dumps(data).encode('utf-8'), fsync=True)
+        self._checkpoint = data
+
+        for segment in self.segments():
+            if segment >= position[0]:
+                break
+            remove_if_exists(self.segment_path(segment))
+
+    def set_meta(self, **meta):
+        """Atualiza só os metadados do checkpoint"""
+        position, _meta = self.checkpoint()
+        self.commit(position, **meta)
+
+    def backlog_bytes(self):
+        """Bytes ainda não consumidos (aproximado)"""
+        (segment, offset), _meta = self.checkpoint()
+        total = 0
+        for s in self.segments():
+            if s < segment:
+                continue
+            try:
+                total += os.path.getsize(self.segment_path(s))
+            except FileNotFoundError:
+                continue
+            if s == segment:
+                total -= offset
+        return max(total, 0)
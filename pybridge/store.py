@@ -0,0 +1,592 @@
+"""
+Armazenamento compartilhado em SQLite (modo WAL) para vários processos do bridge.
+
+Substitui os JSONs reescritos por inteiro (whatsapp_messages.json como
+fila, pending_messages.json, claude_responses.json, conversation_log.json)
+por três tabelas num único arquivo:
+
+  • inbox    mensagens recebidas e seu estado
+             (pending → claimed → injected → replied | timeout | failed);
+  • replies  respostas do Claude por message_id (outbox);
+  • history  turnos de conversa por contato.
+
+Com WAL, leitores não bloqueiam o escritor e cada processo (ou worker do
+Flask) abre suas próprias conexões, num pool pequeno compartilhado pelas
+threads do processo (`pool_size`). O monitor de cada processo reivindica
+lotes da inbox com um UPDATE atômico, então duas instâncias nunca
+processam a mesma mensagem.
+
+O banco não cresce sem limite: o histórico guarda só os últimos turnos de
+cada contato, e `prune()` (chamado pelo monitor a cada `prune_interval`)
+apaga mensagens já tratadas e respostas mais velhas que `retention` e
+turnos mais velhos que `history_retention`. Os bytes pendentes na inbox
+ficam num contador mantido por triggers, sem varrer a tabela.
+
+Os adaptadores `Inbox` e `SqliteConversations` têm a mesma interface do
+Spool e do ConversationStore, e o bridge troca um pelo outro
+(BRIDGE_STORE=files mantém os arquivos antigos). Os JSONs legados podem ser
+gerados a partir do banco (com o que ainda está dentro da retenção):
+
+    python -m pybridge.store export /home/user/whatsapp_bridge.db /home/user/export
+    python -m pybridge.store prune /home/user/whatsapp_bridge.db
+"""
+
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from pybridge import logs
+from pybridge.fsutil import iso_utc, write_atomic
+
+log = logs.get_logger('store')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inbox (
+    id          TEXT PRIMARY KEY,
+    sender_id   TEXT,
+    message     TEXT,
+    source      TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    received_at REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    claimed_by  TEXT,
+    payload     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS inbox_status ON inbox(status, received_at);
+CREATE INDEX IF NOT EXISTS inbox_sender ON inbox(sender_id, received_at);
+
+CREATE TABLE IF NOT EXISTS replies (
+    message_id TEXT PRIMARY KEY,
+    reply      TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS replies_status ON replies(status, created_at);
+
+CREATE TABLE IF NOT EXISTS history (
+    seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+    sender_id  TEXT NOT NULL,
+    role       TEXT NOT NULL,
+    text       TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_sender ON history(sender_id, seq);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Bytes das mensagens pendentes, atualizados na mesma transação de cada
+# INSERT/UPDATE/DELETE da inbox. Os triggers vêm antes da carga inicial do
+# contador, na mesma transação, para nenhuma mensagem ficar de fora; num
+# banco já existente a carga é ignorada (o SUM sempre devolve uma linha)
+PENDING_BYTES_SCHEMA = """
+BEGIN IMMEDIATE;
+CREATE TRIGGER IF NOT EXISTS inbox_pending_insert AFTER INSERT ON inbox
+WHEN NEW.status = 'pending'
+BEGIN
+    UPDATE counters SET value = value + LENGTH(NEW.payload) WHERE name = 'pending_bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS inbox_pending_update AFTER UPDATE OF status ON inbox
+WHEN (OLD.status = 'pending') <> (NEW.status = 'pending')
+BEGIN
+    UPDATE counters
+    SET value = value + CASE WHEN NEW.status = 'pending' THEN LENGTH(NEW.payload)
+                             ELSE -LENGTH(OLD.payload) END
+    WHERE name = 'pending_bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS inbox_pending_delete AFTER DELETE ON inbox
+WHEN OLD.status = 'pending'
+BEGIN
+    UPDATE counters SET value = value - LENGTH(OLD.payload) WHERE name = 'pending_bytes';
+END;
+INSERT OR IGNORE INTO counters (name, value)
+SELECT 'pending_bytes', COALESCE(SUM(LENGTH(payload)), 0) FROM inbox WHERE status = 'pending';
+COMMIT;
+"""
+
+# Estados finais: a mensagem não volta mais para a fila
+FINAL_STATUSES = ('replied', 'timeout', 'failed', 'withdrawn')
+# Estados ainda na fila: nunca saem pela retenção
+QUEUED_STATUSES = ('pending', 'claimed')
+# Linhas apagadas por DELETE na retenção (transações curtas)
+PRUNE_CHUNK = 1000
+# UPDATE ... RETURNING só existe a partir do SQLite 3.35; antes disso a
+# reivindicação é SELECT + UPDATE numa transação BEGIN IMMEDIATE
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+class MessageStore:
+    def __init__(self, path, busy_timeout=5.0, claim_timeout=300, poll_interval=0.25,
+                 retention=7 * 24 * 3600, history_retention=30 * 24 * 3600, prune_interval=600,
+                 pool_size=8):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        # Mensagem reivindicada há mais tempo que isso volta para a fila
+        # (o processo que a pegou morreu antes de injetar)
+        self.claim_timeout = claim_timeout
+        self.poll_interval = poll_interval
+        # Mensagens tratadas e respostas saem depois de `retention`; turnos
+        # do histórico depois de `history_retention` (segundos)
+        self.retention = retention
+        self.history_retention = history_retention
+        self.prune_interval = prune_interval
+        self.owner = f'{os.uname().nodename}:{os.getpid()}'
+
+        # Conexões reaproveitadas entre threads, no máximo pool_size abertas
+        # (uma por thread vazaria uma conexão a cada thread do servidor HTTP)
+        self._pool = queue.LifoQueue()
+        self._pool_slots = threading.BoundedSemaphore(pool_size)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as db:
+            db.executescript(SCHEMA)
+            db.executescript(PENDING_BYTES_SCHEMA)
+
+        # Respostas de tickets abertos por outros processos (ver remote_ticket)
+        self._remote = {}
+        self._remote_lock = threading.Lock()
+        self._remote_thread = None
+
+        self.inbox = Inbox(self)
+
+    @contextmanager
+    def _connection(self):
+        """Conexão do pool durante o bloco (espera se todas estiverem em uso).
+        Não aninhar: cada bloco ocupa uma vaga do pool"""
+        self._pool_slots.acquire()
+        try:
+            try:
+                db = self._pool.get_nowait()
+            except queue.Empty:
+                db = self._open()
+            try:
+                yield db
+            finally:
+                if db.in_transaction:
+                    # Transação largada aberta (falhou até o ROLLBACK): descarta
+                    db.close()
+                else:
+                    self._pool.put(db)
+        finally:
+            self._pool_slots.release()
+
+    def _open(self):
+        # autocommit: cada comando é uma transação curta; BEGIN explícito
+        # só onde é preciso ler e escrever de forma atômica
+        db = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                             isolation_level=None, check_same_thread=False)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        return db
+
+    def close(self):
+        """Fecha as conexões ociosas do pool"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    # Inbox ---------------------------------------------------------------
+
+    def enqueue(self, record, source='file', status='pending'):
+        """Insere a mensagem (ignora id repetido); True se for nova"""
+        now = time.time()
+        with self._connection() as db:
+            cursor = db.execute(
+                'INSERT OR IGNORE INTO inbox (id, sender_id, message, source, status,'
+                ' received_at, updated_at, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (str(record['id']), record.get('senderId'), record.get('message'), source, status,
+                 now, now, json.dumps(record, ensure_ascii=False))
+            )
+            return cursor.rowcount == 1
+
+    def claim(self, limit):
+        """Reivindica até `limit` mensagens pendentes para este processo"""
+        if not HAS_RETURNING:
+            return self._claim_locked(limit)
+        now = time.time()
+        with self._connection() as db:
+            rows = db.execute(
+                'UPDATE inbox SET status = ?, claimed_by = ?, updated_at = ?'
+                ' WHERE id IN (SELECT id FROM inbox WHERE status = ?'
+                '              ORDER BY received_at LIMIT ?)'
+                ' RETURNING received_at, payload',
+                ('claimed', self.owner, now, 'pending', limit)
+            ).fetchall()
+        # RETURNING não garante ordem
+        return [json.loads(payload) for _received, payload in sorted(rows)]
+
+    def _claim_locked(self, limit):
+        # BEGIN IMMEDIATE pega o lock de escrita antes do SELECT: outro
+        # processo não reivindica as mesmas linhas no meio
+        with self._connection() as db:
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                rows = db.execute(
+                    'SELECT id, payload FROM inbox WHERE status = ? ORDER BY received_at LIMIT ?',
+                    ('pending', limit)
+                ).fetchall()
+                now = time.time()
+                db.executemany(
+                    'UPDATE inbox SET status = ?, claimed_by = ?, updated_at = ? WHERE id = ?',
+                    [('claimed', self.owner, now, message_id) for message_id, _payload in rows]
+                )
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+        return [json.loads(payload) for _message_id, payload in rows]
+
+    def requeue_stale_claims(self):
+        cutoff = time.time() - self.claim_timeout
+        with self._connection() as db:
+            cursor = db.execute(
+                "UPDATE inbox SET status = 'pending', claimed_by = NULL"
+                " WHERE status = 'claimed' AND updated_at < ?",
+                (cutoff,)
+            )
+        if cursor.rowcount:
+            log.warning(f"⚠️ {cursor.rowcount} mensagem(ns) reivindicada(s) sem injeção voltaram para a fila")
+        return cursor.rowcount
+
+    def track(self, message_id, sender_id, message, source='api'):
+        """Registra uma mensagem que não passou pela fila (ex.: POST da API)"""
+        self.enqueue({"id": message_id, "senderId": sender_id, "message": message},
+                     source=source, status='received')
+
+    def mark(self, message_id, status):
+        """Atualiza o estado; mensagens já finalizadas não mudam"""
+        with self._connection() as db:
+            db.execute(
+                'UPDATE inbox SET status = ?, updated_at = ?'
+                ' WHERE id = ? AND status NOT IN (%s)' % ', '.join('?' * len(FINAL_STATUSES)),
+                (status, time.time(), str(message_id), *FINAL_STATUSES)
+            )
+
+    def pending_bytes(self):
+        with self._connection() as db:
+            row = db.execute("SELECT value FROM counters WHERE name = 'pending_bytes'").fetchone()
+        return row[0] if row else 0
+
+    def status_counts(self):
+        with self._connection() as db:
+            rows = db.execute('SELECT status, COUNT(*) FROM inbox GROUP BY status').fetchall()
+        return dict(rows)
+
+    # Respostas -----------------------------------------------------------
+
+    def save_reply(self, message_id, reply):
+        with self._connection() as db:
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                db.execute(
+                    'INSERT OR REPLACE INTO replies (message_id, reply, status, created_at)'
+                    ' VALUES (?, ?, ?, ?)',
+                    (str(message_id), reply, 'received', time.time())
+                )
+                db.execute("UPDATE inbox SET status = 'replied', updated_at = ? WHERE id = ?",
+                           (time.time(), str(message_id)))
+                db.execute('COMMIT')
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+
+    def reply_for(self, message_id):
+        with self._connection() as db:
+            row = db.execute(
+                'SELECT reply FROM replies WHERE message_id = ?', (str(message_id),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def remote_ticket(self, message_id, max_wait):
+        """(Future, prazo monotônico) de uma mensagem de outro processo, ou None.
+        O Future é resolvido quando a resposta aparece no banco"""
+        message_id = str(message_id)
+        with self._connection() as db:
+            row = db.execute(
+                'SELECT status, received_at FROM inbox WHERE id = ?', (message_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, received_at = row
+        deadline = time.monotonic() + max(0.0, received_at + max_wait - time.time())
+
+        future = Future()
+        reply = self.reply_for(message_id)
+        if reply is not None:
+            future.set_result(reply)
+        elif status in FINAL_STATUSES or time.monotonic() >= deadline:
+            future.set_result(None)
+        else:
+            with self._remote_lock:
+                self._remote.setdefault(message_id, []).append((future, deadline))
+                self._ensure_remote_poller()
+        return future, deadline
+
+    def _ensure_remote_poller(self):
+        # Chamado com self._remote_lock adquirido
+        if self._remote_thread is None or not self._remote_thread.is_alive():
+            self._remote_thread = threading.Thread(target=self._poll_remote, daemon=True,
+                                                   name='store-remote-replies')
+            self._remote_thread.start()
+
+    def _poll_remote(self):
+        while True:
+            with self._remote_lock:
+                if not self._remote:
+                    self._remote_thread = None
+                    return
+                ids = list(self._remote)
+            placeholders = ','.join('?' * len(ids))
+            try:
+                with self._connection() as db:
+                    replies = dict(db.execute(
+                        f'SELECT message_id, reply FROM replies WHERE message_id IN ({placeholders})', ids
+                    ).fetchall())
+            except sqlite3.Error as error:
+                log.error(f"❌ Erro ao buscar respostas no store: {error}")
+                replies = {}
+
+            now = time.monotonic()
+            resolved = []
+            with self._remote_lock:
+                for message_id in ids:
+                    waiters = self._remote.get(message_id, [])
+                    reply = replies.get(message_id)
+                    keep = []
+                    for future, deadline in waiters:
+                        if reply is not None:
+                            resolved.append((future, reply))
+                        elif now >= deadline:
+                            resolved.append((future, None))
+                        else:
+                            keep.append((future, deadline))
+                    if keep:
+                        self._remote[message_id] = keep
+                    else:
+                        self._remote.pop(message_id, None)
+            for future, reply in resolved:
+                if not future.done():
+                    future.set_result(reply)
+            time.sleep(self.poll_interval)
+
+    # Histórico -----------------------------------------------------------
+
+    def add_turn(self, sender_id, role, text, keep=None):
+        """Grava o turno; com `keep`, apaga os turnos do contato além dos últimos `keep`"""
+        with self._connection() as db:
+            db.execute(
+                'INSERT INTO history (sender_id, role, text, created_at) VALUES (?, ?, ?, ?)',
+                (sender_id, role, text, time.time())
+            )
+            if keep:
+                db.execute(
+                    'DELETE FROM history WHERE sender_id = ? AND seq <= ('
+                    ' SELECT seq FROM history WHERE sender_id = ? ORDER BY seq DESC LIMIT 1 OFFSET ?)',
+                    (sender_id, sender_id, keep)
+                )
+
+    def recent_turns(self, sender_id, limit):
+        """Últimos turnos do contato, do mais antigo para o mais recente"""
+        with self._connection() as db:
+            rows = db.execute(
+                'SELECT role, text, created_at FROM history WHERE sender_id = ?'
+                ' ORDER BY seq DESC LIMIT ?',
+                (sender_id, limit)
+            ).fetchall()
+        return list(reversed(rows))
+
+    def history_stats(self):
+        with self._connection() as db:
+            senders, turns = db.execute(
+                'SELECT COUNT(DISTINCT sender_id), COUNT(*) FROM history'
+            ).fetchone()
+        return {"senders": senders, "turns": turns}
+
+    # Retenção -------------------------------------------------------------
+
+    def prune(self):
+        """Apaga mensagens tratadas, respostas e turnos mais velhos que a
+        retenção; retorna quantas linhas saíram de cada tabela"""
+        now = time.time()
+        queued = ', '.join('?' * len(QUEUED_STATUSES))
+        removed = {
+            "inbox": self._delete_chunked(
+                f'SELECT rowid FROM inbox WHERE status NOT IN ({queued}) AND updated_at < ?',
+                'inbox', (*QUEUED_STATUSES, now - self.retention)
+            ),
+            "replies": self._delete_chunked(
+                'SELECT rowid FROM replies WHERE created_at < ?', 'replies', (now - self.retention,)
+            ),
+            "history": self._delete_chunked(
+                'SELECT rowid FROM history WHERE created_at < ?', 'history', (now - self.history_retention,)
+            ),
+        }
+        if any(removed.values()):
+            log.info(f"🧹 Retenção do store: {removed}")
+        return removed
+
+    def _delete_chunked(self, select, table, params):
+        # Lotes pequenos: outros processos não esperam o DELETE inteiro
+        total = 0
+        while True:
+            with self._connection() as db:
+                cursor = db.execute(
+                    f'DELETE FROM {table} WHERE rowid IN ({select} LIMIT {PRUNE_CHUNK})', params
+                )
+            total += cursor.rowcount
+            if cursor.rowcount < PRUNE_CHUNK:
+                return total
+
+    # Meta ----------------------------------------------------------------
+
+    def get_meta(self):
+        with self._connection() as db:
+            return dict(db.execute('SELECT key, value FROM meta').fetchall())
+
+    def set_meta(self, **values):
+        with self._connection() as db:
+            db.executemany(
+                'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                [(key, str(value)) for key, value in values.items()]
+            )
+
+    def stats(self):
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "inbox": self.status_counts(),
+        }
+
+    # Exportação para os JSONs legados ------------------------------------
+
+    def export_json(self, directory):
+        """Gera pending_messages.json, claude_responses.json e conversation_log.json"""
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as db:
+            pending = [
+                {"id": message_id, "senderId": sender_id, "message": message,
+                 "timestamp": iso_utc(received_at),
+                 "status": 'pending' if status in ('pending', 'claimed', 'received', 'injected') else 'answered'}
+                for message_id, sender_id, message, received_at, status in db.execute(
+                    'SELECT id, sender_id, message, received_at, status FROM inbox ORDER BY received_at'
+                )
+            ]
+            responses = dict(db.execute('SELECT message_id, reply FROM replies ORDER BY created_at'))
+
+            conversations = {}
+            for sender_id, message, reply, received_at in db.execute(
+                'SELECT i.sender_id, i.message, r.reply, i.received_at FROM inbox i'
+                ' JOIN replies r ON r.message_id = i.id ORDER BY i.received_at'
+            ):
+                conversations.setdefault(sender_id, []).append(
+                    {"timestamp": iso_utc(received_at), "message": message, "reply": reply}
+                )
+
+        for name, data in (('pending_messages.json', pending),
+                           ('claude_responses.json', responses),
+                           ('conversation_log.json', conversations)):
+            write_atomic(os.path.join(directory, name),
+                         json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'))
+        return {"pending_messages": len(pending), "claude_responses": len(responses),
+                "conversations": len(conversations)}
+
+
+class Inbox:
+    """Fila de entrada no banco com a mesma interface do Spool"""
+
+    def __init__(self, store):
+        self.store = store
+        self._last_requeue = 0.0
+        self._last_prune = 0.0
+
+    def append(self, record):
+        if 'spooledAt' not in record:
+            record = {**record, 'spooledAt': time.time()}
+        return self.store.enqueue(record)
+
+    def read_batch(self, max_records=100, position=None):
+        """Reivindica mensagens pendentes; a posição são os ids reivindicados"""
+        now = time.monotonic()
+        if now - self._last_requeue > self.store.claim_timeout / 4:
+            self._last_requeue = now
+            self.store.requeue_stale_claims()
+        if now - self._last_prune > self.store.prune_interval:
+            self._last_prune = now
+            self.store.prune()
+        messages = self.store.claim(max_records)
+        return messages, [message['id'] for message in messages]
+
+    def commit(self, position, **meta):
+        # A reivindicação já é durável; o estado segue por mark()
+        if meta:
+            self.store.set_meta(**meta)
+
+    def checkpoint(self):
+        return None, self.store.get_meta()
+
+    def set_meta(self, **meta):
+        self.store.set_meta(**meta)
+
+    def backlog_bytes(self):
+        return self.store.pending_bytes()
+
+
+class SqliteConversations:
+    """Histórico por contato no banco, com a interface do ConversationStore"""
+
+    def __init__(self, store, per_sender=20):
+        self.store = store
+        self.per_sender = per_sender
+
+    def add(self, sender_id, role, text):
+        if sender_id is None or not text:
+            return
+        self.store.add_turn(sender_id, role, str(text), keep=self.per_sender)
+
+    def recent(self, sender_id, limit=None):
+        return self.store.recent_turns(sender_id, limit or self.per_sender)
+
+    def stats(self):
+        return {"backend": "sqlite", **self.store.history_stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ferramentas do store SQLite do bridge')
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help='gera os JSONs legados a partir do banco')
+    export.add_argument('database')
+    export.add_argument('directory')
+    stats = commands.add_parser('stats', help='contagem de mensagens por estado')
+    stats.add_argument('database')
+    prune = commands.add_parser('prune', help='aplica a retenção agora')
+    prune.add_argument('database')
+    args = parser.parse_args()
+
+    store = MessageStore(args.database)
+    if args.command == 'export':
+        counts = store.export_json(args.directory)
+        print(f"📦 Exportado para {args.directory}: {counts}")
+    elif args.command == 'prune':
+        print(f"🧹 Removido: {store.prune()}")
+    else:
+        print(json.dumps(store.stats(), indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
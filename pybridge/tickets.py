@@ -0,0 +1,79 @@
+"""
+Utilitários da API de resposta diferida (202 + ticket).
+
+O POST /api/whatsapp-chat em modo assíncrono devolve 202 com o ticket
+(o próprio message_id). O cliente busca a resposta por:
+  • GET /api/reply/<id>          long-poll (?timeout=segundos)
+  • GET /api/reply/<id>/stream   Server-Sent Events
+
+Estados do ticket: pending, done, timeout.
+"""
+
+import json
+import time
+
+# Prazo máximo que um long-poll segura a conexão
+MAX_LONG_POLL = 60
+DEFAULT_LONG_POLL = 25
+# Intervalo entre comentários de keep-alive no SSE
+SSE_KEEPALIVE_INTERVAL = 15
+SSE_KEEPALIVE = b': keep-alive\n\n'
+
+
+def wants_async(data, headers):
+    """O cliente pediu resposta diferida? (corpo "async": true ou Prefer: respond-async)"""
+    if isinstance(data, dict) and data.get('async') is True:
+        return True
+    prefer = headers.get('Prefer') or headers.get('prefer') or ''
+    return 'respond-async' in prefer.lower()
+
+
+def parse_reply_path(path):
+    """'/api/reply/<id>[/stream]' -> (id, stream) ou (None, False)"""
+    prefix = '/api/reply/'
+    if not path.startswith(prefix):
+        return None, False
+    parts = path[len(prefix):].strip('/').split('/')
+    if len(parts) == 1 and parts[0]:
+        return parts[0], False
+    if len(parts) == 2 and parts[0] and parts[1] == 'stream':
+        return parts[0], True
+    return None, False
+
+
+def parse_timeout(value, default=DEFAULT_LONG_POLL, cap=MAX_LONG_POLL):
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        return default
+    return max(0.0, min(timeout, cap))
+
+
+def accepted_payload(message_id):
+    """Corpo do 202 devolvido ao criar o ticket"""
+    return {
+        "ticket": message_id,
+        "status": "pending",
+        "reply_url": f"/api/reply/{message_id}",
+        "stream_url": f"/api/reply/{message_id}/stream"
+    }
+
+
+def ticket_payload(message_id, future, timeout_reply):
+    """(status HTTP, corpo) do estado atual do ticket"""
+    if not future.done():
+        return 202, {"ticket": message_id, "status": "pending"}
+    reply = future.result()
+    if reply:
+        return 200, {"ticket": message_id, "status": "done", "reply": reply}
+    return 200, {"ticket": message_id, "status": "timeout", "reply": timeout_reply}
+
+
+def remaining(deadline):
+    """Segundos até o prazo monotônico do ticket"""
+    return max(0.0, deadline - time.monotonic())
+
+
+def sse_event(event, data):
+    body = json.dumps(data, ensure_ascii=False)
+    return f'event: {event}\ndata: {body}\n\n'.encode('utf-8')
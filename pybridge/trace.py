@@ -0,0 +1,200 @@
+"""
+Trace do ciclo de vida de cada mensagem, num ring buffer em memória.
+
+Cada mensagem ganha um slot com um timestamp (time.time()) por etapa:
+
+  received        chegou pela API, ou foi gravada no spool (caminho do monitor)
+  monitor_picked  o monitor leu a mensagem do spool (espera pelo poll)
+  batch_closed    o lote do contato fechou (janela de agregação)
+  slot_granted    o agendador liberou a vaga do contato
+  inject_start    entrou na fila do escritor do .claude.json
+  inject_end      o group commit com a mensagem foi gravado
+  reply_written   o Claude gravou o arquivo de resposta (mtime do arquivo)
+  reply_detected  a caixa postal leu a resposta e acordou o waiter
+  response_sent   a resposta saiu para o cliente HTTP
+
+O Claude pegar o prompt do histórico não é observável daqui: o tempo de
+inject_end até reply_written é o do Claude inteiro (pegar + pensar + gravar).
+
+Os slots são pré-alocados; `begin()` ocupa o mais antigo (a mensagem mais
+antiga sai do buffer). `mark()` no caminho quente é uma consulta num dict e
+uma atribuição numa lista, sem lock; se a mensagem já saiu do buffer, a
+marca é ignorada.
+
+    tracer.begin(message_id, sender_id, 'api')
+    tracer.mark(message_id, 'inject_start')
+    tracer.get(message_id)    # GET /api/trace/<message_id>
+    tracer.slowest(10)        # GET /api/trace/slowest
+"""
+
+import threading
+import time
+from datetime import datetime
+
+STAGES = (
+    'received',
+    'monitor_picked',
+    'batch_closed',
+    'slot_granted',
+    'inject_start',
+    'inject_end',
+    'reply_written',
+    'reply_detected',
+    'response_sent',
+)
+_STAGE_INDEX = {stage: index for index, stage in enumerate(STAGES)}
+_EMPTY = (0.0,) * len(STAGES)
+_REPLY_DETECTED = _STAGE_INDEX['reply_detected']
+_RESPONSE_SENT = _STAGE_INDEX['response_sent']
+
+TRACE_PREFIX = '/api/trace/'
+SLOWEST_LIMIT = 10
+MAX_SLOWEST_LIMIT = 100
+
+
+class Tracer:
+    def __init__(self, capacity=2048):
+        self.capacity = capacity
+        # Slot -> message_id, timestamps por etapa (0.0 = não aconteceu) e
+        # campos extras (contato, origem, lote)
+        self._ids = [None] * capacity
+        self._stamps = [[0.0] * len(STAGES) for _ in range(capacity)]
+        self._fields = [{} for _ in range(capacity)]
+        # message_id -> slot
+        self._slots = {}
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    def begin(self, message_id, sender_id=None, source=None, at=None):
+        """Abre o trace da mensagem (etapa received); `at` para um recebimento
+        anterior, ex.: o spooledAt do caminho do monitor"""
+        received = at or time.time()
+        with self._lock:
+            slot = self._cursor
+            self._cursor = (slot + 1) % self.capacity
+            evicted = self._ids[slot]
+            if evicted is not None and self._slots.get(evicted) == slot:
+                # Um id repetido já aponta para um slot mais novo
+                del self._slots[evicted]
+            stamps = self._stamps[slot]
+            stamps[:] = _EMPTY
+            stamps[0] = received
+            fields = self._fields[slot]
+            fields.clear()
+            fields['sender'] = sender_id
+            fields['source'] = source
+            self._ids[slot] = message_id
+            self._slots[message_id] = slot
+
+    def mark(self, message_id, stage, at=None):
+        """Timestamp da etapa; vale a primeira marca de cada etapa"""
+        slot = self._slots.get(message_id)
+        if slot is None:
+            return
+        stamps = self._stamps[slot]
+        index = _STAGE_INDEX[stage]
+        if not stamps[index]:
+            stamps[index] = at or time.time()
+
+    def mark_done(self, message_id, stage):
+        """Callback de Future que marca a etapa quando ele resolver"""
+        return lambda _future: self.mark(message_id, stage)
+
+    def mark_all(self, message_ids, stage):
+        at = time.time()
+        for message_id in message_ids:
+            self.mark(message_id, stage, at)
+
+    def annotate(self, message_id, **fields):
+        slot = self._slots.get(message_id)
+        if slot is not None:
+            self._fields[slot].update(fields)
+
+    def get(self, message_id):
+        """Trace da mensagem com o tempo de cada etapa, ou None se já saiu do buffer"""
+        slot = self._slots.get(message_id)
+        if slot is None:
+            return None
+        return self._render(slot, message_id)
+
+    def slowest(self, limit=SLOWEST_LIMIT):
+        """Os `limit` traces mais lentos do buffer (do recebimento à última etapa)"""
+        with self._lock:
+            slots = [(slot, message_id) for message_id, slot in self._slots.items()]
+        ranked = sorted(slots, key=lambda item: _total(self._stamps[item[0]]), reverse=True)
+        traces = (self._render(slot, message_id) for slot, message_id in ranked[:limit])
+        return [trace for trace in traces if trace is not None]
+
+    def stats(self):
+        return {"capacity": self.capacity, "traces": len(self._slots)}
+
+    def _render(self, slot, message_id):
+        stamps = list(self._stamps[slot])
+        fields = dict(self._fields[slot])
+        if self._ids[slot] != message_id:
+            # Slot reaproveitado durante a leitura
+            return None
+
+        received = stamps[0]
+        stages = []
+        previous = received
+        for stage, at in zip(STAGES, stamps):
+            if not at:
+                continue
+            stages.append({
+                "stage": stage,
+                "at": datetime.fromtimestamp(at).isoformat(timespec='milliseconds'),
+                "offset_ms": _ms(at - received),
+                "delta_ms": _ms(at - previous),
+            })
+            previous = at
+
+        slowest_step = max(stages[1:], key=lambda stage: stage["delta_ms"], default=None)
+        return {
+            "message_id": message_id,
+            **fields,
+            "total_ms": _ms(previous - received),
+            # Sem resposta lida nem enviada: ainda esperando o Claude
+            "in_flight": not (stamps[_REPLY_DETECTED] or stamps[_RESPONSE_SENT]),
+            "slowest_stage": slowest_step["stage"] if slowest_step else None,
+            "stages": stages,
+        }
+
+
+def parse_trace_path(path):
+    """'/api/trace/<id>' -> id ('slowest' inclusive); None para outros caminhos"""
+    if not path.startswith(TRACE_PREFIX):
+        return None
+    return path[len(TRACE_PREFIX):].strip('/') or None
+
+
+def parse_slowest_limit(value):
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return SLOWEST_LIMIT
+    return max(1, min(limit, MAX_SLOWEST_LIMIT))
+
+
+def trace_response(tracer, trace_id, limit=None):
+    """(status HTTP, corpo) de GET /api/trace/<id> e /api/trace/slowest"""
+    if trace_id == 'slowest':
+        return 200, {"traces": tracer.slowest(parse_slowest_limit(limit))}
+    trace = tracer.get(trace_id)
+    if trace is None:
+        return 404, {"message_id": trace_id, "error": "Trace não encontrado ou já descartado"}
+    return 200, trace
+
+
+def answered_ids(results):
+    """message_ids dos itens de um lote que já levam a resposta (done/timeout)"""
+    return [item['ticket'] for item in results if item.get('status') in ('done', 'timeout')]
+
+
+def _total(stamps):
+    last = max(stamps)
+    return last - stamps[0] if stamps[0] else 0.0
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
@@ -0,0 +1,226 @@
+"""
+Observadores de arquivos para as pontes Python.
+
+No Linux usa inotify via ctypes (sem dependências externas); nos demais
+sistemas, ou se o inotify falhar, cai no polling por stat(), que é o
+comportamento antigo. Os dois expõem a mesma interface:
+
+    watcher = create_watcher(['/home/user/whatsapp_messages.json'])
+    while running:
+        watcher.wait(timeout=2)   # True se algo mudou
+        ...
+
+Cada caminho pode ser um arquivo (observa o diretório pai filtrando pelo
+nome, para pegar também escritas atômicas via rename) ou um diretório
+(qualquer arquivo gravado dentro dele conta como mudança).
+
+Só gravações que fecham o arquivo ou o trocam de lugar contam. Arquivos
+gravados no lugar, sem fechar (o -wal do SQLite, por exemplo), entram em
+`modified` para que cada escrita também conte:
+
+    watcher = create_watcher([db_path + '-wal'], modified=[db_path + '-wal'])
+
+A variável de ambiente BRIDGE_WATCHER força o backend: auto, inotify ou poll.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from pybridge import logs
+
+log = logs.get_logger('watcher')
+
+# Constantes de <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _split_targets(paths):
+    """Agrupa os caminhos por diretório: {dir: set(nomes) ou None = tudo}"""
+    targets = {}
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            targets[path] = None
+            continue
+        directory, name = os.path.split(path)
+        names = targets.setdefault(directory, set())
+        if names is not None:
+            names.add(name)
+    return targets
+
+
+class PollingWatcher:
+    """Fallback por stat(): compara assinaturas a cada poll_interval"""
+
+    backend = 'poll'
+
+    def __init__(self, paths, poll_interval=1.0, modified=()):
+        # O stat() já enxerga escritas no lugar: `modified` não muda nada aqui
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._last = self._snapshot()
+
+    def _signature(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if os.path.isdir(path):
+            try:
+                return (st.st_mtime_ns, tuple(sorted(os.listdir(path))))
+            except OSError:
+                return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _snapshot(self):
+        return [self._signature(p) for p in self.paths]
+
+    def wait(self, timeout=None):
+        """Aguarda mudança (True) ou timeout (False)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._snapshot()
+            if current != self._last:
+                self._last = current
+                return True
+
+            if deadline is None:
+                step = self.poll_interval
+            else:
+                step = min(self.poll_interval, deadline - time.monotonic())
+                if step <= 0:
+                    return False
+
+            if self._wake.wait(step):
+                self._wake.clear()
+                return True
+
+    def wake(self):
+        """Interrompe um wait() em andamento (ex.: no encerramento)"""
+        self._wake.set()
+
+    def close(self):
+        self.wake()
+
+
+class InotifyWatcher:
+    """Bloqueia em select() sobre um descritor inotify"""
+
+    backend = 'inotify'
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self, paths, modified=()):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 falhou')
+
+        self._wake_r, self._wake_w = os.pipe()
+        self._watches = {}  # wd -> set(nomes) ou None
+        self._modified = {}  # wd -> nomes em que IN_MODIFY também conta
+        modified_targets = _split_targets(modified)
+        try:
+            for directory, names in _split_targets(paths).items():
+                modified_names = modified_targets.get(directory) or set()
+                mask = self.MASK | (IN_MODIFY if modified_names else 0)
+                wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), mask)
+                if wd < 0:
+                    err = ctypes.get_errno()
+                    raise OSError(err, f'inotify_add_watch falhou para {directory}: {os.strerror(err)}')
+                self._watches[wd] = names
+                self._modified[wd] = modified_names
+        except Exception:
+            self.close()
+            raise
+
+    def _drain(self):
+        changed = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            except OSError as error:
+                if error.errno == errno.EINTR:
+                    continue
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'surrogateescape')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    changed = True
+                    continue
+                if not mask & self.MASK and name not in self._modified.get(wd, ()):
+                    # IN_MODIFY de um arquivo fora de `modified`
+                    continue
+                names = self._watches.get(wd)
+                if names is None or name in names:
+                    changed = True
+
+    def wait(self, timeout=None):
+        """Aguarda mudança (True) ou timeout (False)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            readable, _, _ = select.select([self._fd, self._wake_r], [], [], remaining)
+            if not readable:
+                return False
+            if self._wake_r in readable:
+                os.read(self._wake_r, 4096)
+                return True
+            if self._drain():
+                return True
+
+    def wake(self):
+        """Interrompe um wait() em andamento (ex.: no encerramento)"""
+        try:
+            os.write(self._wake_w, b'x')
+        except OSError:
+            pass
+
+    def close(self):
+        for fd in (getattr(self, '_fd', -1), getattr(self, '_wake_r', -1), getattr(self, '_wake_w', -1)):
+            if fd >= 0:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._fd = self._wake_r = self._wake_w = -1
+
+
+def create_watcher(paths, poll_interval=1.0, backend=None, modified=()):
+    """Cria o melhor watcher disponível para os caminhos informados"""
+    backend = backend or os.environ.get('BRIDGE_WATCHER', 'auto')
+
+    if backend in ('auto', 'inotify') and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(paths, modified)
+        except (OSError, AttributeError) as error:
+            if backend == 'inotify':
+                raise
+            log.warning(f"⚠️ inotify indisponível ({error}), usando polling")
+
+    return PollingWatcher(paths, poll_interval=poll_interval, modified=modified)
@@ -0,0 +1,143 @@
+"""
+Pool de workers limitado com fila limitada, para o monitor de arquivos.
+
+Em vez de uma thread nova por mensagem, o monitor entrega as tarefas a um
+número fixo de workers. Sem worker livre o monitor para de consumir o spool
+(as mensagens continuam lá, seguras) e espera um terminar; assim só vai ao
+Claude o que algum worker já pode aguardar:
+
+    pool = WorkerPool(max_workers=16, max_queue=64)
+    idle = pool.idle_workers()
+    if not idle:
+        pool.record_deferred()
+        pool.wait_for_idle(timeout=2)
+    pool.try_submit(func, arg1, arg2)
+
+A fila (`free_slots()` / `wait_for_capacity()`) serve a quem só precisa
+não perder tarefas, como os follow-ups.
+"""
+
+import queue
+import threading
+
+from pybridge import logs
+
+log = logs.get_logger('workers')
+
+
+class WorkerPool:
+    def __init__(self, max_workers=16, max_queue=64, name='bridge-worker'):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.name = name
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._cond = threading.Condition()
+        self._running = True
+        # Tarefas aceitas e ainda não concluídas (na fila ou rodando)
+        self._outstanding = 0
+
+        # Estatísticas para /api/status
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.deferred = 0
+
+    def try_submit(self, func, *args):
+        """Enfileira func(*args); False (rejeitada) se a fila estiver cheia"""
+        self._ensure_workers()
+        with self._cond:
+            try:
+                self._queue.put_nowait((func, args))
+            except queue.Full:
+                self.rejected += 1
+                return False
+            self._outstanding += 1
+            return True
+
+    def free_slots(self):
+        return max(0, self.max_queue - self._queue.qsize())
+
+    def idle_workers(self):
+        """Workers sem tarefa, descontadas as que já estão na fila"""
+        with self._cond:
+            return max(0, self.max_workers - self._outstanding)
+
+    def wait_for_idle(self, timeout=None):
+        """Bloqueia até um worker ficar livre; False se o timeout expirar"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.max_workers > self._outstanding or not self._running,
+                                       timeout)
+
+    def wait_for_capacity(self, timeout=None):
+        """Bloqueia até a fila ter espaço; False se o timeout expirar"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.free_slots() > 0 or not self._running, timeout)
+
+    def record_deferred(self):
+        """Conta uma vez em que o consumidor parou por falta de espaço"""
+        with self._cond:
+            self.deferred += 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                "max_workers": self.max_workers,
+                "active_workers": self.active,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self.max_queue,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "deferred": self.deferred
+            }
+
+    def shutdown(self):
+        """Para os workers depois das tarefas em andamento"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait((None, None))
+            except queue.Full:
+                break
+
+    def _ensure_workers(self):
+        if self._threads:
+            return
+        with self._cond:
+            if self._threads:
+                return
+            for i in range(self.max_workers):
+                thread = threading.Thread(target=self._worker, name=f'{self.name}-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            func, args = self._queue.get()
+            with self._cond:
+                # Saiu um item da fila: o monitor pode voltar a consumir
+                self._cond.notify_all()
+                if func is None:
+                    return
+                self.active += 1
+
+            try:
+                func(*args)
+                ok = True
+            except Exception as error:
+                log.error(f"❌ Erro em tarefa do pool {self.name}: {error}")
+                ok = False
+
+            with self._cond:
+                self.active -= 1
+                self._outstanding -= 1
+                self._cond.notify_all()
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pybridge import core  # noqa: E402
+
+
+@pytest.fixture
+def bridge(tmp_path, monkeypatch):
+    """ClaudeBridge isolado num diretório temporário (como no loadtest.py)"""
+    (tmp_path / '.claude.json').write_text('{}')
+    monkeypatch.setattr(core, 'WHATSAPP_MESSAGES_PATH', str(tmp_path / 'whatsapp_messages.json'))
+    monkeypatch.setattr(core, 'CLAUDE_RESPONSE_PATH', str(tmp_path / 'claude_response.json'))
+    monkeypatch.setattr(core, 'CLAUDE_CONFIG_PATH', str(tmp_path / '.claude.json'))
+    monkeypatch.setattr(core, 'CLAUDE_REPLIES_DIR', str(tmp_path / 'claude_replies'))
+    monkeypatch.setattr(core, 'WHATSAPP_SPOOL_DIR', str(tmp_path / 'whatsapp_spool'))
+    monkeypatch.setattr(core, 'BRIDGE_STORE_PATH', str(tmp_path / 'whatsapp_bridge.db'))
+    monkeypatch.setattr(core, 'CONVERSATION_LOG_DIR', str(tmp_path / 'conversation_log'))
+    monkeypatch.setattr(core, 'CLAUDE_MAX_WAIT', 5)
+    instance = core.ClaudeBridge()
+    yield instance
+    instance.close()
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from pybridge.config_writer import ConfigWriter
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / '.claude.json'
+    path.write_text(json.dumps({"keep": 1}))
+    return path
+
+
+@pytest.fixture
+def writer(config_path):
+    instance = ConfigWriter(str(config_path), window=0.2)
+    yield instance
+    instance.close()
+
+
+def setter(key, value):
+    def mutation(config):
+        config[key] = value
+    return mutation
+
+
+def half_applied(config):
+    config["partial"] = True
+    raise KeyError('mutação falhou no meio')
+
+
+def on_disk(config_path):
+    return json.loads(config_path.read_text())
+
+
+def test_failed_mutation_is_left_out_of_the_batch(writer, config_path):
+    futures = [writer.submit(setter("a", 1)), writer.submit(half_applied), writer.submit(setter("b", 2))]
+
+    assert futures[0].result(timeout=5) is True
+    assert futures[2].result(timeout=5) is True
+    with pytest.raises(KeyError):
+        futures[1].result(timeout=5)
+    assert on_disk(config_path) == {"keep": 1, "a": 1, "b": 2}
+    assert writer.commits == 1
+    assert writer.mutations == 2
+
+
+def test_failed_mutation_does_not_leak_into_next_commit(writer, config_path):
+    # Aquece o cache para a mutação falha alterar o dict reaproveitado
+    writer.submit(setter("a", 1)).result(timeout=5)
+    with pytest.raises(KeyError):
+        writer.submit(half_applied).result(timeout=5)
+
+    writer.submit(setter("b", 2)).result(timeout=5)
+    assert on_disk(config_path) == {"keep": 1, "a": 1, "b": 2}
+
+
+def test_write_failure_invalidates_cache(writer, config_path, monkeypatch):
+    writer.submit(setter("a", 1)).result(timeout=5)
+
+    original = writer._write_atomic
+    calls = []
+
+    def failing_once(config, generation):
+        calls.append(generation)
+        if len(calls) == 1:
+            raise OSError('disco cheio')
+        return original(config, generation)
+
+    monkeypatch.setattr(writer, '_write_atomic', failing_once)
+    with pytest.raises(OSError):
+        writer.submit(setter("lost", True)).result(timeout=5)
+    assert writer._cached_config is None
+
+    writer.submit(setter("b", 2)).result(timeout=5)
+    assert on_disk(config_path) == {"keep": 1, "a": 1, "b": 2}
+
+
+def test_external_edit_is_picked_up(writer, config_path):
+    writer.submit(setter("a", 1)).result(timeout=5)
+    config_path.write_text(json.dumps({"edited": True, "padding": "x" * 10}))
+
+    writer.submit(setter("b", 2)).result(timeout=5)
+    assert on_disk(config_path) == {"edited": True, "padding": "x" * 10, "b": 2}
+
+
+def test_invalid_json_fails_every_mutation(writer, config_path):
+    config_path.write_text('{"truncado": ')
+    futures = [writer.submit(setter("a", 1)), writer.submit(setter("b", 2))]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+    assert config_path.read_text() == '{"truncado": '
+
+
+def test_submit_after_close_fails(writer):
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.submit(setter("a", 1)).result(timeout=1)
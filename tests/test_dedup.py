@@ -0,0 +1,135 @@
+import threading
+import time
+
+import pytest
+
+from pybridge.cancel import RequestCancelled
+from pybridge.dedup import RETRY, ReplyDeduplicator
+from pybridge.scheduler import Throttled
+
+
+def test_release_hands_retry_to_duplicates_and_frees_key():
+    dedup = ReplyDeduplicator()
+    key = dedup.key('s1', 'Oi  tudo bem?')
+    future, leader = dedup.claim(key)
+    duplicate, duplicate_leader = dedup.claim(dedup.key('s1', 'oi tudo bem?'))
+    assert leader and not duplicate_leader
+    assert duplicate is future
+
+    dedup.release(key, future)
+    assert future.result(timeout=1) is RETRY
+    retry, leader = dedup.claim(key)
+    assert leader and retry is not future
+
+
+def test_stale_release_does_not_drop_new_leader():
+    dedup = ReplyDeduplicator()
+    key = dedup.key('s1', 'oi')
+    first, _ = dedup.claim(key)
+    dedup.release(key, first)
+    second, _ = dedup.claim(key)
+
+    dedup.release(key, first)
+    assert dedup.claim(key) == (second, False)
+
+
+def test_resolve_caches_only_when_asked():
+    dedup = ReplyDeduplicator(ttl=30)
+    cached, uncached = dedup.key('s1', 'a'), dedup.key('s1', 'b')
+    for key, cache in ((cached, True), (uncached, False)):
+        future, _ = dedup.claim(key)
+        dedup.resolve(key, future, 'resposta', cache=cache)
+
+    assert dedup.claim(cached)[1] is False
+    assert dedup.claim(uncached)[1] is True
+    assert dedup.stats()["hits"] == 1
+
+
+class LeaderStub:
+    """Substitui _reply_batched: a primeira chamada espera a duplicata se
+    juntar e então falha com `error`; as seguintes respondem"""
+
+    def __init__(self, bridge, error, before_error=None):
+        self.bridge = bridge
+        self.error = error
+        self.before_error = before_error
+        self.calls = []
+
+    def __call__(self, sender_id, message, message_id, token):
+        self.calls.append(message_id)
+        if len(self.calls) > 1:
+            return f'resposta para {message_id}', f'resposta para {message_id}'
+        deadline = time.monotonic() + 5
+        while self.bridge.dedup.stats()["coalesced"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        if self.before_error:
+            self.before_error(message_id)
+        raise self.error
+
+
+def run_pair(bridge, stub):
+    """Líder m1 e duplicata m2 da mesma mensagem; (erro do líder, resposta da duplicata)"""
+    bridge._reply_batched = stub
+    outcome = {}
+
+    def leader():
+        try:
+            bridge.reply_to('s1', 'oi', 'm1')
+        except Exception as error:
+            outcome["leader"] = error
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    while not stub.calls:
+        time.sleep(0.01)
+    outcome["duplicate"] = bridge.reply_to('s1', 'oi', 'm2')
+    thread.join(5)
+    return outcome["leader"], outcome["duplicate"]
+
+
+def test_throttled_leader_releases_duplicates(bridge):
+    stub = LeaderStub(bridge, Throttled('rate', 1.0))
+    error, reply = run_pair(bridge, stub)
+
+    assert isinstance(error, Throttled)
+    # A duplicata virou líder e passou ela mesma pelo Claude (e pelo agendador)
+    assert stub.calls == ['m1', 'm2']
+    assert reply == 'resposta para m2'
+
+
+def test_cancelled_leader_without_injection_releases_duplicates(bridge):
+    stub = LeaderStub(bridge, RequestCancelled('disconnect'))
+    error, reply = run_pair(bridge, stub)
+
+    assert isinstance(error, RequestCancelled)
+    assert stub.calls == ['m1', 'm2']
+    assert reply == 'resposta para m2'
+
+
+def test_cancelled_leader_hands_late_reply_to_duplicates(bridge):
+    def injected(message_id):
+        # A mensagem já está no Claude: a espera virou ticket
+        bridge.mailbox.open_ticket(message_id, max_wait=5)
+        threading.Timer(0.2, bridge.mailbox._deliver, args=(message_id, 'resposta tardia')).start()
+
+    stub = LeaderStub(bridge, RequestCancelled('deadline'), before_error=injected)
+    error, reply = run_pair(bridge, stub)
+
+    assert isinstance(error, RequestCancelled)
+    assert stub.calls == ['m1']
+    assert reply == 'resposta tardia'
+    # A resposta tardia fica no cache para as próximas repetições
+    assert bridge.reply_to('s1', 'oi', 'm3') == 'resposta tardia'
+
+
+def test_cancelled_leader_whose_ticket_expires_releases_duplicates(bridge):
+    def injected(message_id):
+        bridge.mailbox.open_ticket(message_id, max_wait=0.2)
+        threading.Timer(0.4, bridge.mailbox.ticket, args=(message_id,)).start()
+
+    stub = LeaderStub(bridge, RequestCancelled('deadline'), before_error=injected)
+    error, reply = run_pair(bridge, stub)
+
+    assert isinstance(error, RequestCancelled)
+    assert stub.calls == ['m1', 'm2']
+    assert reply == 'resposta para m2'
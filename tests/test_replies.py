@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from pybridge.replies import ReplyMailbox
+
+
+@pytest.fixture
+def mailbox(tmp_path):
+    instance = ReplyMailbox(str(tmp_path / 'replies'), poll_interval=0.05)
+    yield instance
+    instance.close()
+
+
+def write_reply(mailbox, message_id, reply):
+    with open(mailbox.reply_path(message_id), 'w', encoding='utf-8') as f:
+        json.dump({"reply": reply}, f)
+
+
+def test_concurrent_collectors_deliver_once(mailbox):
+    for i in range(50):
+        message_id = f'm{i}'
+        future = mailbox.expect(message_id)
+        write_reply(mailbox, message_id, 'ok')
+        errors = []
+
+        def collect():
+            try:
+                mailbox._collect_file(message_id, mailbox.reply_path(message_id))
+            except Exception as error:  # pragma: no cover - é a falha do teste
+                errors.append(error)
+
+        threads = [threading.Thread(target=collect) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert future.result(timeout=1) == 'ok'
+        mailbox.discard(message_id)
+
+
+def test_delivery_after_ticket_deadline_does_not_raise(mailbox):
+    future = mailbox.open_ticket('late', max_wait=0)
+    # O prazo já passou: ticket() reapa e resolve com None
+    assert mailbox.ticket('late')[0] is future
+    assert future.result(timeout=1) is None
+    assert mailbox._deliver('late', 'tarde demais') is False
+
+
+def test_delivery_racing_ticket_reaping(mailbox):
+    for i in range(200):
+        message_id = f'r{i}'
+        future = mailbox.open_ticket(message_id, max_wait=0.001)
+        time.sleep(0.001)
+        reaper = threading.Thread(target=mailbox.ticket, args=(message_id,))
+        reaper.start()
+        mailbox._deliver(message_id, 'ok')
+        reaper.join()
+        assert future.result(timeout=1) in ('ok', None)
+
+
+def test_discard_cancelled_waiter_buries_it(mailbox):
+    future = mailbox.expect('gone')
+    future.cancel()
+    mailbox.discard('gone')
+    assert 'gone' in mailbox._tombstones
+
+
+def test_late_reply_of_discarded_message_is_removed(mailbox):
+    mailbox.expect('orphan')
+    mailbox.discard('orphan')
+    write_reply(mailbox, 'orphan', 'ninguém espera')
+    mailbox._sweep_tombstones()
+    assert not os.path.exists(mailbox.reply_path('orphan'))
+    assert 'orphan' not in mailbox._tombstones
@@ -0,0 +1,164 @@
+import threading
+import time
+
+import pytest
+
+from pybridge import store
+from pybridge.store import MessageStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'bridge.db')
+
+
+@pytest.fixture
+def message_store(db_path):
+    instance = MessageStore(db_path)
+    yield instance
+    instance.close()
+
+
+def enqueue_many(message_store, count, prefix='m'):
+    for i in range(count):
+        message_store.enqueue({"id": f'{prefix}{i}', "senderId": 's1', "message": f'oi {i}'})
+
+
+def counted_pending_bytes(message_store):
+    with message_store._connection() as db:
+        return db.execute(
+            "SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM inbox WHERE status = 'pending'"
+        ).fetchone()[0]
+
+
+@pytest.mark.parametrize('returning', [True, False], ids=['returning', 'begin-immediate'])
+def test_claim_in_order_without_repeats(message_store, monkeypatch, returning):
+    if returning and not store.HAS_RETURNING:
+        pytest.skip('SQLite sem RETURNING')
+    monkeypatch.setattr(store, 'HAS_RETURNING', returning)
+    enqueue_many(message_store, 5)
+
+    first = message_store.claim(3)
+    second = message_store.claim(3)
+    assert [record['id'] for record in first] == ['m0', 'm1', 'm2']
+    assert [record['id'] for record in second] == ['m3', 'm4']
+    assert message_store.claim(3) == []
+    assert message_store.status_counts() == {'claimed': 5}
+    assert message_store.pending_bytes() == 0
+
+
+@pytest.mark.parametrize('returning', [True, False], ids=['returning', 'begin-immediate'])
+def test_concurrent_claims_across_stores(db_path, monkeypatch, returning):
+    if returning and not store.HAS_RETURNING:
+        pytest.skip('SQLite sem RETURNING')
+    monkeypatch.setattr(store, 'HAS_RETURNING', returning)
+    stores = [MessageStore(db_path) for _ in range(3)]
+    enqueue_many(stores[0], 300)
+
+    claimed = []
+    lock = threading.Lock()
+
+    def worker(instance):
+        while True:
+            batch = instance.claim(7)
+            if not batch:
+                return
+            with lock:
+                claimed.extend(record['id'] for record in batch)
+
+    threads = [threading.Thread(target=worker, args=(instance,))
+               for instance in stores for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for instance in stores:
+        instance.close()
+
+    assert len(claimed) == 300
+    assert len(set(claimed)) == 300
+
+
+def test_failed_fallback_claim_rolls_back(message_store, monkeypatch):
+    monkeypatch.setattr(store, 'HAS_RETURNING', False)
+    enqueue_many(message_store, 2)
+    with message_store._connection() as db:
+        db.execute("CREATE TRIGGER refuse_claim BEFORE UPDATE ON inbox"
+                   " BEGIN SELECT RAISE(ABORT, 'claim recusado'); END")
+    with pytest.raises(store.sqlite3.IntegrityError):
+        message_store.claim(2)
+    with message_store._connection() as db:
+        assert not db.in_transaction
+        db.execute('DROP TRIGGER refuse_claim')
+
+    assert message_store.status_counts() == {'pending': 2}
+    assert len(message_store.claim(2)) == 2
+
+
+def test_pending_bytes_follows_status_changes(message_store):
+    enqueue_many(message_store, 4)
+    message_store.track('api-1', 's2', 'via API')
+    assert message_store.pending_bytes() == counted_pending_bytes(message_store)
+
+    message_store.claim(1)
+    message_store.mark('m1', 'failed')
+    assert message_store.pending_bytes() == counted_pending_bytes(message_store)
+
+    message_store.requeue_stale_claims()
+    message_store.prune()
+    assert message_store.pending_bytes() == counted_pending_bytes(message_store) > 0
+
+
+def test_prune_keeps_queued_messages(db_path, monkeypatch):
+    # Lotes de uma linha: exercita o laço do DELETE em pedaços
+    monkeypatch.setattr(store, 'PRUNE_CHUNK', 1)
+    message_store = MessageStore(db_path, retention=3600, history_retention=3600)
+    enqueue_many(message_store, 4)
+    message_store.claim(1)                       # m0: claimed
+    message_store.mark('m1', 'timeout')          # m1: final
+    message_store.save_reply('m2', 'resposta')   # m2: replied
+    message_store.add_turn('s1', 'user', 'antigo')
+    message_store.add_turn('s1', 'user', 'novo')
+
+    old = time.time() - 7200
+    with message_store._connection() as db:
+        db.execute('UPDATE inbox SET updated_at = ?', (old,))
+        db.execute('UPDATE replies SET created_at = ?', (old,))
+        db.execute("UPDATE history SET created_at = ? WHERE text = 'antigo'", (old,))
+
+    removed = message_store.prune()
+
+    assert removed == {"inbox": 2, "replies": 1, "history": 1}
+    assert message_store.status_counts() == {'claimed': 1, 'pending': 1}
+    assert message_store.reply_for('m2') is None
+    assert [text for _role, text, _at in message_store.recent_turns('s1', 10)] == ['novo']
+    message_store.close()
+
+
+def test_add_turn_keeps_last_turns(message_store):
+    for i in range(10):
+        message_store.add_turn('s1', 'user', f't{i}', keep=3)
+    message_store.add_turn('s2', 'user', 'outro', keep=3)
+    assert [text for _role, text, _at in message_store.recent_turns('s1', 10)] == ['t7', 't8', 't9']
+    assert message_store.history_stats() == {"senders": 2, "turns": 4}
+
+
+def test_pool_is_bounded(db_path):
+    message_store = MessageStore(db_path, pool_size=2)
+    opened = []
+    original = message_store._open
+
+    def counting_open():
+        opened.append(1)
+        return original()
+
+    message_store._open = counting_open
+    enqueue_many(message_store, 20)
+    threads = [threading.Thread(target=message_store.status_counts) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert message_store._pool.qsize() <= 2
+    assert len(opened) <= 1     # a conexão do schema já estava no pool
+    message_store.close()